@@ -2,6 +2,8 @@ from .src import erddap_wrangler as ec
 from .src import data_wrangler as dw
 from .src import agol_wrangler as aw
 from .src import update_manager as um
+from .src import run_ledger as rl
+from .src import catalog_harvest as ch
 from .src import core
 from .src.core import gliderWorkflow, updateNRT
 from arcgis.gis import GIS
@@ -18,6 +20,13 @@ def _updateNRT(verbose_opt: bool = True, preserveProps_opt: bool=True,
     updateNRT(verbose_opt, preserveProps_opt, ignoreAge_opt, noProps_opt, timeout_Time, max_workers)
 
 
+def _harvestCatalogs(servers: list = None, refresh: bool = False) -> ch.HarvestedCatalog:
+    """servers: list = None, refresh: bool = False
+    Fetches the catalogs of many ERDDAP servers concurrently (default: the whole ERDDAP list)
+    and returns one catalog to search, e.g. _harvestCatalogs().nrtCandidates("glider")"""
+    return ch.harvestCatalogs(servers, refresh=refresh)
+
+
 def _gliderWorkflow(search_term: str = None) -> None:
     """
     This will be deprecated soon as program-based workflows are refined.
@@ -85,6 +94,11 @@ def add_menu(menu_title:str, glider: bool = False, nrt: bool = False, protocol:
 
     dataset_ids, griddap_args = core.selectDatasetFromList(erddapObj)
 
+    # rerunning the same selection after a crash resumes from the ledger
+    ledger = None
+    if core.user_options.run_ledger_bool:
+        ledger = rl.RunLedger.forRun(erddapObj.server, erddapObj.protocol, dataset_ids)
+
     if protocol == "griddap":
         erddapObj.createDatasetObjects(dataset_ids, griddap_args)
     else:
@@ -93,23 +107,31 @@ def add_menu(menu_title:str, glider: bool = False, nrt: bool = False, protocol:
     datasetObjlist = (erddapObj.datasets)
 
     for datasetObj in datasetObjlist:
+        datasetObj.ledger = ledger
+        if ledger:
+            ledger.recordMetadata(datasetObj)
         if erddapObj.protocol == "tabledap":
             datasetObj.generateUrl()        
         else: 
             datasetObj.generateGriddap_url(griddap_args)
     
-    datasetObj.writeErddapData()
     agolObj = aw.AgolWrangler(erddap_obj=erddapObj)
     agolObj.datasets = erddapObj.datasets
+    agolObj.ledger = ledger
     agolObj.makeItemProperties()
 
-    if glider:
-        agolObj.pointTableToGeojsonLine()
-
     if erddapObj.protocol == "tabledap":
-        agolObj.postAndPublish()
+        # downloads (and glider geojson conversion) run inside the pipeline
+        agolObj.pipelinePublish()
+        if ledger:
+            ledger.finish([datasetObj.dataset_id for datasetObj in datasetObjlist])
     else:
+        for datasetObj in datasetObjlist:
+            datasetObj.writeErddapData()
         agolObj.postAndPublishImagery()
+        # imagery publishing isn't staged in the ledger, only the downloads resume
+        if ledger:
+            ledger.clear()
     
     print("\nReturning to main menu...")
     erddapObj.reset()
@@ -8,20 +8,34 @@ from arcgis.gis._impl._content_manager import SharingLevel
 from . import data_wrangler as dw
 from . import erddap_wrangler as ec
 from . import das_client as dc
+from . import run_ledger as rl
+from . import glider_tracks as gt
 from . import core 
-import os, sys, time, pandas as pd, numpy as np, json
+from . import http_client as http
+import os, sys, io, time
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict
 from pathlib import Path
 #from line_profiler import profile
 from collections import deque
 import concurrent.futures
+import queue, threading
 import re
 # sharing levels
 # PRIVATE
 # ORGANIZATION
 # EVERYONE
 
+# tries per subset append before it is reported as failed
+APPEND_ATTEMPTS = 3
+
+def bufferItemProperties(item_props: ItemProperties, file_name: str) -> dict:
+    """Item properties for adding an io.BytesIO, the upload needs a file name to stand in for the path"""
+    props = dict(item_props)
+    # Folder.add validates "fileName" but names the upload from "file_name"
+    props["fileName"] = props["file_name"] = os.path.basename(file_name)
+    return props
+
 @dataclass
 class AgolWrangler:
     gis: Optional[GIS] = None
@@ -31,6 +45,8 @@ class AgolWrangler:
     filetype: Optional[str] = None
     erddap_obj: Optional['ec.ERDDAPHandler'] = None
     enterprise_bool: Optional[bool] = None
+    # run ledger of a resumable run, see run_ledger.RunLedger
+    ledger: Optional['rl.RunLedger'] = None
     geoParams = None 
     geoParams_online: dict = field(default_factory=lambda: {
         "locationType": "coordinates",
@@ -476,13 +492,209 @@ class AgolWrangler:
     def postAndPublish(self, inputDataType="csv", timeoutTime=300) -> None:
     
         """Publishes all datasets in self.datasets to ArcGIS, handling subsets if needed."""
-        geom_params = self.geoParams.copy()
-        geom_params.pop('hasStaticData', None)  # Remove if exists, as done in stable code
-
         # Time tracking variables
         total_start_time = time.time()
         processed_count = 0
 
+        # Start iterating through datasets 
+        for dataset in self.datasets:
+            if self.publishDataset(dataset, inputDataType, timeoutTime):
+                processed_count += 1
+
+        self._publishSummary(processed_count, time.time() - total_start_time)
+
+    @skipFromError
+    def pipelinePublish(self, inputDataType="csv", timeoutTime=300, download_workers: int = None,
+                        publish_workers: int = None, queue_size: int = None, cleanup: bool = True) -> None:
+        """
+        Download -> add -> publish -> append as a staged pipeline across self.datasets.
+
+        Download workers feed a bounded queue that publish workers drain, so dataset N+1
+        downloads while dataset N publishes, and one dataset's subset appends overlap the
+        next dataset's upload. A full queue blocks the downloaders (backpressure), and with
+        cleanup the data files of a published dataset are removed, so temp disk use stays
+        bounded by roughly queue_size + download_workers + publish_workers datasets.
+        """
+        download_workers = max(1, int(download_workers or core.user_options.pipeline_download_workers))
+        publish_workers = max(1, int(publish_workers or core.user_options.pipeline_publish_workers))
+        queue_size = max(1, int(queue_size or core.user_options.pipeline_queue_size))
+
+        ready = queue.Queue(maxsize=queue_size)
+        done_marker = object()
+        total_start_time = time.time()
+        processed = []
+
+        def _download(dataset) -> None:
+            try:
+                if self.ledger and self.ledger.isDone(dataset.dataset_id):
+                    pass
+                elif not dataset.has_error:
+                    dataset.writeErddapData()
+                    if dataset.is_glider and dataset.data_filepath:
+                        self.pointTableToGeojsonLine(datasets=[dataset])
+            except Exception as e:
+                print(f"Error downloading {dataset.dataset_title}: {e}")
+                dataset.has_error = True
+            # blocks while the publish stage is behind
+            ready.put(dataset)
+
+        def _downloadStage() -> None:
+            try:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=download_workers) as executor:
+                    list(executor.map(_download, self.datasets))
+            finally:
+                for _ in range(publish_workers):
+                    ready.put(done_marker)
+
+        def _publishStage() -> None:
+            while True:
+                dataset = ready.get()
+                if dataset is done_marker:
+                    return
+                try:
+                    if self.publishDataset(dataset, inputDataType, timeoutTime):
+                        processed.append(dataset.dataset_id)
+                except Exception as e:
+                    print(f"An error occurred publishing {dataset.dataset_title}: {e}")
+                finally:
+                    # with a ledger, a dataset that didn't finish keeps its files for the rerun to resume from
+                    if cleanup and (not self.ledger or self.ledger.isDone(dataset.dataset_id)):
+                        self._removeDataFiles(dataset)
+
+        print(f"\nPipelining {len(self.datasets)} datasets "
+              f"({download_workers} download / {publish_workers} publish workers, queue of {queue_size})")
+        producer = threading.Thread(target=_downloadStage, daemon=True)
+        producer.start()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=publish_workers) as executor:
+            for fut in [executor.submit(_publishStage) for _ in range(publish_workers)]:
+                fut.result()
+        producer.join()
+
+        self._publishSummary(len(processed), time.time() - total_start_time)
+
+    def _publishSummary(self, processed_count: int, total_time: float) -> None:
+        if processed_count == 0:
+            print("\n 0 datasets processed")
+        else:
+            print("\nAll done!")
+            print(f"Processing completed for {processed_count} datasets")
+            print(f"Total processing time: {total_time:.2f} seconds")
+
+    @staticmethod
+    def _removeDataFiles(dataset) -> None:
+        """Delete a published dataset's downloaded files from temp"""
+        dataset.data_buffer = None
+        paths = []
+        for group in (dataset.data_filepath, dataset.columnar_filepath):
+            paths.extend([group] if isinstance(group, (str, os.PathLike)) else group or [])
+        dataset.columnar_filepath = None
+        for path in paths:
+            try:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                print(f"An unexpected error occurred while deleting {path}: {e}")
+
+    def _resumedItem(self, dataset_id: str, stage: str):
+        """Item recorded for `stage` by an earlier attempt of this run, if it still exists"""
+        entry = self.ledger.get(dataset_id, stage) if self.ledger else None
+        if not entry:
+            return None
+        try:
+            item = self.gis.content.get(entry["item_id"])
+        except Exception:
+            item = None
+        if item is not None:
+            print(f"Resuming {dataset_id} with {stage} item {item.id} from an earlier attempt")
+        return item
+
+    def _recordItem(self, dataset_id: str, stage: str, item) -> None:
+        if self.ledger and item is not None:
+            self.ledger.record(dataset_id, stage, detail={"item_id": item.id})
+
+    def _appendSubsets(self, dataset, published_item, paths: List[str], add_item) -> None:
+        """
+        Append paths[1:] to the published layer. Staging items upload concurrently, the
+        appends run one at a time in subset order so the layer's rows stay in time order
+        and appends to the same layer never compete. The CSV is analyzed once, every subset
+        shares its source_info. A failed append is retried after http.backoffDelay,
+        staging items are deleted once they are appended.
+        """
+        feature_layer = published_item.layers[0]
+        total = len(paths)
+        appended = self.ledger.parts(dataset.dataset_id, rl.STAGE_APPENDED) if self.ledger else {}
+        pending = []
+        for idx, subset_path in enumerate(paths[1:], start=2):
+            if os.path.basename(subset_path) in appended:
+                print(f"\nSubset {idx} of {total} was appended by an earlier attempt")
+            else:
+                pending.append((idx, subset_path))
+        if not pending:
+            return
+
+        source_info = {}
+
+        def _sourceInfo(item) -> dict:
+            # the subsets share one schema, so the first staged one stands for all
+            if not source_info:
+                source_info.update(self.gis.content.analyze(item=item.id, file_type='csv')['publishParameters'])
+            return source_info
+
+        def _append(idx: int, subset_path: str, subset_item) -> bool:
+            try:
+                for attempt in range(1, APPEND_ATTEMPTS + 1):
+                    try:
+                        if feature_layer.append(item_id=subset_item.id, upload_format='csv',
+                                                source_info=_sourceInfo(subset_item), upsert=False):
+                            if self.ledger:
+                                self.ledger.record(dataset.dataset_id, rl.STAGE_APPENDED,
+                                                   part=os.path.basename(subset_path))
+                            print(f"\nAppended Subset {idx} of {total} to {published_item.title}")
+                            return True
+                        error = "append returned no success"
+                    except Exception as e:
+                        error = e
+                    if attempt < APPEND_ATTEMPTS:
+                        print(f"\nAppending subset {idx} failed (attempt {attempt}): {error}, retrying...")
+                        time.sleep(http.backoffDelay(attempt))
+                print(f"\nFailed to append subset # {idx} to {published_item.title}: {error}")
+                return False
+            finally:
+                try:
+                    if self.enterprise_bool:
+                        subset_item.delete()
+                    else:
+                        subset_item.delete(permanent=True)
+                except Exception as e:
+                    print(f"\nCould not delete the staging item of subset {idx}: {e}")
+
+        start = time.time()
+        upload_workers = max(1, core.user_options.subset_upload_workers)
+        done = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=upload_workers) as uploads:
+            staged = [(idx, path, uploads.submit(add_item, dataset, path)) for idx, path in pending]
+            # later subsets keep uploading while the earlier ones are appended
+            for idx, subset_path, fut in staged:
+                try:
+                    subset_item = fut.result()
+                except Exception as e:
+                    print(f"\nAdding the subset item failed (addOrRetry method):\nError Message- {e}")
+                    continue
+                done += _append(idx, subset_path, subset_item)
+        print(f"\nAppended {done} of {len(pending)} subsets to {published_item.title} in {time.time() - start:.1f}s")
+
+    def publishDataset(self, dataset, inputDataType="csv", timeoutTime=300) -> bool:
+        """
+        Add, publish and (for subsets) append one dataset. Returns True once it is published.
+        With a run ledger, stages an earlier attempt of the run completed are not repeated.
+        """
+        if self.ledger and self.ledger.isDone(dataset.dataset_id):
+            print(f"{dataset.dataset_title} was published by an earlier attempt of this run, skipping")
+            return True
+
+        geom_params = self.geoParams.copy()
+        geom_params.pop('hasStaticData', None)  # Remove if exists, as done in stable code
+
         # Helper function to try renaming a file with retries
         def _tryRename(old_path, new_path, max_attempts=5, delay=1):
             for attempt in range(max_attempts):
@@ -495,145 +707,157 @@ class AgolWrangler:
                     time.sleep(delay)
             raise Exception(f"Failed to rename file {old_path} after {max_attempts} attempts.")
 
-        # Start iterating through datasets 
-        for dataset in self.datasets:
-            # Dictionary to store renamed file paths for this dataset.
-            renamed_files = {}
+        # Dictionary to store renamed file paths for this dataset.
+        renamed_files = {}
 
-            if dataset.is_glider is True:
-                inputDataType = "GeoJson"
+        if dataset.is_glider is True:
+            inputDataType = "GeoJson"
 
-            dataset_start_time = time.time()  # Track start time for this dataset
+        dataset_start_time = time.time()  # Track start time for this dataset
 
-            item_prop = self.item_properties.get(dataset.dataset_id)
-            if not item_prop:
-                print(f"No item properties found for {dataset.dataset_title}. Skipping.")
-                continue
+        item_prop = self.item_properties.get(dataset.dataset_id)
+        if not item_prop:
+            print(f"No item properties found for {dataset.dataset_title}. Skipping.")
+            return False
 
-            paths = dataset.data_filepath
-            if not paths:
-                print(f"No data file path found for {dataset.dataset_title}. Skipping.")
-                continue
+        paths = dataset.data_filepath
+        if not paths:
+            print(f"No data file path found for {dataset.dataset_title}. Skipping.")
+            return False
 
-            # Set a service name if not already present
-            if 'name' not in geom_params or not geom_params['name']:
-                geom_params['name'] = item_prop['title']
+        # Set a service name if not already present
+        if 'name' not in geom_params or not geom_params['name']:
+            geom_params['name'] = item_prop['title']
 
-            gis = self.gis
-            # Get the user root folder
-            user_root = gis.content.folders.get()
-
-            # ----------------- Helper Functions -----------------
-            def addOrRetry(dataset, file, max_attempts=10):
-                """
-                Attempt to add an item using the provided file and item properties.
-                If a conflict error (409) is encountered (i.e., filename exists),
-                modify the title by appending _1, _2, etc. and rename the file in place.
-                The new name is stored so subsequent calls use it.
-                """
-                # If this file has been renamed previously, use the new name.
-                if file in renamed_files:
-                    file = renamed_files[file]
-                original_file = file
-                props = self.item_properties.get(dataset.dataset_id).copy()
-                base_title = props.get("title", "")
-                attempt = 0
-                while attempt < max_attempts:
-                    try:
-                        print(f"Attempt {attempt+1}: Trying to add item with title: {props.get('title')} and file: {os.path.basename(file)}")
-                        item_props= self.mapItemProperties(dataset_id=dataset.dataset_id)
+        gis = self.gis
+        # Get the user root folder
+        user_root = gis.content.folders.get()
+
+        # ----------------- Helper Functions -----------------
+        def addOrRetry(dataset, file, max_attempts=10):
+            """
+            Attempt to add an item using the provided file and item properties.
+            If a conflict error (409) is encountered (i.e., filename exists),
+            modify the title by appending _1, _2, etc. and rename the file in place.
+            The new name is stored so subsequent calls use it.
+            """
+            # If this file has been renamed previously, use the new name.
+            if file in renamed_files:
+                file = renamed_files[file]
+            original_file = file
+            # an in-memory download is uploaded from its buffer, renames only change its name
+            in_memory = dataset.data_buffer is not None and file == dataset.data_filepath
+            props = self.item_properties.get(dataset.dataset_id).copy()
+            base_title = props.get("title", "")
+            attempt = 0
+            while attempt < max_attempts:
+                try:
+                    print(f"Attempt {attempt+1}: Trying to add item with title: {props.get('title')} and file: {os.path.basename(file)}")
+                    item_props= self.mapItemProperties(dataset_id=dataset.dataset_id)
+                    if in_memory:
+                        item_future = user_root.add(item_properties=bufferItemProperties(item_props, file),
+                                                    file=io.BytesIO(dataset.data_buffer))
+                    else:
                         item_future = user_root.add(item_properties=item_props, file=file)
-                        item = item_future.result()
-                        return item
-                    except Exception as e:
-                        error_str = str(e)
-                        if "409" in error_str and "already exists" in error_str:
-                            attempt += 1
-                            new_title = base_title + f"_{attempt}"
-                            print(f"Filename conflict encountered. Changing title to {new_title} and renaming file, then retrying...")
-                            props["title"] = new_title
-                            dirname, basename = os.path.split(original_file)
-                            name, ext = os.path.splitext(basename)
-                            new_basename = name + f"_{attempt}" + ext
-                            new_file = os.path.join(dirname, new_basename)
-                            # Try renaming the file, waiting if it's locked.
+                    item = item_future.result()
+                    return item
+                except Exception as e:
+                    error_str = str(e)
+                    if "409" in error_str and "already exists" in error_str:
+                        attempt += 1
+                        new_title = base_title + f"_{attempt}"
+                        print(f"Filename conflict encountered. Changing title to {new_title} and renaming file, then retrying...")
+                        props["title"] = new_title
+                        dirname, basename = os.path.split(original_file)
+                        name, ext = os.path.splitext(basename)
+                        new_basename = name + f"_{attempt}" + ext
+                        new_file = os.path.join(dirname, new_basename)
+                        # Try renaming the file, waiting if it's locked.
+                        if in_memory:
+                            dataset.data_filepath = new_file
+                        else:
                             try:
                                 _tryRename(file, new_file)
                             except Exception as rename_error:
                                 raise Exception(f"Unable to rename file: {rename_error}")
-                            file = new_file
-                            renamed_files[original_file] = new_file
-                        else:
-                            raise e
-                raise Exception("Max attempts reached for adding item with retry.")
-            
-            def publishOrRetry(item, publish_parameters, file_type, timeout=300, max_attempts=10):
-                """
-                Attempt to publish an item with the provided publish parameters and file type.
-                If a conflict error (409) is encountered (i.e., an item with this title already exists),
-                update the item's title by appending _1, _2, etc. and retry publishing.
-                """
-                attempt = 0
-                base_title = item.title
-                while attempt < max_attempts:
-                    try:
-                        #print(f"Attempt {attempt+1}: Publishing item with title: {item.title}")
-                        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                            future = executor.submit(item.publish, publish_parameters=publish_parameters, file_type=file_type)
-                            published_item = future.result(timeout=timeout)
-                        return published_item
-                    except Exception as e:
-                        error_str = str(e)
-                        if "409" in error_str and "already exists" in error_str:
-                            attempt += 1
-                            new_title = base_title + f"_{attempt}"
-                            print(f"Publish conflict encountered. Changing title to {new_title} and retrying...")
-                            item.update(item_properties={"title": new_title})
-                            time.sleep(1)
-                        else:
-                            raise e
-                raise Exception("Max attempts reached for publishing item with retry.")
-            # ----------------- End Helper Functions -----------------
-
-            def adjustSharingAndCapabilities(published_item):
+                        file = new_file
+                        renamed_files[original_file] = new_file
+                    else:
+                        raise e
+            raise Exception("Max attempts reached for adding item with retry.")
+        
+        def publishOrRetry(item, publish_parameters, file_type, timeout=300, max_attempts=10):
+            """
+            Attempt to publish an item with the provided publish parameters and file type.
+            If a conflict error (409) is encountered (i.e., an item with this title already exists),
+            update the item's title by appending _1, _2, etc. and retry publishing.
+            """
+            attempt = 0
+            base_title = item.title
+            while attempt < max_attempts:
                 try:
-                    refreshed_item = self.gis.content.get(published_item.id)
+                    #print(f"Attempt {attempt+1}: Publishing item with title: {item.title}")
+                    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                        future = executor.submit(item.publish, publish_parameters=publish_parameters, file_type=file_type)
+                        published_item = future.result(timeout=timeout)
+                    return published_item
                 except Exception as e:
-                    print(f"Error retrieving refreshed item: {e}")
-                    return
+                    error_str = str(e)
+                    if "409" in error_str and "already exists" in error_str:
+                        attempt += 1
+                        new_title = base_title + f"_{attempt}"
+                        print(f"Publish conflict encountered. Changing title to {new_title} and retrying...")
+                        item.update(item_properties={"title": new_title})
+                        time.sleep(1)
+                    else:
+                        raise e
+            raise Exception("Max attempts reached for publishing item with retry.")
+        # ----------------- End Helper Functions -----------------
 
-                try:
-                    item_flc = FeatureLayerCollection.fromitem(refreshed_item)
-                    update_definition_dict = {"capabilities": "Query,Extract"}
-                    item_flc.manager.update_definition(update_definition_dict)
-                except Exception as e:
-                    print(f"Error adjusting capabilities: {e}")
+        def adjustSharingAndCapabilities(published_item):
+            try:
+                refreshed_item = self.gis.content.get(published_item.id)
+            except Exception as e:
+                print(f"Error retrieving refreshed item: {e}")
+                return
 
-                try:
-                    item_sharing_mgr = refreshed_item.sharing
-                    if core.user_options.sharing_level == "EVERYONE":
-                        item_sharing_mgr.sharing_level = SharingLevel.EVERYONE
-                    elif core.user_options.sharing_level == "ORG":
-                        item_sharing_mgr.sharing_level = SharingLevel.ORG
-                    elif core.user_options.sharing_level == "PRIVATE":
-                        item_sharing_mgr.sharing_level = SharingLevel.PRIVATE
-                    else:
-                        item_sharing_mgr.sharing_level = SharingLevel.ORG
-                except Exception as e:
-                    print(f"Error adjusting sharing level: {e}")
+            try:
+                item_flc = FeatureLayerCollection.fromitem(refreshed_item)
+                update_definition_dict = {"capabilities": "Query,Extract"}
+                item_flc.manager.update_definition(update_definition_dict)
+            except Exception as e:
+                print(f"Error adjusting capabilities: {e}")
 
             try:
-                if dataset.needs_Subset:
-                    # -------------Subset file scenario-------------
-                    # -------------First file-------------
-                    first_path = paths[0]
-                    print(f"\nAdding first subset item for {dataset.dataset_id} to ArcGIS...")
-                    try:
-                        item = addOrRetry(dataset, first_path)
-                    except Exception as e:
-                        print(f"Unfortunately adding the first subset failed: {e}")
-                        dataset.has_error = True
-                        continue
+                item_sharing_mgr = refreshed_item.sharing
+                if core.user_options.sharing_level == "EVERYONE":
+                    item_sharing_mgr.sharing_level = SharingLevel.EVERYONE
+                elif core.user_options.sharing_level == "ORG":
+                    item_sharing_mgr.sharing_level = SharingLevel.ORG
+                elif core.user_options.sharing_level == "PRIVATE":
+                    item_sharing_mgr.sharing_level = SharingLevel.PRIVATE
+                else:
+                    item_sharing_mgr.sharing_level = SharingLevel.ORG
+            except Exception as e:
+                print(f"Error adjusting sharing level: {e}")
+
+        try:
+            if dataset.needs_Subset:
+                # -------------Subset file scenario-------------
+                # -------------First file-------------
+                first_path = paths[0]
+                published_item = self._resumedItem(dataset.dataset_id, rl.STAGE_PUBLISHED)
+                if published_item is None:
+                    item = self._resumedItem(dataset.dataset_id, rl.STAGE_ADDED)
+                    if item is None:
+                        print(f"\nAdding first subset item for {dataset.dataset_id} to ArcGIS...")
+                        try:
+                            item = addOrRetry(dataset, first_path)
+                        except Exception as e:
+                            print(f"Unfortunately adding the first subset failed: {e}")
+                            dataset.has_error = True
+                            return False
+                        self._recordItem(dataset.dataset_id, rl.STAGE_ADDED, item)
 
                     # Publish
                     print(f"\nPublishing item for {dataset.dataset_title}...")
@@ -643,53 +867,27 @@ class AgolWrangler:
                     except Exception as e:
                         print(f"Unfortunately publishing the file has failed: {e}")
                         dataset.has_error = True
-                        continue
-
-                    # -------------Append Subsets-------------
-                    if published_item.layers:
-                        feature_layer = published_item.layers[0]
-                        subset_idx = 1
-                        for subset_path in paths[1:]:
-                            
-                            try:
-                                subset_item = addOrRetry(dataset, subset_path)
-                            except Exception as e:
-                                print(f"\nAdding the subset item failed (addOrRetry method):\nError Message- {e}")
-                            try:
-                                analyze_params = gis.content.analyze(item=subset_item.id, file_type='csv')
-                            except Exception as e:
-                                print(f"\nAnalyzing the subset item failed (gis.content.analyze method):\nError Message- {e}")
-                            try:
-                                append_success = feature_layer.append(
-                                    item_id=subset_item.id,
-                                    upload_format='csv',
-                                    source_info=analyze_params['publishParameters'],
-                                    upsert=False,
-                                    return_messages=True
-                                )
-                            except Exception as e:
-                                print(f"\nAppending the item failed (feature_layer.append):\nError Message- {e}")
-                                                   
-                                append_success = False
-                            if append_success:
-                                subset_idx += 1
-                                print(f"\nAppended Subset {subset_idx} of {len(paths)} to {published_item.title}")
-                            else:
-                                print(f"\nFailed to append subset # {subset_idx} to {published_item.title}")
-                            if self.enterprise_bool:
-                                subset_item.delete()
-                            else:
-                                subset_item.delete(permanent= True)
-                else:
-                    #--------Single file scenario--------------
-                    path = dataset.data_filepath
-                    print(f"\nAdding item for {dataset.dataset_title} to {gis.properties.portalName}...")
-                    try:
-                        item = addOrRetry(dataset, path)
-                    except Exception as e:
-                        print(f"Unfortunately adding the file has failed: {e}")
-                        dataset.has_error = True
-                        continue
+                        return False
+                    self._recordItem(dataset.dataset_id, rl.STAGE_PUBLISHED, published_item)
+
+                # -------------Append Subsets-------------
+                if published_item.layers:
+                    self._appendSubsets(dataset, published_item, paths, addOrRetry)
+            else:
+                #--------Single file scenario--------------
+                path = dataset.data_filepath
+                published_item = self._resumedItem(dataset.dataset_id, rl.STAGE_PUBLISHED)
+                if published_item is None:
+                    item = self._resumedItem(dataset.dataset_id, rl.STAGE_ADDED)
+                    if item is None:
+                        print(f"\nAdding item for {dataset.dataset_title} to {gis.properties.portalName}...")
+                        try:
+                            item = addOrRetry(dataset, path)
+                        except Exception as e:
+                            print(f"Unfortunately adding the file has failed: {e}")
+                            dataset.has_error = True
+                            return False
+                        self._recordItem(dataset.dataset_id, rl.STAGE_ADDED, item)
                     # Publish
                     print(f"\nPublishing item for {dataset.dataset_title}...")
                     try:
@@ -698,29 +896,24 @@ class AgolWrangler:
                     except Exception as e:
                         print(f"Unfortunately publishing the file has failed: {e}")
                         dataset.has_error = True
-                        continue
-                    #--------Single file scenario--------------
-
-                dataset_end_time = time.time()
-                dataset_processing_time = dataset_end_time - dataset_start_time
-                processed_count += 1
-                print(f"Finished processing dataset {dataset.dataset_title} in {dataset_processing_time:.2f} seconds")
-
-            except concurrent.futures.TimeoutError:
-                print(f"Publishing took longer than 3 minutes for {dataset.dataset_title}. Cancelling operation.")
-                continue
-            except Exception as e:
-                print(f"An error occurred adding the item for {dataset.dataset_title}: {e}")
-                continue
+                        return False
+                    self._recordItem(dataset.dataset_id, rl.STAGE_PUBLISHED, published_item)
+                #--------Single file scenario--------------
+
+            if self.ledger:
+                self.ledger.record(dataset.dataset_id, rl.STAGE_DONE)
+            dataset_end_time = time.time()
+            dataset_processing_time = dataset_end_time - dataset_start_time
+            print(f"Finished processing dataset {dataset.dataset_title} in {dataset_processing_time:.2f} seconds")
+            return True
+
+        except concurrent.futures.TimeoutError:
+            print(f"Publishing took longer than 3 minutes for {dataset.dataset_title}. Cancelling operation.")
+            return False
+        except Exception as e:
+            print(f"An error occurred adding the item for {dataset.dataset_title}: {e}")
+            return False
 
-        total_end_time = time.time()
-        total_time = total_end_time - total_start_time
-        if processed_count == 0:
-            print("\n 0 datasets processed")
-        else:
-            print("\nAll done!")
-            print(f"Processing completed for {processed_count} datasets")
-            print(f"Total processing time: {total_time:.2f} seconds")
 
 
 
@@ -763,61 +956,23 @@ class AgolWrangler:
 
     @skipFromError
     #@profile
-    def pointTableToGeojsonLine(self,  X="longitude (degrees_east)", Y="latitude (degrees_north)") -> None:
-        """For converting standard ERDDAP csvp into geojson"""
-        for dataset in self.datasets:
+    def pointTableToGeojsonLine(self,  X="longitude (degrees_east)", Y="latitude (degrees_north)", datasets: list = None) -> None:
+        """For converting standard ERDDAP csvp into geojson, `datasets` defaults to self.datasets.
+        Segments are built column-wise and streamed to disk, with user_options.glider_track_mode
+        the track is merged per dive / profile or time bucket instead, see glider_tracks."""
+        for dataset in (datasets if datasets is not None else self.datasets):
             if dataset.is_glider == True:
                 filepath = dataset.data_filepath
                 if dataset.data_filepath:
                     print(f"\nConverting {filepath} to GeoJSON...")
-                    df = pd.read_csv(filepath, low_memory=False)
-
-                    # Replace NaN with None in the entire DataFrame
-                    df = df.replace({np.nan: None})
-
-                    # Filter out rows with invalid coordinates
-                    df = df.dropna(subset=[X, Y])
-
-                    features = []
-                    data_columns = [col for col in df.columns if col not in [X, Y]]
-                    num_points = len(df)
-
-                    for i in range(num_points - 1):
-                        # Coordinates for the line segment
-                        line_start = [df.iloc[i][X], df.iloc[i][Y]]
-                        line_end = [df.iloc[i + 1][X], df.iloc[i + 1][Y]]
-                        coordinates = [line_start, line_end]
-
-                        # Skip if any coordinate is None
-                        if None in line_start or None in line_end:
-                            continue
-
-                        # Properties from the last point of the segment
-                        properties = df.iloc[i + 1][data_columns].to_dict()
-
-                        # Create the GeoJSON feature for the line segment
-                        feature = {
-                            "type": "Feature",
-                            "geometry": {
-                                "type": "LineString",
-                                "coordinates": coordinates
-                            },
-                            "properties": properties
-                        }
-
-                        features.append(feature)
-
-                    # Assemble the FeatureCollection
-                    geojson = {
-                        "type": "FeatureCollection",
-                        "features": features
-                    }
                     savedir = ec.getTempDir()
                     filename = dataset.dataset_id + "_line.geojson"
                     savepath = os.path.join(savedir, filename)
-                    with open(savepath, "w") as f:
-                        json.dump(geojson, f)
-                    print(f"\nGeoJSON conversion complete @ {savepath}.")
+                    mode = core.user_options.glider_track_mode or "segments"
+                    feature_count = gt.csvToLineGeojson(filepath, savepath, X, Y, mode=mode,
+                                                        tolerance_m=core.user_options.glider_simplify_meters,
+                                                        columnar_path=dataset.columnar_filepath)
+                    print(f"\nGeoJSON conversion complete @ {savepath} ({feature_count} {mode} features).")
                     setattr(dataset, "data_filepath", savepath)
                 else:
                     sys.exit()
\ No newline at end of file
@@ -0,0 +1,166 @@
+import json, time, concurrent.futures
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from . import catalog_index as ci
+from . import erddap_wrangler as ec
+
+#--------------------------------------------------------------------------------
+# Multi-server catalog harvest.
+# Fetches allDatasets from many ERDDAPs at once (one catalog index per server, see
+# catalog_index) and searches them as a single catalog. Every result carries the
+# server it comes from. A dataset mirrored on several servers (same datasetID and
+# title) is returned once, from the copy with the latest data, then the fastest
+# server, and lists the other servers as mirrors.
+#--------------------------------------------------------------------------------
+
+HARVEST_WORKERS = 16
+
+
+@dataclass
+class CatalogEntry:
+    dataset_id: str
+    server: str
+    title: str = ""
+    min_time: str = ""
+    max_time: str = ""
+    protocols: str = ""
+    mirrors: List[str] = field(default_factory=list)
+
+    @property
+    def url(self) -> str:
+        protocol = "griddap" if self.protocols == "g" else "tabledap"
+        return f"{self.server}/{protocol}/{self.dataset_id}"
+
+
+@dataclass
+class HarvestedCatalog:
+    # catalog index per ERDDAP root, in the order the servers were given
+    indexes: Dict[str, ci.CatalogIndex] = field(default_factory=dict)
+    failed: List[str] = field(default_factory=list)
+    # (datasetID, title) -> (root, position) of every copy, preferred copy first
+    _copies: Dict[Tuple[str, str], List[Tuple[str, int]]] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        self.dedupe()
+
+    def __len__(self):
+        return len(self._copies)
+
+    def dedupe(self, health: Dict[str, Dict] = None) -> None:
+        """Group the copies of mirrored datasets, preferring the latest maxTime, then the lowest latency"""
+        health = ec.loadHealth() if health is None else health
+        order = {root: i for i, root in enumerate(self.indexes)}
+        latency = lambda root: health.get(root, {}).get("latency_ms", float("inf"))
+
+        self._copies = {}
+        for root, index in self.indexes.items():
+            for pos, (ds_id, title) in enumerate(zip(index.ids, index.titles)):
+                self._copies.setdefault(_mirrorKey(ds_id, title), []).append((root, pos))
+
+        for holders in self._copies.values():
+            if len(holders) > 1:
+                # latest maxTime first, ISO strings sort as times; ties go to the faster, then earlier server
+                holders.sort(key=lambda h: (latency(h[0]), order[h[0]]))
+                holders.sort(key=lambda h: self.indexes[h[0]].max_times[h[1]] or "", reverse=True)
+
+    def entries(self) -> List[CatalogEntry]:
+        """Every harvested dataset once, in server order"""
+        return [self._entry(root, pos) for root, index in self.indexes.items()
+                for pos in range(len(index.ids)) if self._isPrimary(root, index, pos)]
+
+    def search(self, query: str = "", protocol: Optional[str] = None, start=None, end=None,
+               bbox: Optional[Tuple[float, float, float, float]] = None) -> List[CatalogEntry]:
+        """CatalogIndex.search over every server, best matches first, mirrors collapsed into one entry"""
+        hits = []
+        for order, (root, index) in enumerate(self.indexes.items()):
+            for pos, score in index.scoredSearch(query, protocol, start, end, bbox):
+                hits.append((-score, order, pos, root))
+        hits.sort(key=lambda hit: hit[:3])
+
+        results, seen = [], set()
+        for _, _, pos, root in hits:
+            index = self.indexes[root]
+            key = _mirrorKey(index.ids[pos], index.titles[pos])
+            if key in seen:
+                continue
+            seen.add(key)
+            # the preferred copy stands for the dataset even if only a mirror matched
+            results.append(self._entry(*self._copies.get(key, [(root, pos)])[0]))
+        return results
+
+    def nrtCandidates(self, query: str = "", days: int = 7, protocol: Optional[str] = "tabledap",
+                      bbox: Optional[Tuple[float, float, float, float]] = None) -> List[CatalogEntry]:
+        """Datasets with data inside the last `days` days, the candidates for NRT items"""
+        start = datetime.now(timezone.utc) - timedelta(days=days)
+        return self.search(query, protocol=protocol, start=start, bbox=bbox)
+
+    #---------------------Helpers---------------------
+    def _isPrimary(self, root: str, index: ci.CatalogIndex, pos: int) -> bool:
+        copies = self._copies.get(_mirrorKey(index.ids[pos], index.titles[pos]))
+        return not copies or copies[0][0] == root
+
+    def _entry(self, root: str, pos: int) -> CatalogEntry:
+        index = self.indexes[root]
+        copies = self._copies.get(_mirrorKey(index.ids[pos], index.titles[pos]), [(root, pos)])
+        return CatalogEntry(
+            dataset_id=index.ids[pos],
+            server=root,
+            title=index.titles[pos],
+            min_time=index.min_times[pos],
+            max_time=index.max_times[pos],
+            protocols=index.protocols[pos],
+            mirrors=[r for r, _ in copies if r != root],
+        )
+
+
+def _mirrorKey(dataset_id: str, title: str) -> Tuple[str, str]:
+    # the title guards against unrelated datasets that share a generic id
+    return dataset_id, " ".join(ci.tokenize(title))
+
+def registryServers(include_down: bool = False) -> List[str]:
+    """ERDDAP roots from the cached awesome-erddap list, skipping servers last probed as down"""
+    filepath = ec.getErddapList()
+    if not filepath:
+        return []
+    with open(filepath, 'r') as f:
+        data = json.load(f)
+    health = ec.loadHealth()
+    roots = []
+    for erddap in data:
+        baseurl = ec.erddapBaseUrl(erddap['url'])
+        if not include_down and health.get(baseurl, {}).get("up") is False:
+            continue
+        root = ci.erddapRoot(baseurl)
+        if root not in roots:
+            roots.append(root)
+    return roots
+
+def harvestCatalogs(servers: List[str] = None, refresh: bool = False, ttl: int = None,
+                    max_workers: int = HARVEST_WORKERS) -> HarvestedCatalog:
+    """
+    Catalog indexes of `servers` (default: every server of the ERDDAP list not known to be
+    down), built or refreshed concurrently, as one searchable HarvestedCatalog. Servers
+    that have neither a saved index nor answer are listed in .failed.
+    """
+    roots = list(dict.fromkeys(ci.erddapRoot(s) for s in (servers or registryServers())))
+    if not roots:
+        return HarvestedCatalog()
+    started = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(roots)))) as executor:
+        indexes = list(executor.map(lambda root: ci.getCatalogIndex(root, refresh, ttl), roots))
+
+    catalog = HarvestedCatalog(
+        indexes={root: index for root, index in zip(roots, indexes) if index is not None},
+        failed=[root for root, index in zip(roots, indexes) if index is None],
+    )
+    print(f"Harvested {len(catalog)} datasets from {len(catalog.indexes)} of {len(roots)} "
+          f"ERDDAP servers in {time.time() - started:.1f}s")
+    return catalog
+
+def datasetsByServer(entries: List[CatalogEntry]) -> Dict[str, List[str]]:
+    """{ERDDAP root: [dataset ids]} for building an ERDDAPHandler per server"""
+    grouped: Dict[str, List[str]] = {}
+    for entry in entries:
+        grouped.setdefault(entry.server, []).append(entry.dataset_id)
+    return grouped
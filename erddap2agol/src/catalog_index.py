@@ -0,0 +1,279 @@
+import os, re, json, gzip, time, hashlib
+from bisect import bisect_left
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from . import http_client as http
+
+#--------------------------------------------------------------------------------
+# Local catalog index for dataset search.
+# One index per ERDDAP server, built from a single allDatasets request: dataset ids,
+# titles, time ranges, bounding boxes, protocols and an inverted index of the words in
+# each dataset's id, title, summary, institution and keywords. Saved gzipped under
+# AGOL_HOME, so keyword searches are answered in memory (and offline) instead of
+# re-querying the server. Terms match words by prefix and all terms must match,
+# '-term' excludes datasets, results are ranked by where the terms matched.
+#--------------------------------------------------------------------------------
+
+INDEX_VERSION = 1
+CATALOG_INDEX_TTL = 24 * 3600
+CATALOG_COLUMNS = (
+    "datasetID", "title", "summary", "institution", "cdm_data_type",
+    "minLongitude", "maxLongitude", "minLatitude", "maxLatitude",
+    "minTime", "maxTime", "griddap", "tabledap",
+)
+# score of a term matched in each field, a dataset ranks by its summed scores
+_FIELD_WEIGHTS = {"title": 3, "id": 2, "text": 1}
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def getIndexDir() -> str:
+    agol_home = os.getenv('AGOL_HOME', '/arcgis/home')
+    index_dir = os.path.join(agol_home, 'e2a_catalog_index')
+    os.makedirs(index_dir, exist_ok=True)
+    return index_dir
+
+def erddapRoot(server: str) -> str:
+    """https://host/erddap for any url under it"""
+    return server.split("/erddap", 1)[0].rstrip("/") + "/erddap"
+
+def _indexPath(root: str) -> str:
+    key = hashlib.sha1(root.encode("utf-8")).hexdigest()
+    return os.path.join(getIndexDir(), f"{key}.json.gz")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or "").lower())
+
+def _isoTime(value) -> str:
+    """Catalog-style UTC time string for a datetime or ISO string, "" for none"""
+    if not value:
+        return ""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class CatalogIndex:
+    root: str
+    built_at: float = 0.0
+    # per-dataset columns, position i describes ids[i]
+    ids: List[str] = field(default_factory=list)
+    titles: List[str] = field(default_factory=list)
+    min_times: List[str] = field(default_factory=list)
+    max_times: List[str] = field(default_factory=list)
+    bboxes: List[Optional[list]] = field(default_factory=list)
+    protocols: List[str] = field(default_factory=list)
+    # sorted vocabulary and, per word, its datasets packed as position << 2 | field score
+    tokens: List[str] = field(default_factory=list)
+    postings: List[list] = field(default_factory=list)
+    _positions: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+
+    #---------------------Build / persist---------------------
+    @classmethod
+    def fromCatalog(cls, root: str, data: dict) -> "CatalogIndex":
+        """Index an allDatasets JSON table"""
+        cols = [c.lower() for c in data["table"]["columnNames"]]
+        col = lambda name: cols.index(name.lower()) if name.lower() in cols else None
+        idx = {name: col(name) for name in CATALOG_COLUMNS + ("keywords",)}
+        get = lambda row, name: row[idx[name]] if idx[name] is not None and row[idx[name]] is not None else ""
+
+        index = cls(root=root, built_at=time.time())
+        words: Dict[str, Dict[int, int]] = {}
+        for row in data["table"]["rows"]:
+            ds_id = get(row, "datasetID")
+            if not ds_id or ds_id == "allDatasets":
+                continue
+            pos = len(index.ids)
+            index.ids.append(ds_id)
+            index.titles.append(get(row, "title"))
+            index.min_times.append(get(row, "minTime"))
+            index.max_times.append(get(row, "maxTime"))
+            bbox = [_number(get(row, n)) for n in ("minLongitude", "minLatitude", "maxLongitude", "maxLatitude")]
+            index.bboxes.append(bbox if None not in bbox else None)
+            index.protocols.append("".join(p[0] for p in ("griddap", "tabledap") if get(row, p)))
+
+            text = " ".join(str(get(row, n)) for n in ("summary", "institution", "keywords", "cdm_data_type"))
+            for field_name, source in (("title", index.titles[-1]), ("id", ds_id), ("text", text)):
+                weight = _FIELD_WEIGHTS[field_name]
+                for token in set(tokenize(source)):
+                    scores = words.setdefault(token, {})
+                    scores[pos] = max(scores.get(pos, 0), weight)
+
+        index.tokens = sorted(words)
+        index.postings = [sorted(pos << 2 | score for pos, score in words[token].items()) for token in index.tokens]
+        return index
+
+    @classmethod
+    def load(cls, root: str) -> Optional["CatalogIndex"]:
+        try:
+            with gzip.open(_indexPath(root), "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if payload.pop("version", None) != INDEX_VERSION or payload.get("root") != root:
+            return None
+        return cls(**payload)
+
+    def save(self) -> str:
+        filepath = _indexPath(self.root)
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        payload = {"version": INDEX_VERSION, **{f.name: getattr(self, f.name) for f in fields(self) if f.init}}
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, filepath)
+        return filepath
+
+    def isFresh(self, ttl: int = None) -> bool:
+        ttl = CATALOG_INDEX_TTL if ttl is None else ttl
+        return (time.time() - self.built_at) < ttl
+
+    #---------------------Search---------------------
+    def _prefixScores(self, prefix: str) -> Dict[int, int]:
+        """{dataset position: best field score} over every word starting with `prefix`"""
+        scores: Dict[int, int] = {}
+        i = bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            for packed in self.postings[i]:
+                pos, score = packed >> 2, packed & 3
+                if score > scores.get(pos, 0):
+                    scores[pos] = score
+            i += 1
+        return scores
+
+    def _inTime(self, pos: int, start: str, end: str) -> bool:
+        # catalog times are uniform ISO strings, so they compare as text
+        min_t, max_t = self.min_times[pos], self.max_times[pos]
+        if start and max_t and max_t < start:
+            return False
+        if end and min_t and min_t > end:
+            return False
+        return True
+
+    def _inBbox(self, pos: int, bbox: Tuple[float, float, float, float]) -> bool:
+        ds_bbox = self.bboxes[pos]
+        if ds_bbox is None:
+            return True
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if ds_bbox[3] < min_lat or ds_bbox[1] > max_lat:
+            return False
+        # 0..360 datasets are also tried against the query shifted east
+        return any(ds_bbox[2] >= min_lon + shift and ds_bbox[0] <= max_lon + shift for shift in (0, 360))
+
+    def search(self, query: str = "", protocol: Optional[str] = None, start=None, end=None,
+               bbox: Optional[Tuple[float, float, float, float]] = None) -> List[str]:
+        """
+        Dataset ids matching every term of `query` ('+' or space separated, '-term' excludes),
+        best matches first. `start` / `end` keep datasets whose time range overlaps them,
+        `bbox` (min lon, min lat, max lon, max lat) those whose extent overlaps it.
+        """
+        return [self.ids[pos] for pos, _ in self.scoredSearch(query, protocol, start, end, bbox)]
+
+    def scoredSearch(self, query: str = "", protocol: Optional[str] = None, start=None, end=None,
+                     bbox: Optional[Tuple[float, float, float, float]] = None) -> List[Tuple[int, int]]:
+        """search() as (dataset position, score) pairs, for ranking across several indexes"""
+        include, exclude = [], []
+        for term in re.split(r"[+\s]+", (query or "").strip()):
+            if not term:
+                continue
+            target = exclude if term.startswith("-") else include
+            target.extend(tokenize(term.lstrip("-")))
+
+        if include:
+            totals = self._prefixScores(include[0])
+            for term in include[1:]:
+                scores = self._prefixScores(term)
+                totals = {pos: total + scores[pos] for pos, total in totals.items() if pos in scores}
+        else:
+            totals = dict.fromkeys(range(len(self.ids)), 0)
+        for term in exclude:
+            for pos in self._prefixScores(term):
+                totals.pop(pos, None)
+
+        start, end = _isoTime(start), _isoTime(end)
+        flag = protocol[0] if protocol else ""
+        matches = [
+            pos for pos in totals
+            if flag in self.protocols[pos]
+            and (not (start or end) or self._inTime(pos, start, end))
+            and (bbox is None or self._inBbox(pos, bbox))
+        ]
+        # best score first, catalog order within a score
+        matches.sort(key=lambda pos: (-totals[pos], pos))
+        return [(pos, totals[pos]) for pos in matches]
+
+    def describe(self, dataset_ids: List[str]) -> Tuple[Dict[str, str], Dict[str, Tuple[str, str]]]:
+        """({id: title}, {id: (min time, max time)}) for indexed datasets"""
+        if len(self._positions) != len(self.ids):
+            self._positions = {ds_id: pos for pos, ds_id in enumerate(self.ids)}
+        titles, dates = {}, {}
+        for ds_id in dataset_ids:
+            pos = self._positions.get(ds_id)
+            if pos is not None:
+                titles[ds_id] = self.titles[pos]
+                dates[ds_id] = (self.min_times[pos], self.max_times[pos])
+        return titles, dates
+
+
+def parseQuery(text: str) -> Tuple[str, Optional[str], Optional[str], Optional[tuple]]:
+    """
+    Split a search box entry into (terms, start, end, bbox). Besides the terms it may hold
+    time:START/END (ISO dates, either side can be left empty) and bbox:W,S,E,N filters.
+    """
+    terms, start, end, bbox = [], None, None, None
+    for part in re.split(r"[+\s]+", (text or "").strip()):
+        lowered = part.lower()
+        if lowered.startswith("time:"):
+            start, _, end = part[5:].partition("/")
+            start, end = start or None, end or None
+        elif lowered.startswith("bbox:"):
+            values = [float(v) for v in part[5:].split(",")]
+            if len(values) != 4:
+                raise ValueError("bbox needs four values, W,S,E,N")
+            bbox = tuple(values)
+        elif part:
+            terms.append(part)
+    return " ".join(terms), start, end, bbox
+
+def catalogUrl(root: str, columns: bool = True) -> str:
+    url = f"{root}/tabledap/allDatasets.json"
+    return f"{url}?{','.join(CATALOG_COLUMNS)}" if columns else url
+
+def fetchCatalog(root: str, timeout: int = 60) -> dict:
+    """allDatasets with only the indexed columns, the whole table if the server rejects the column list"""
+    response = http.get(catalogUrl(root), timeout=timeout)
+    if response.status_code >= 400:
+        response = http.get(catalogUrl(root, columns=False), timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+def getCatalogIndex(server: str, refresh: bool = False, ttl: int = None) -> Optional[CatalogIndex]:
+    """
+    The catalog index of `server`'s ERDDAP: the saved copy while it is fresh, otherwise
+    rebuilt from allDatasets. A stale copy is still used when the server can't be reached.
+    None only if there is neither a saved index nor a reachable server.
+    """
+    root = erddapRoot(server)
+    index = CatalogIndex.load(root)
+    if index and index.isFresh(ttl) and not refresh:
+        return index
+    try:
+        started = time.time()
+        fresh = CatalogIndex.fromCatalog(root, fetchCatalog(root))
+        fresh.save()
+        print(f"Indexed {len(fresh.ids)} datasets from {root} in {time.time() - started:.1f}s")
+        return fresh
+    except Exception as e:
+        if index:
+            print(f"Could not refresh the catalog index of {root} ({e}), using the saved copy")
+            return index
+        print(f"Could not build a catalog index for {root}: {e}")
+        return None
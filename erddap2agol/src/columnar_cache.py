@@ -0,0 +1,112 @@
+import os
+from typing import Dict, List, Optional
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:     # optional, the cache is simply off without it
+    pa = None
+
+#--------------------------------------------------------------------------------
+# Columnar cache of downloaded tabledap data.
+# Each downloaded csvp is converted once to a Parquet file next to it, with column
+# types taken from the DAS instead of guessed from text (times as UTC timestamps,
+# numbers at the width ERDDAP stores them). Glider conversion and later passes read
+# only the columns they need from the memory-mapped file rather than re-parsing the
+# CSV. The CSV stays the file that is uploaded. Needs pyarrow.
+#--------------------------------------------------------------------------------
+
+PARQUET_SUFFIX = ".parquet"
+# csvp blocks converted at a time, a file is never read into memory as a whole
+READ_BLOCK_BYTES = 16 << 20
+NULL_VALUES = ["", "NaN", "NA", "null"]
+
+if pa is not None:
+    _DAS_TYPES = {
+        "Byte": pa.int8(), "UByte": pa.uint8(), "Int16": pa.int16(), "UInt16": pa.uint16(),
+        "Int32": pa.int32(), "UInt32": pa.uint32(), "Int64": pa.int64(), "UInt64": pa.uint64(),
+        "long": pa.int64(), "Float32": pa.float32(), "Float64": pa.float64(),
+        "String": pa.string(), "char": pa.string(),
+    }
+# attributes that carry the variable's own data type, in order of trust
+_TYPED_ATTRIBUTES = ("actual_range", "_FillValue", "missing_value", "data_min")
+
+
+def available() -> bool:
+    return pa is not None
+
+def columnarPath(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + PARQUET_SUFFIX
+
+def _baseName(col: str) -> str:
+    # csvp headers carry the units, "sst (degree_C)"
+    return str(col).split(" (", 1)[0].strip()
+
+def dasColumnTypes(das_dict: Optional[Dict]) -> Dict[str, "pa.DataType"]:
+    """{variable: pyarrow type} from a parsed DAS, time variables ("... since ...") as UTC timestamps"""
+    if pa is None or not das_dict:
+        return {}
+    types = {}
+    for var, attrs in das_dict.items():
+        if var == "NC_GLOBAL" or not isinstance(attrs, dict):
+            continue
+        units = str(attrs.get("units", {}).get("value", ""))
+        if " since " in units:
+            types[var] = pa.timestamp("s", tz="UTC")
+            continue
+        for name in _TYPED_ATTRIBUTES:
+            datatype = attrs.get(name, {}).get("datatype")
+            if datatype in _DAS_TYPES:
+                types[var] = _DAS_TYPES[datatype]
+                break
+    return types
+
+def _convert(csv_path: str, parquet_path: str, column_types: Dict) -> int:
+    convert = pacsv.ConvertOptions(column_types=column_types, null_values=NULL_VALUES,
+                                   strings_can_be_null=True, timestamp_parsers=[pacsv.ISO8601])
+    reader = pacsv.open_csv(csv_path, read_options=pacsv.ReadOptions(block_size=READ_BLOCK_BYTES),
+                            convert_options=convert)
+    rows = 0
+    with pq.ParquetWriter(parquet_path, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+def csvToParquet(csv_path: str, das_dict: Optional[Dict] = None, parquet_path: str = None) -> Optional[str]:
+    """
+    Convert a csvp to Parquet with the DAS column types, returns the Parquet path.
+    If a column's values don't fit its type the file is converted again with every
+    column as text. None (and nothing written) if pyarrow is missing.
+    """
+    if pa is None:
+        return None
+    parquet_path = parquet_path or columnarPath(csv_path)
+    das_types = dasColumnTypes(das_dict)
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    column_types = {col: das_types[_baseName(col)] for col in columns if _baseName(col) in das_types}
+
+    tmp_path = f"{parquet_path}.part"
+    try:
+        try:
+            _convert(csv_path, tmp_path, column_types)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            print(f"\nColumn types did not fit {os.path.basename(csv_path)} ({e}), caching it as text")
+            _convert(csv_path, tmp_path, {col: pa.string() for col in columns})
+        os.replace(tmp_path, parquet_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return parquet_path
+
+def readColumns(parquet_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """`columns` of a cached file (all by default), memory-mapped"""
+    return pq.read_table(parquet_path, columns=columns, memory_map=True).to_pandas()
+
+def readTable(csv_path: str, columns: Optional[List[str]] = None, parquet_path: Optional[str] = None) -> pd.DataFrame:
+    """A downloaded table from its columnar copy when there is one, from the csvp otherwise"""
+    if pa is not None and parquet_path and os.path.exists(parquet_path):
+        return readColumns(parquet_path, columns)
+    return pd.read_csv(csv_path, usecols=columns, low_memory=False)
@@ -1,16 +1,21 @@
-import sys, os, concurrent.futures, time, math, shlex, argparse
+import sys, os, time, math, shlex, argparse, shutil, tempfile
 from tabulate import tabulate
 from . import erddap_wrangler as ec
 from . import agol_wrangler as aw
 from . import data_wrangler as dw
 from . import update_manager as um
+from . import http_client as http
+from . import glider_tracks as gt
+from . import catalog_index as ci
+from . import worker_pool as wp
+from . import run_ledger as rl
 from erddap2agol import run
 from src.utils import OverwriteFS
 from IPython.display import clear_output
 from arcgis.gis import GIS
 from typing import Optional, Dict, List, Union
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 
 ###################################
@@ -182,7 +187,8 @@ def selectDatasetFromList(erddapObj, dispLength: int = 50, interactive: bool = T
             self.user_start_date = None
             self.user_end_date =  None
             self.division = None
-            
+            # built on the first search, see catalog_index
+            self._catalogIndex = None
 
         @property
         def totalDatasets(self):
@@ -216,14 +222,44 @@ def selectDatasetFromList(erddapObj, dispLength: int = 50, interactive: bool = T
         def searchDatasets(self, search_term):
             """
             Update the dataset list with a new search term and reset the page to 1.
+            With user_options.catalog_index_bool the search runs against the server's
+            local catalog index, the server's search endpoint is the fallback.
             """
-            new_list = _updateDatasetList(self.erddapObj, search_term)
+            new_list = None
+            if user_options.catalog_index_bool:
+                try:
+                    new_list = self._searchIndex(search_term)
+                except ValueError as e:
+                    print(f"Invalid search filter: {e}")
+                    return
+            if new_list is None:
+                new_list = _updateDatasetList(self.erddapObj, search_term)
             if not new_list:
                 print(f"No datasets found matching '{search_term}'.")
             self._allDatasetIds = new_list
             self.currentPage = 1
             self.numPages = math.ceil(len(self._allDatasetIds) / self._dispLength)
 
+        def _searchIndex(self, search_term):
+            """Dataset IDs for a search from the catalog index, None if the server has no index"""
+            if self._catalogIndex is None:
+                # False remembers a server without an index, so it isn't retried on every search
+                self._catalogIndex = ci.getCatalogIndex(self.erddapObj.server) or False
+            if self._catalogIndex is False:
+                return None
+            terms, start, end, bbox = ci.parseQuery(search_term)
+            if self.erddapObj.is_nrt and not start:
+                # same window as the NRT advanced search, datasets with data in the last days
+                start = datetime.now(timezone.utc) - timedelta(days=self.erddapObj.moving_window_days)
+            id_list = self._catalogIndex.search(terms, protocol=self.protocol, start=start, end=end, bbox=bbox)
+
+            titles, dates = self._catalogIndex.describe(id_list)
+            self.erddapObj.dataset_titles.clear()
+            self.erddapObj.dataset_titles.update(titles)
+            self.erddapObj.dataset_dates.clear()
+            self.erddapObj.dataset_dates.update(dates)
+            return id_list
+
         def addPage(self):
             """
             Add all datasets on the current page to the cart.
@@ -417,6 +453,7 @@ def selectDatasetFromList(erddapObj, dispLength: int = 50, interactive: bool = T
             print("\nCommands:")
             print("'next', 'back', 'addAll', 'addPage', 'done', 'mainMenu', 'exit'")
             print("Type 'search:keyword1+keyword2' to search datasets.")
+            print("Search filters: 'time:2020-01-01/2021-01-01', 'bbox:W,S,E,N'")
             print("Specify date range with -l (latest) OR -sd dd/mm/yyyy AND -ed dd/mm/yyyy")
             print("Use '-div' and 'day', 'week', or 'month' to specify division (not required)")
 
@@ -509,6 +546,7 @@ def selectDatasetFromList(erddapObj, dispLength: int = 50, interactive: bool = T
             print("\nCommands:")
             print("'next', 'back', 'addAll', 'addPage', 'done', 'mainMenu', 'exit'")
             print(" type 'search:keyword1+keyword2' to search datasets.")
+            print(" search filters: 'time:2020-01-01/2021-01-01', 'bbox:W,S,E,N'")
             print(" enter comma-separated indices (e.g. '10,12:15') for single or range selection.")
             user_input = input(": ")
 
@@ -556,6 +594,27 @@ class OptionsMenu:
     additional_tags: List[str] = None
     bounds: tuple = None
     mult_dim_bool: bool = True
+    max_requests_per_host: int = 4
+    subset_workers: int = 4
+    subset_upload_workers: int = 4
+    pipeline_download_workers: int = 2
+    pipeline_publish_workers: int = 2
+    pipeline_queue_size: int = 2
+    validate_downloads_bool: bool = True
+    das_cache_bool: bool = True
+    persist_das_bool: bool = False
+    nrt_incremental_bool: bool = True
+    run_ledger_bool: bool = True
+    adaptive_chunking_bool: bool = True
+    split_retry_depth: int = 6
+    glider_track_mode: str = "segments"
+    glider_simplify_meters: float = 0.0
+    catalog_index_bool: bool = True
+    nrt_retry_attempts: int = 2
+    nrt_cycle_budget: int = 0
+    nrt_change_detection_bool: bool = True
+    in_memory_upload_bool: bool = True
+    columnar_cache_bool: bool = False
     # share_to_group
 
     def customTitleMenu(self, dataset): 
@@ -627,6 +686,22 @@ def options_menu():
             print("9. Define bounds with Content Item ID (griddap only)")
 
         print("10. Toggle Multidimensional Imagery Option (currently: {})".format(user_options.mult_dim_bool))
+        print("11. Concurrency Settings")
+        print("12. Toggle Download Validation (currently: {})".format(user_options.validate_downloads_bool))
+        print("13. Toggle DAS Metadata Cache (currently: {})".format(user_options.das_cache_bool))
+        print("14. Toggle Writing DAS JSON to Config Dir (currently: {})".format(user_options.persist_das_bool))
+        print("15. Toggle Incremental NRT Updates (currently: {})".format(user_options.nrt_incremental_bool))
+        print("16. Toggle Resumable Run Ledger (currently: {})".format(user_options.run_ledger_bool))
+        print("17. Toggle Adaptive Chunk Planning (currently: {})".format(user_options.adaptive_chunking_bool))
+        print("18. Change Split-and-Retry Depth on 413/Timeout (currently: {})".format(user_options.split_retry_depth))
+        print("19. Select Glider Track Mode (currently: {})".format(user_options.glider_track_mode))
+        print("20. Change Glider Track Simplification Tolerance (currently: {} m)".format(user_options.glider_simplify_meters))
+        print("21. Toggle Local Catalog Search Index (currently: {})".format(user_options.catalog_index_bool))
+        print("22. Change NRT Retries / Cycle Budget (currently: {} retries, {} s)".format(
+            user_options.nrt_retry_attempts, user_options.nrt_cycle_budget or "no limit"))
+        print("23. Toggle NRT Change Detection (currently: {})".format(user_options.nrt_change_detection_bool))
+        print("24. Toggle In-Memory Uploads for Small Datasets (currently: {})".format(user_options.in_memory_upload_bool))
+        print("25. Toggle Columnar (Parquet) Cache of Downloads (currently: {})".format(user_options.columnar_cache_bool))
         
         print("\nType **done** to save options and return to main menu")
         
@@ -733,6 +808,93 @@ def options_menu():
             user_options.mult_dim_bool = not user_options.mult_dim_bool
             print("Bypass chunking toggled to: {}".format(user_options.bypass_chunking_bool))
 
+        elif choice == "11":
+            concurrency_menu()
+
+        elif choice == "12":
+            user_options.validate_downloads_bool = not user_options.validate_downloads_bool
+            print("Download validation toggled to: {}".format(user_options.validate_downloads_bool))
+
+        elif choice == "13":
+            user_options.das_cache_bool = not user_options.das_cache_bool
+            print("DAS metadata cache toggled to: {}".format(user_options.das_cache_bool))
+
+        elif choice == "14":
+            user_options.persist_das_bool = not user_options.persist_das_bool
+            print("DAS JSON persistence toggled to: {}".format(user_options.persist_das_bool))
+
+        elif choice == "15":
+            user_options.nrt_incremental_bool = not user_options.nrt_incremental_bool
+            print("Incremental NRT updates toggled to: {}".format(user_options.nrt_incremental_bool))
+
+        elif choice == "16":
+            user_options.run_ledger_bool = not user_options.run_ledger_bool
+            print("Resumable run ledger toggled to: {}".format(user_options.run_ledger_bool))
+
+        elif choice == "17":
+            user_options.adaptive_chunking_bool = not user_options.adaptive_chunking_bool
+            print("Adaptive chunk planning toggled to: {}".format(user_options.adaptive_chunking_bool))
+
+        elif choice == "18":
+            uc = input("Input how many times an oversized request may be halved (0 disables splitting): ")
+            try:
+                depth = int(uc)
+                if depth < 0:
+                    raise ValueError("depth can't be negative")
+                user_options.split_retry_depth = depth
+            except Exception as e:
+                print(f"Invalid input {e}")
+
+        elif choice == "19":
+            print("\nGlider Track Modes:")
+            print("1. segments - a line per pair of points (default)")
+            print("2. profile  - a multiline per dive / profile")
+            print("3. hour     - a multiline per hour")
+            print("4. day      - a multiline per day")
+            sel = input("Select a track mode by number: ").strip()
+            try:
+                user_options.glider_track_mode = gt.TRACK_MODES[int(sel) - 1]
+                print("Glider track mode set to: {}".format(user_options.glider_track_mode))
+            except (ValueError, IndexError):
+                print("Invalid selection. Please choose a valid number.")
+
+        elif choice == "20":
+            uc = input("Input the simplification tolerance in meters for merged glider tracks (0 keeps every point): ")
+            try:
+                tolerance = float(uc)
+                if tolerance < 0:
+                    raise ValueError("tolerance can't be negative")
+                user_options.glider_simplify_meters = tolerance
+            except Exception as e:
+                print(f"Invalid input {e}")
+
+        elif choice == "21":
+            user_options.catalog_index_bool = not user_options.catalog_index_bool
+            print("Local catalog search index toggled to: {}".format(user_options.catalog_index_bool))
+
+        elif choice == "22":
+            try:
+                retries = int(input("Input how often a timed out NRT item is retried (0 disables retries): "))
+                budget = int(input("Input the time limit for a whole NRT update in seconds (0 for no limit): "))
+                if retries < 0 or budget < 0:
+                    raise ValueError("values can't be negative")
+                user_options.nrt_retry_attempts = retries
+                user_options.nrt_cycle_budget = budget
+            except Exception as e:
+                print(f"Invalid input {e}")
+
+        elif choice == "23":
+            user_options.nrt_change_detection_bool = not user_options.nrt_change_detection_bool
+            print("NRT change detection toggled to: {}".format(user_options.nrt_change_detection_bool))
+
+        elif choice == "24":
+            user_options.in_memory_upload_bool = not user_options.in_memory_upload_bool
+            print("In-memory uploads toggled to: {}".format(user_options.in_memory_upload_bool))
+
+        elif choice == "25":
+            user_options.columnar_cache_bool = not user_options.columnar_cache_bool
+            print("Columnar cache toggled to: {}".format(user_options.columnar_cache_bool))
+
         elif choice == "done":
             print("\nOptions saved. Returning to Main Menu...")
             time.sleep(0.5)
@@ -740,11 +902,44 @@ def options_menu():
             break
         else:
             print("Invalid option. Please select again.")
-    
 
-    
 
+def concurrency_menu():
+    """Sub menu for the worker / request limits used by the concurrent stages"""
+    global user_options
+    settings = [
+        ("max_requests_per_host", "Max concurrent requests per ERDDAP server"),
+        ("subset_workers", "Parallel subset downloads per dataset"),
+        ("subset_upload_workers", "Parallel subset uploads per dataset"),
+        ("pipeline_download_workers", "Datasets downloading at once"),
+        ("pipeline_publish_workers", "Datasets publishing at once"),
+        ("pipeline_queue_size", "Downloaded datasets waiting to publish (temp disk bound)"),
+    ]
+    while True:
+        print("\nConcurrency Settings:")
+        for idx, (attr, label) in enumerate(settings, start=1):
+            print(f"{idx}. {label} (currently: {getattr(user_options, attr)})")
+        print("Type **done** to return to the options menu")
 
+        choice = input("Select a setting: ").strip()
+        if choice == "done":
+            return None
+        try:
+            attr, label = settings[int(choice) - 1]
+        except (ValueError, IndexError):
+            print("Invalid option. Please select again.")
+            continue
+
+        uc = input(f"Input a new value for '{label}': ")
+        try:
+            value = int(uc)
+            if value < 1:
+                raise ValueError("value must be at least 1")
+            setattr(user_options, attr, value)
+            if attr == "max_requests_per_host":
+                http.setHostLimit(value)
+        except Exception as e:
+            print(f"Invalid input {e}")
 
 
 #---------------------------------------------------------------------------------------------
@@ -784,13 +979,26 @@ def findExistingNRT(manager_obj: um.UpdateManager, dataset_list: list) -> list:
 ###################################
 ##### Functions for Notebooks #####
 ###################################
+# Each pool process logs in to the portal once and reuses the session for every item it updates
+_worker_gis = None
+
+def nrtWorkerInit() -> None:
+    """ProcessPoolExecutor initializer, logs the worker in before its first task"""
+    _workerGis()
+
+def _workerGis() -> GIS:
+    global _worker_gis
+    if _worker_gis is None:
+        _worker_gis = GIS("Home")
+    return _worker_gis
+
 def ofsWorkerFunc(agol_id, url, verbose, preserveProps, ignoreAge, noProps):
         """
         Worker function that runs OFS a separate process.
         """
         # get item content
         start = time.time()
-        gis = GIS("Home")
+        gis = _workerGis()
         item_content = gis.content.get(agol_id)
         OverwriteFS.overwriteFeatureService(
             item_content,      
@@ -803,17 +1011,141 @@ def ofsWorkerFunc(agol_id, url, verbose, preserveProps, ignoreAge, noProps):
         end = time.time()
         return end - start
 
+def nrtOverwriteWorkerFunc(agol_id, datasetid, serverurl, verbose, preserveProps, ignoreAge, noProps, prefetched=None, last_hash=None):
+        """
+        Worker function for full NRT overwrites, builds the dataset's NRT url from the
+        prefetched DAS in the worker and runs OFS. The payload is downloaded once, hashed on
+        the way, and OFS is skipped when the hash equals `last_hash`.
+        Returns (seconds, summary, payload hash).
+        """
+        start = time.time()
+        datasetObj = dw.DatasetWrangler(dataset_id=datasetid, dataset_title=None, server=serverurl,
+                                        is_nrt=True, prefetched=prefetched)
+        datasetObj.generateUrl(nrt_update=True)  # sets datasetObj.url_s
+        url = datasetObj.url_s[0]
+        item_content = _workerGis().content.get(agol_id)
+        data_items = item_content.related_items("Service2Data")
+        if not data_items:
+            # no source file item to name the download after, OFS fetches the url itself
+            ofsWorkerFunc(agol_id, url, verbose, preserveProps, ignoreAge, noProps)
+            return time.time() - start, "overwritten", None
+
+        # OFS takes a local file named like the one the service was published from
+        download_dir = tempfile.mkdtemp(dir=ec.getTempDir())
+        try:
+            file_path = os.path.join(download_dir, data_items[0].name)
+            payload_hash = um.downloadWithHash(url, file_path)
+            if last_hash and payload_hash == last_hash:
+                return time.time() - start, "payload unchanged, overwrite skipped", payload_hash
+            OverwriteFS.overwriteFeatureService(
+                item_content,
+                file_path,
+                verbose=verbose,
+                preserveProps=preserveProps,
+                ignoreAge=ignoreAge,
+                noProps=noProps
+            )
+        finally:
+            shutil.rmtree(download_dir, ignore_errors=True)
+        return time.time() - start, "overwritten", payload_hash
+
+def nrtAppendWorkerFunc(agol_id, datasetid, serverurl, verbose, preserveProps, ignoreAge, noProps, prefetched=None, last_hash=None):
+        """
+        Worker function for incremental NRT updates, runs in a separate process.
+        Appends only the rows newer than the layer's latest timestamp and deletes rows
+        that have left the moving window. New rows hashing to `last_hash` were already
+        appended and are skipped. Layers with no rows (or no date field) get a full
+        OverwriteFS overwrite instead. Returns (seconds, summary, hash of the new rows).
+        """
+        start = time.time()
+        gis = _workerGis()
+        item_content = gis.content.get(agol_id)
+        feature_layer = item_content.layers[0]
+        datasetObj = dw.DatasetWrangler(dataset_id=datasetid, dataset_title=None, server=serverurl,
+                                        is_nrt=True, prefetched=prefetched)
+
+        time_field = um.layerTimeField(feature_layer, datasetObj.time_str)
+        max_time = um.layerMaxTime(feature_layer, time_field) if time_field else None
+        if max_time is None:
+            datasetObj.generateUrl(nrt_update=True)
+            OverwriteFS.overwriteFeatureService(
+                item_content,
+                datasetObj.url_s[0],
+                verbose=verbose,
+                preserveProps=preserveProps,
+                ignoreAge=ignoreAge,
+                noProps=noProps
+            )
+            return time.time() - start, "full overwrite (no rows to append to)", None
+
+        # A failed append leaves max_time where it was, so the next cycle requests the same rows again
+        window_start = datetime.now(timezone.utc) - timedelta(days=datasetObj.moving_window_days)
+        since = max(max_time, window_start)
+        csv_path, row_count = datasetObj.writeNewRows(since.strftime('%Y-%m-%dT%H:%M:%S'))
+        byte_count = 0
+        data = datasetObj.data_buffer
+        payload_hash = um.payloadHash(data, csv_path) if csv_path else None
+        if payload_hash and payload_hash == last_hash:
+            if data is None:
+                os.remove(csv_path)
+            pruned = um.pruneBefore(feature_layer, time_field, window_start)
+            return (time.time() - start, f"{row_count} new rows were already appended, skipped, "
+                    f"removed {pruned} expired rows", payload_hash)
+        if csv_path and data is not None:
+            # kept in memory: a few rows go in with edit_features, more through a staging item
+            byte_count = len(data)
+            if row_count <= um.EDIT_FEATURES_MAX_ROWS:
+                added = um.appendRows(feature_layer, data)
+                if added != row_count:
+                    raise RuntimeError(f"only {added} of {row_count} rows were added")
+            elif not um.appendCsv(gis, feature_layer, csv_path, title=f"{datasetid}_append", data=data):
+                raise RuntimeError(f"append of {row_count} rows was rejected")
+        elif csv_path:
+            byte_count = os.path.getsize(csv_path)
+            try:
+                if not um.appendCsv(gis, feature_layer, csv_path, title=f"{datasetid}_append"):
+                    raise RuntimeError(f"append of {row_count} rows was rejected")
+            finally:
+                os.remove(csv_path)
+
+        pruned = um.pruneBefore(feature_layer, time_field, window_start)
+        return time.time() - start, f"appended {row_count} rows ({byte_count / 1024:.1f} KB), removed {pruned} expired rows", payload_hash
+
 def updateNRT(
     verbose_opt: bool = True,
     preserveProps_opt: bool = True,
     ignoreAge_opt: bool = True,
     noProps_opt: bool = False,
     timeoutTime: int = 300,
-    max_workers: int = 4 ) -> None:
+    max_workers: int = 4,
+    incremental: bool = None,
+    retries: int = None,
+    cycle_budget: int = None,
+    detect_changes: bool = None ) -> None:
     """
     Searches your ArcGIS Online account for datasets with the NRT tags, then
-    overwrites them in parallel using a single ProcessPoolExecutor.
+    updates them in parallel on a pool of worker processes. The metadata of
+    every dataset is prefetched concurrently and each worker logs in only once.
+
+    With incremental (default: user_options.nrt_incremental_bool) only new rows are
+    appended and expired rows deleted, otherwise each layer is overwritten with the full window.
+
+    An item still running after timeoutTime seconds has its worker killed and replaced and
+    is retried (default: user_options.nrt_retry_attempts times) with backoff. cycle_budget
+    (default: user_options.nrt_cycle_budget, 0 = none) caps the whole run in seconds,
+    items left when it is spent wait for the next cycle.
+
+    With detect_changes (default: user_options.nrt_change_detection_bool) items whose
+    dataset maxTime hasn't moved since their last update are skipped.
     """
+    if incremental is None:
+        incremental = user_options.nrt_incremental_bool
+    if retries is None:
+        retries = user_options.nrt_retry_attempts
+    if cycle_budget is None:
+        cycle_budget = user_options.nrt_cycle_budget
+    if detect_changes is None:
+        detect_changes = user_options.nrt_change_detection_bool
     update_manager = um.UpdateManager()
     gis = update_manager.gis
     update_manager.searchContent()
@@ -821,63 +1153,71 @@ def updateNRT(
     # Grab all datasets at once
     items = list(update_manager.datasets.items())  #  k d_id: v info
 
-    futures = {}
-    start_times = {}
     start_all = time.time()
 
-
-    
-    # 1. Create 1 ProcessPoolExecutor outside the loop
+    # 0. Skip datasets with no new data since their last update
+    #-------------------------------------------
+    state = um.loadNrtState()
+    max_times = um.catalogMaxTimes(update_manager.datasets)
+    if detect_changes:
+        unchanged = {datasetid for datasetid, info in items
+                     if um.isUnchanged(state.get(info.get('agol_id')), max_times.get(datasetid))}
+        if unchanged:
+            print(f"{len(unchanged)} of {len(items)} NRT datasets have no new data, skipping them")
+            items = [(datasetid, info) for datasetid, info in items if datasetid not in unchanged]
+
+    # DAS (and ncHeader) of every item fetched up front, all servers at once
+    payloads = dw.prefetchMetadataByServer(
+        [(info.get('base_url'), datasetid) for datasetid, info in items], is_nrt=True)
+
+    # 1. One task per dataset, the worker builds it from its prefetched DAS
+    #-------------------------------------------
+    worker_func = nrtAppendWorkerFunc if incremental else nrtOverwriteWorkerFunc
+    tasks = []
+    for datasetid, info in items:
+        serverurl = info.get('base_url')
+        agol_id = info.get('agol_id')
+        # a failed prefetch is left to the worker to retry and report
+        prefetched = payloads.get((serverurl, datasetid))
+        if prefetched and isinstance(prefetched.get("das"), Exception):
+            prefetched = None
+        args = (agol_id, datasetid, serverurl, verbose_opt, preserveProps_opt, ignoreAge_opt, noProps_opt, prefetched,
+                state.get(agol_id, {}).get("payload_hash"))
+        tasks.append((datasetid, worker_func, args))
+
+    # 2. Long-lived workers that log in once, a hung item only costs its own worker
     #------------------------------------------------------
-    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
-
-        
-        # 2. Submit each dataset as a separate task
-        #-------------------------------------------
-        for datasetid, info in items:
-            serverurl = info.get('base_url')
-            datasetObj = dw.DatasetWrangler(dataset_id=datasetid, dataset_title=None, server=serverurl, is_nrt=True)
-            datasetObj.generateUrl(nrt_update=True)  # sets datasetObj.url_s
-
-            agol_id = info.get('agol_id')
-
-            s_time = time.time()
-            future = executor.submit(
-                ofsWorkerFunc,
-                agol_id,
-                datasetObj.url_s[0],
-                verbose_opt,
-                preserveProps_opt,
-                ignoreAge_opt,
-                noProps_opt
-            )
-            futures[future] = datasetid
-            start_times[future] = s_time
-        
-        # 3. Collect results as they complete or fail
-        #--------------------------------------------
-        for future in concurrent.futures.as_completed(futures):
-            datasetid = futures[future]
-            dataset_start = start_times[future]
-            dataset_end = time.time()
-            dataset_time = dataset_end - dataset_start
-            try:
-                duration = future.result(timeout=timeoutTime)
-                print(f"Dataset {datasetid} completed in {duration:.2f} seconds (worker time).")
-
-
-            except concurrent.futures.TimeoutError:
-                print(f"Timed out overwriting {datasetid} after {timeoutTime} seconds.")
-                # Re-append dataset to the end if needed
-                popped_info = update_manager.datasets.pop(datasetid, None)
-                if popped_info:
-                    update_manager.datasets[datasetid] = popped_info
-
-            except Exception as ex:
-                print(f"Error overwriting {datasetid}: {ex}")
+    pool = wp.DeadlinePool(max_workers=max_workers, timeout=timeoutTime, retries=retries,
+                           cycle_budget=cycle_budget, initializer=nrtWorkerInit)
+
+    # 3. Collect results as they complete, time out or fail
+    #--------------------------------------------
+    counts = {}
+    for result in pool.run(tasks):
+        datasetid = result.key
+        counts[result.status] = counts.get(result.status, 0) + 1
+        if result.status == "done":
+            duration, summary, payload_hash = result.value
+            print(f"Dataset {datasetid} completed in {duration:.2f} seconds (worker time): {summary}")
+            agol_id = update_manager.datasets[datasetid].get('agol_id')
+            previous = state.get(agol_id, {})
+            state[agol_id] = {
+                "dataset_id": datasetid,
+                "max_time": max_times.get(datasetid),
+                "payload_hash": payload_hash or previous.get("payload_hash"),
+                "published_at": time.time(),
+            }
+            um.saveNrtState(state)
+        elif result.status == "timeout":
+            print(f"Timed out overwriting {datasetid} after {timeoutTime} seconds ({result.attempts} attempts).")
+        elif result.status == "skipped":
+            print(f"Skipped {datasetid}, {result.error}.")
+        else:
+            print(f"Error overwriting {datasetid}: {result.error}")
 
     total_time = time.time() - start_all
-    print(f"All tasks completed in {total_time:.2f} seconds.")
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+    print(f"All tasks completed in {total_time:.2f} seconds ({summary or 'no items'}).")
 
 
 def gliderWorkflow(search_term: str = None) -> None:
@@ -916,17 +1256,27 @@ def gliderWorkflow(search_term: str = None) -> None:
             print(f"\nFound {len(dataset_list)} datasets matching search term '{search_term}'")
             # Process and publish datasets
 
-            erddapObj.addDatasets_list(dataset_list)
+            # same ledger as add_menu, rerunning the search after a crash resumes it
+            ledger = None
+            if user_options.run_ledger_bool:
+                ledger = rl.RunLedger.forRun(erddapObj.server, erddapObj.protocol, dataset_list)
+
+            erddapObj.createDatasetObjects(dataset_list)
             datasetObjlist = (erddapObj.datasets)
             for datasetObj in datasetObjlist:
+                datasetObj.ledger = ledger
+                if ledger:
+                    ledger.recordMetadata(datasetObj)
                 datasetObj.generateUrl()
-                datasetObj.writeErddapData()
 
             agolObj = aw.AgolWrangler(erddap_obj= erddapObj)
             agolObj.datasets = erddapObj.datasets
+            agolObj.ledger = ledger
             agolObj.makeItemProperties()
-            agolObj.pointTableToGeojsonLine()
-            agolObj.postAndPublish()
+            # downloads and the geojson track conversion run inside the pipeline
+            agolObj.pipelinePublish()
+            if ledger:
+                ledger.finish([datasetObj.dataset_id for datasetObj in datasetObjlist])
         else:
             print(f"No datasets found matching search term '{search_term}'")
     else:
@@ -0,0 +1,150 @@
+import os, json, time, hashlib, threading
+from typing import Optional
+from . import das_client as dc
+from . import http_client as http
+
+#--------------------------------------------------------------------------------
+# Persistent DAS metadata cache.
+# Entries are keyed by the .das url (server + dataset id) and hold the parsed DAS
+# dict with the ETag / Last-Modified validators of the response. Fresh entries are
+# used without a request, stale ones are revalidated with a conditional GET, and the
+# directory is kept under DAS_CACHE_MAX_BYTES by evicting least recently used entries,
+# checked once every EVICT_CHECK_BYTES of writes rather than on every save.
+# Lives outside e2a_das_conf so cleanTemp() doesn't wipe it.
+#--------------------------------------------------------------------------------
+
+CACHE_VERSION = 1
+DAS_CACHE_TTL = 3600
+DAS_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# bytes saved between two scans of the cache directory
+EVICT_CHECK_BYTES = 1024 * 1024
+
+_unchecked_bytes = 0
+_evict_lock = threading.Lock()
+
+
+def getCacheDir() -> str:
+    agol_home = os.getenv('AGOL_HOME', '/arcgis/home')
+    cache_dir = os.path.join(agol_home, 'e2a_das_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def _entryPath(url: str) -> str:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(getCacheDir(), f"{key}.json")
+
+def loadEntry(url: str) -> Optional[dict]:
+    """Return the cache entry for `url`, or None if missing, unreadable or from an older format"""
+    filepath = _entryPath(url)
+    try:
+        with open(filepath, 'r') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("version") != CACHE_VERSION or entry.get("url") != url:
+        return None
+    return entry
+
+def saveEntry(url: str, entry: dict) -> None:
+    """Write an entry atomically, evicting old entries once enough has been written since the last check"""
+    filepath = _entryPath(url)
+    entry["version"] = CACHE_VERSION
+    entry["url"] = url
+    # per thread, prefetch threads may save the same url at once
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(entry, f)
+        size = f.tell()
+    os.replace(tmp_path, filepath)
+    _countWrite(size)
+
+def _countWrite(size: int) -> None:
+    global _unchecked_bytes
+    with _evict_lock:
+        _unchecked_bytes += size
+        if _unchecked_bytes < EVICT_CHECK_BYTES:
+            return
+        _unchecked_bytes = 0
+    evict()
+
+def _touch(url: str) -> None:
+    # mtime doubles as the last-access time for LRU eviction
+    try:
+        os.utime(_entryPath(url))
+    except OSError:
+        pass
+
+def isFresh(entry: dict, ttl: int = None) -> bool:
+    ttl = DAS_CACHE_TTL if ttl is None else ttl
+    return (time.time() - entry.get("fetched_at", 0)) < ttl
+
+def conditionalHeaders(entry: Optional[dict]) -> dict:
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def fetchDas(url: str, use_cache: bool = True, ttl: int = None, timeout: int = None) -> dict:
+    """
+    Return the parsed DAS dict for `url`.
+    Fresh cache hit -> no request. Stale hit -> conditional GET, a 304 renews the entry.
+    Otherwise a full download that is parsed and stored. HTTP errors raise as requests exceptions.
+    """
+    entry = loadEntry(url) if use_cache else None
+    if entry and isFresh(entry, ttl):
+        _touch(url)
+        return entry["das"]
+
+    response = http.get(url, headers=conditionalHeaders(entry), timeout=timeout)
+    if response.status_code == 304 and entry:
+        entry["fetched_at"] = time.time()
+        saveEntry(url, entry)
+        return entry["das"]
+
+    response.raise_for_status()
+    das = dc.convertToDict(dc.parseDasResponse(response.text))
+    if use_cache:
+        saveEntry(url, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "das": das,
+        })
+    return das
+
+def evict(max_bytes: int = None) -> None:
+    """Remove least recently used entries until the cache directory fits in max_bytes"""
+    max_bytes = DAS_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    cache_dir = getCacheDir()
+    entries = []
+    total = 0
+    for filename in os.listdir(cache_dir):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            stat = os.stat(os.path.join(cache_dir, filename))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, filename))
+        total += stat.st_size
+
+    for _, size, filename in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, filename))
+            total -= size
+        except OSError:
+            pass
+
+def clearCache() -> None:
+    cache_dir = getCacheDir()
+    for filename in os.listdir(cache_dir):
+        if filename.endswith(".json"):
+            try:
+                os.remove(os.path.join(cache_dir, filename))
+            except Exception as e:
+                print(f"An unexpected error occurred while deleting {filename}: {e}")
@@ -1,6 +1,7 @@
 import sys, os, datetime 
 from datetime import datetime, timedelta, timezone
 import json
+import concurrent.futures
 from collections import OrderedDict
 from . import erddap_wrangler as ec
 from . import data_wrangler as dw
@@ -135,6 +136,14 @@ def parseDasResponse(response_text) -> OrderedDict:
     return data
 
 
+def rangeValues(value) -> tuple:
+    """(min, max) floats from an actual_range value, the "min, max" string or a pair of numbers"""
+    if isinstance(value, str):
+        value = value.split(', ')
+    start, end = value
+    return float(start), float(end)
+
+
 def getConfDir():
 
     agol_home = os.getenv('AGOL_HOME', '/arcgis/home')
@@ -181,11 +190,35 @@ def saveToJson(data, datasetid: str) -> str:
         json.dump(data, json_file, indent=4)
     return filepath
 
+# single writer thread so write-behind persistence never blocks the wrangler objects
+_json_writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+def saveToJsonInBackground(data, datasetid: str) -> str:
+    """Queue the DAS JSON write on the background writer and return the path it will land at"""
+    filepath = os.path.join(getConfDir(), f'{datasetid}.json')
+
+    def _write():
+        try:
+            with open(filepath, 'w') as json_file:
+                json.dump(data, json_file)
+        except Exception as e:
+            print(f"Error writing DAS JSON for {datasetid}: {e}")
+
+    _json_writer.submit(_write)
+    return filepath
+
+def loadDas(data_Obj) -> dict:
+    """The parsed DAS held by the DatasetWrangler, falling back to its JSON in the conf dir"""
+    if getattr(data_Obj, "das_dict", None) is not None:
+        return data_Obj.das_dict
+    filepath = os.path.join(getConfDir(), f'{data_Obj.dataset_id}.json')
+    with open(filepath, 'r') as json_file:
+        return json.load(json_file)
+
 
 
 def getTimeFromJson(data_Obj) -> tuple:
-    datasetid = data_Obj.dataset_id
-    """Gets time from JSON file, returns max and min time as a tuple"""
+    """Gets time from the parsed DAS, returns max and min time as a tuple"""
     def convertFromUnix(time: tuple):
         """Convert from unix tuple to datetime tuple"""
         try:
@@ -208,27 +241,21 @@ def getTimeFromJson(data_Obj) -> tuple:
             print(f"Error converting from Unix: {e}")
             return None
     # main function body here
-    das_conf_dir = getConfDir()
-    filepath = os.path.join(das_conf_dir, f'{datasetid}.json')
-    with open(filepath, 'r') as json_file:
-        data = json.load(json_file)
-        try:            
-            time_ref = data.get(data_Obj.time_str, {}).get('actual_range', {}).get('value')
-            start_time_str, end_time_str = time_ref.split(', ')
-            start_time = (float(start_time_str))
-            end_time = (float(end_time_str))
-            time_tup = start_time, end_time
-            return convertFromUnix(time_tup)
-        except Exception as e:
-            if data_Obj.time_str and "actual_range" not in data.get(data_Obj.time_str, {}):
-                print(f"\nSpecial case: {data_Obj.time_str} has no actual_range field")
-                data_Obj.needs_Subset = False
-                data_Obj.no_time_range = True
-                return None
-            else:
-                print(f"\nError getting actual range from JSON for {data_Obj.dataset_title}, {e}")
-                data_Obj.has_error = True
-                return None
+    data = loadDas(data_Obj)
+    try:            
+        time_ref = data.get(data_Obj.time_str, {}).get('actual_range', {}).get('value')
+        time_tup = rangeValues(time_ref)
+        return convertFromUnix(time_tup)
+    except Exception as e:
+        if data_Obj.time_str and "actual_range" not in data.get(data_Obj.time_str, {}):
+            print(f"\nSpecial case: {data_Obj.time_str} has no actual_range field")
+            data_Obj.needs_Subset = False
+            data_Obj.no_time_range = True
+            return None
+        else:
+            print(f"\nError getting actual range from DAS for {data_Obj.dataset_title}, {e}")
+            data_Obj.has_error = True
+            return None
 
 
 def convertFromUnixDT(time_tuple):
@@ -249,56 +276,53 @@ def getGriddapDimensions(data_Obj: Any) -> List[str]:
     Returns list of dimension names, used to define the dimensions of an ArcGIS image collection image service 
     """
     dataset_id = data_Obj.dataset_id
-    das_conf_dir = getConfDir()
-    filepath = os.path.join(das_conf_dir, f'{dataset_id}.json')
 
     dim_attrs = {}
 
-    with open(filepath, 'r') as json_file:
-        data = json.load(json_file)
-        if "error" in data and data["error"].get("Found") is not None:
-            print(f"File {filepath} does not contain data.")
-            return None
-        
-        attributes_set = set()
-
-        common_vars = {"latitude", "longitude", "time", "NC_GLOBAL"}
+    data = loadDas(data_Obj)
+    if "error" in data and data["error"].get("Found") is not None:
+        print(f"DAS for {dataset_id} does not contain data.")
+        return None
+    
+    attributes_set = set()
 
-        for var_name, var_attrs in data.items():
-            # so, yeah
-            if var_name == "sst_gradient_magnitude":
-                continue
+    common_vars = {"latitude", "longitude", "time", "NC_GLOBAL"}
 
-            if var_name in common_vars:
-                if var_name == "time":
-                    data_Obj.has_time = True
-                    data_Obj.time_str = "time"
-                continue                         # <- skip to next var
+    for var_name, var_attrs in data.items():
+        # so, yeah
+        if var_name == "sst_gradient_magnitude":
+            continue
 
-            if not data_Obj.time_str and var_name in ("datecollec", "date_gmt"):
+        if var_name in common_vars:
+            if var_name == "time":
                 data_Obj.has_time = True
-                data_Obj.time_str = var_name
-                continue
+                data_Obj.time_str = "time"
+            continue                         # <- skip to next var
 
-            if (not data_Obj.time_str and
-                var_attrs.get("ioos_category", {}).get("value") == "Time" and
-                var_attrs.get("units", {}).get("value") == "seconds since 1970-01-01T00:00:00Z"):
-                data_Obj.has_time = True
-                data_Obj.time_str = var_name
-                continue
+        if not data_Obj.time_str and var_name in ("datecollec", "date_gmt"):
+            data_Obj.has_time = True
+            data_Obj.time_str = var_name
+            continue
 
-            cctype = var_attrs.get("coverage_content_type", {}).get("value", "")
-            if cctype in ("qualityInformation", "referenceInformation", "thematicClassification"):
-                continue
+        if (not data_Obj.time_str and
+            var_attrs.get("ioos_category", {}).get("value") == "Time" and
+            var_attrs.get("units", {}).get("value") == "seconds since 1970-01-01T00:00:00Z"):
+            data_Obj.has_time = True
+            data_Obj.time_str = var_name
+            continue
 
-            attributes_set.add(var_name)
+        cctype = var_attrs.get("coverage_content_type", {}).get("value", "")
+        if cctype in ("qualityInformation", "referenceInformation", "thematicClassification"):
+            continue
 
-        return list(attributes_set)
+        attributes_set.add(var_name)
+
+    return list(attributes_set)
 
 
 def getActualAttributes(data_Obj: Any, return_all: bool = False) -> List[str]:
     """
-    Load DAS JSON file and extract relevant attributes while filtering out QC variables.
+    Read the parsed DAS and extract relevant attributes while filtering out QC variables.
     If return_all is True, only time/lat/lon flags are set but no attributes are filtered out
     (apart from single-char names and the global NC_Global key).
     Returns list[str] or None on error.
@@ -307,90 +331,86 @@ def getActualAttributes(data_Obj: Any, return_all: bool = False) -> List[str]:
     has_lat = False
     has_lon = False
 
-    das_conf_dir = getConfDir()
-    filepath = os.path.join(das_conf_dir, f'{dataset_id}.json')
-    
     try:
-        with open(filepath, 'r') as json_file:
-            data = json.load(json_file)
-            if "error" in data and data["error"].get("Found") is not None:
-                print(f"File {filepath} does not contain data.")
-                return None
+        data = loadDas(data_Obj)
+        if "error" in data and data["error"].get("Found") is not None:
+            print(f"DAS for {dataset_id} does not contain data.")
+            return None
 
-            attributes_set = set()
-            data_Obj.has_time = False
-            data_Obj.time_str = None
+        attributes_set = set()
+        data_Obj.has_time = False
+        data_Obj.time_str = None
 
-            qc_suffixes = (
-                "_qc_", "qartod_",
-                "_qc", "_clm", "_loc", "_flt", "_rct",
-                "_agg", "_rng", "_gap", "_spk"
-            )
+        qc_suffixes = (
+            "_qc_", "qartod_",
+            "_qc", "_clm", "_loc", "_flt", "_rct",
+            "_agg", "_rng", "_gap", "_spk"
+        )
 
-            for var_name, var_attrs in data.items():
-                if not isinstance(var_attrs, dict):
-                    continue
-                
-                # latitude / longitude flags
-                if var_name == "latitude":
-                    has_lat = True
-                    attributes_set.add(var_name)
-                elif var_name == "longitude":
-                    has_lon = True
-                    attributes_set.add(var_name)
-                
-                # time‐string detection (always run)
-                if var_name == "time":
-                    data_Obj.has_time = True
-                    data_Obj.time_str = "time"
-                elif not data_Obj.time_str and var_name == "datecollec":
-                    data_Obj.has_time = True
-                    data_Obj.time_str = "datecollec"
-                elif not data_Obj.time_str and var_name == "date_gmt":
+        for var_name, var_attrs in data.items():
+            if not isinstance(var_attrs, dict):
+                continue
+            
+            # latitude / longitude flags
+            if var_name == "latitude":
+                has_lat = True
+                attributes_set.add(var_name)
+            elif var_name == "longitude":
+                has_lon = True
+                attributes_set.add(var_name)
+            
+            # time‐string detection (always run)
+            if var_name == "time":
+                data_Obj.has_time = True
+                data_Obj.time_str = "time"
+            elif not data_Obj.time_str and var_name == "datecollec":
+                data_Obj.has_time = True
+                data_Obj.time_str = "datecollec"
+            elif not data_Obj.time_str and var_name == "date_gmt":
+                data_Obj.has_time = True
+                data_Obj.time_str = "date_gmt"
+            elif not data_Obj.time_str:
+                ioos_cat = var_attrs.get("ioos_category", {}).get("value", "")
+                units   = var_attrs.get("units", {}).get("value", "")
+                if ioos_cat == "Time" and units == "seconds since 1970-01-01T00:00:00Z":
                     data_Obj.has_time = True
-                    data_Obj.time_str = "date_gmt"
-                elif not data_Obj.time_str:
-                    ioos_cat = var_attrs.get("ioos_category", {}).get("value", "")
-                    units   = var_attrs.get("units", {}).get("value", "")
-                    if ioos_cat == "Time" and units == "seconds since 1970-01-01T00:00:00Z":
-                        data_Obj.has_time = True
-                        data_Obj.time_str = var_name
-
-                # ── only for return_all == False ──
-                if not return_all:
-                    # skip QC/coordinate suffixed names
-                    if any(var_name.endswith(suf) for suf in qc_suffixes) or \
-                       any(sub in var_name for sub in ("_qc_", "qartod_")):
-                        continue
-
-                    # skip single‐character keys (e.g. "s")
-                    if len(var_name) == 1:
-                        continue
-
-                    # skip the global metadata key NC_Global
-                    if var_name.lower() == "nc_global":
-                        continue
-
-                    # now only include if actual_range exists or exactly one attr
-                    if 'actual_range' in var_attrs or len(var_attrs) == 1:
-                        attributes_set.add(var_name)
+                    data_Obj.time_str = var_name
 
-                else:
-                    # return_all == True: skip only single‐char & NC_Global (but keep time/lat/lon flags)
-                    if len(var_name) == 1 or var_name.lower() == "nc_global":
-                        continue
+            # ── only for return_all == False ──
+            if not return_all:
+                # skip QC/coordinate suffixed names
+                if any(var_name.endswith(suf) for suf in qc_suffixes) or \
+                   any(sub in var_name for sub in ("_qc_", "qartod_")):
+                    continue
+
+                # skip single‐character keys (e.g. "s")
+                if len(var_name) == 1:
+                    continue
+
+                # skip the global metadata key NC_Global
+                if var_name.lower() == "nc_global":
+                    continue
+
+                # now only include if actual_range exists or exactly one attr
+                if 'actual_range' in var_attrs or len(var_attrs) == 1:
                     attributes_set.add(var_name)
 
-            # If we didn’t see both coords, mark error
-            if not (has_lat and has_lon):
-                print(f"No longitude or latitude error: {dataset_id}")
-                data_Obj.has_error = True
+            else:
+                # return_all == True: skip only single‐char & NC_Global (but keep time/lat/lon flags)
+                if len(var_name) == 1 or var_name.lower() == "nc_global":
+                    continue
+                attributes_set.add(var_name)
 
-            return list(attributes_set)
+        # If we didn’t see both coords, mark error
+        if not (has_lat and has_lon):
+            print(f"No longitude or latitude error: {dataset_id}")
+            data_Obj.has_error = True
+
+        return list(attributes_set)
 
     except FileNotFoundError:
-        print(f"File {filepath} not found.")
+        print(f"DAS JSON for {dataset_id} not found.")
         return None
     except json.JSONDecodeError:
-        print(f"Error decoding JSON from {filepath}")
+        print(f"Error decoding DAS JSON for {dataset_id}")
         return None
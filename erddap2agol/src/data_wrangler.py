@@ -1,17 +1,437 @@
 from . import erddap_wrangler as ec
 from . import das_client as dc
 from . import core
+from . import http_client as http
+from . import das_cache
+from . import run_ledger as rl
+from . import columnar_cache as cc
 from src.utils import OverwriteFS
 from arcgis.gis import GIS
-from collections import deque
+import concurrent.futures, threading
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
-from typing import Optional, Dict, List, Union
-from io import StringIO
-import datetime, requests, re, math, os, json, pandas as pd
-from datetime import timedelta, datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, Dict, List, Tuple, Union
+from io import StringIO, BytesIO
+import requests, re, math, os, time, hashlib, shutil
 from dateutil.relativedelta import relativedelta 
-from urllib.parse import quote
+from urllib.parse import quote, unquote, urlsplit
+import csv
+
+try:
+    import xarray as xr
+except ImportError:     # optional (extra "griddap"), only merging split griddap downloads needs it
+    xr = None
+
+#---------------------Metadata Requests---------------------
+
+def dasUrl(server: str, dataset_id: str, griddap: bool = False) -> str:
+    """DAS endpoint for a dataset, griddap datasets are always requested from /griddap/"""
+    url = f"{server}{dataset_id}.das"
+    if griddap:
+        url = url.replace("tabledap", "griddap")
+    return url
+
+def ncHeaderUrl(server: str, dataset_id: str) -> str:
+    return f"{server}{dataset_id}.ncHeader?"
+
+def fetchText(url: str, timeout: Optional[int] = None, raise_status: bool = True) -> str:
+    """GET `url` and return the body as text, raising on 4xx/5xx unless told not to"""
+    response = http.get(url, timeout=timeout)
+    if raise_status:
+        response.raise_for_status()
+    return response.text
+
+def isEmptyResult(response: requests.Response) -> bool:
+    """ERDDAP answers a query that matches no rows with a 404, not an empty table"""
+    return response.status_code == 404 and "no matching results" in response.text.lower()
+
+def fetchDas(url: str) -> Dict:
+    """Parsed DAS for `url`, served from / revalidated against the persistent DAS cache"""
+    return das_cache.fetchDas(url, use_cache=core.user_options.das_cache_bool)
+
+def needsDatasetSizes(griddap: bool, is_glider: bool, is_nrt: bool) -> bool:
+    """Mirrors the __post_init__ branches, only the default chunking path reads the ncHeader"""
+    return not (griddap or is_glider or is_nrt or core.user_options.bypass_chunking_bool)
+
+def prefetchMetadata(server: str, dataset_ids: List[str], griddap: bool = False,
+                     is_nrt: bool = False, is_glider: bool = False) -> Dict[str, Dict]:
+    """
+    Fetch the .das (and the .ncHeader where the chunking path needs it) for every
+    dataset ID concurrently, bounded by user_options.max_requests_per_host.
+
+    Returns {dataset_id: {"das": parsed dict | Exception, "ncHeader": text | Exception}},
+    passed to each DatasetWrangler as `prefetched`.
+    """
+    needs_sizes = needsDatasetSizes(griddap, is_glider, is_nrt)
+
+    def _fetch(dataset_id: str) -> Dict:
+        payload = {}
+        try:
+            payload["das"] = fetchDas(dasUrl(server, dataset_id, griddap))
+        except Exception as e:
+            # the serial path never requests the ncHeader after a failed DAS
+            payload["das"] = e
+            return payload
+        if needs_sizes:
+            try:
+                payload["ncHeader"] = fetchText(ncHeaderUrl(server, dataset_id), timeout=120, raise_status=False)
+            except Exception as e:
+                payload["ncHeader"] = e
+        return payload
+
+    max_workers = max(1, int(core.user_options.max_requests_per_host or 1))
+    print(f"\nPrefetching metadata for {len(dataset_ids)} datasets ({max_workers} concurrent requests)")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(dataset_ids, executor.map(_fetch, dataset_ids)))
+
+def prefetchMetadataByServer(datasets: List[Tuple[str, str]], griddap: bool = False,
+                             is_nrt: bool = False, is_glider: bool = False) -> Dict[Tuple[str, str], Dict]:
+    """
+    prefetchMetadata for (server, dataset_id) pairs spread over several servers, every
+    server at once (each still bounded per host). Returns {(server, dataset_id): payload}.
+    """
+    by_server: Dict[str, List[str]] = {}
+    for server, dataset_id in datasets:
+        by_server.setdefault(server, []).append(dataset_id)
+    if not by_server:
+        return {}
+
+    def _fetchServer(server: str) -> Dict[str, Dict]:
+        return prefetchMetadata(server, by_server[server], griddap, is_nrt, is_glider)
+
+    payloads = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(by_server)) as executor:
+        for server, server_payloads in zip(by_server, executor.map(_fetchServer, by_server)):
+            payloads.update({(server, dataset_id): payload for dataset_id, payload in server_payloads.items()})
+    return payloads
+
+def requestedColumns(url: str) -> List[str]:
+    """Variable names requested by a tabledap url, in order (the query up to the first constraint)"""
+    query = urlsplit(url).query.split("&", 1)[0]
+    return [name for name in unquote(query).split(",") if name]
+
+class CsvStreamValidator:
+    """
+    Incremental check of a tabledap csvp body as it streams to disk.
+    Confirms the header matches the requested variables and counts data rows,
+    without holding more than the first line in memory.
+    """
+    def __init__(self, expected_columns: Optional[List[str]] = None):
+        self.expected_columns = expected_columns or []
+        self.header: Optional[List[str]] = None
+        self.row_count = 0
+        self.byte_count = 0
+        self._head = b""
+        self._newlines = 0
+        self._last_byte = b""
+
+    def feed(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self.byte_count += len(chunk)
+        self._newlines += chunk.count(b"\n")
+        self._last_byte = chunk[-1:]
+        if self.header is None:
+            self._head += chunk
+            if b"\n" in self._head:
+                line = self._head.split(b"\n", 1)[0].decode("utf-8", errors="replace").rstrip("\r")
+                self.header = next(csv.reader([line]), [])
+                self._head = b""
+
+    def finish(self) -> int:
+        """Raise ValueError for an empty or mismatched body, otherwise return the data row count"""
+        if self.header is None and self._head:
+            line = self._head.decode("utf-8", errors="replace").rstrip("\r\n")
+            self.header = next(csv.reader([line]), [])
+        if not self.header:
+            raise ValueError("empty response body")
+
+        if self.expected_columns:
+            # csvp headers look like "name (units)"
+            names = [col.split(" (", 1)[0].strip() for col in self.header]
+            if names != self.expected_columns:
+                raise ValueError(f"unexpected header {self.header}, requested {self.expected_columns}")
+
+        lines = self._newlines + (0 if self._last_byte == b"\n" else 1)
+        self.row_count = max(0, lines - 1)
+        return self.row_count
+
+class CsvNaNFilter:
+    """
+    Rewrites ERDDAP's NaN missing-value marker to an empty cell while a csvp streams,
+    as the pandas round trip of the old download path did, so AGOL sees a missing
+    value rather than the text "NaN" when it types the field. Works on whole lines,
+    a line split across chunks waits for its end. Quoted strings are left alone.
+    """
+    # a NaN cell: not preceded by anything but a comma / line start, nor followed by anything but a separator
+    _NAN = re.compile(rb'(?<![^,\n])NaN(?![^,\r\n])')
+    _QUOTED_OR_NAN = re.compile(rb'"(?:[^"]|"")*"|(?<![^,\n])NaN(?![^,\r\n])')
+
+    def __init__(self):
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> bytes:
+        data = self._tail + chunk if self._tail else chunk
+        cut = data.rfind(b"\n") + 1
+        self._tail = data[cut:]
+        return self._rewrite(data[:cut])
+
+    def flush(self) -> bytes:
+        tail, self._tail = self._tail, b""
+        return self._rewrite(tail)
+
+    def _rewrite(self, block: bytes) -> bytes:
+        if b"NaN" not in block:
+            return block
+        if b'"' not in block:
+            return self._NAN.sub(b"", block)
+        return self._QUOTED_OR_NAN.sub(lambda m: b"" if m.group(0) == b"NaN" else m.group(0), block)
+
+@dataclass
+class DownloadProgress:
+    """Thread-safe bytes / rows / throughput tally for the parts of one dataset download"""
+    label: str
+    total_parts: int
+    parts_done: int = 0
+    byte_count: int = 0
+    row_count: int = 0
+    started: float = field(default_factory=time.time)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def update(self, byte_count: int, row_count: Optional[int] = None) -> None:
+        with self._lock:
+            self.parts_done += 1
+            self.byte_count += byte_count
+            if row_count:
+                self.row_count += row_count
+            print(f"{self.label}: {self.parts_done}/{self.total_parts} parts | {self.summary(short=True)}")
+
+    def addParts(self, count: int) -> None:
+        """A part that was split in two adds one more part to wait for"""
+        with self._lock:
+            self.total_parts += count
+
+    def summary(self, short: bool = False) -> str:
+        elapsed = max(time.time() - self.started, 1e-6)
+        mb = self.byte_count / (1 << 20)
+        text = f"{mb:.1f} MB, {self.row_count:,} rows, {mb / elapsed:.2f} MB/s"
+        if short:
+            return text
+        return f"Downloaded {self.parts_done}/{self.total_parts} parts for {self.label} in {elapsed:.1f}s ({text})"
+
+#---------------------Chunk Planning---------------------
+# Subsets are planned from a per-bucket row histogram (ERDDAP's orderByCount) so
+# bursty datasets get chunks close to chunk_size instead of uniform time slices.
+
+# (longest time span, orderByCount bucket) pairs, the last bucket covers everything longer
+PROBE_BUCKETS = (
+    (timedelta(days=60), "1hour"),
+    (timedelta(days=3650), "1day"),
+    (None, "1month"),
+)
+_BUCKET_STEPS = {"1hour": relativedelta(hours=1), "1day": relativedelta(days=1), "1month": relativedelta(months=1)}
+
+def probeBucket(span: timedelta) -> str:
+    for limit, bucket in PROBE_BUCKETS:
+        if limit is None or span <= limit:
+            return bucket
+
+def parseTimeCounts(csvp_text: str) -> List[tuple]:
+    """[(bucket start, rows)] from an orderByCount csvp body, header skipped"""
+    counts = []
+    reader = csv.reader(StringIO(csvp_text))
+    next(reader, None)
+    for row in reader:
+        if len(row) < 2 or not row[0]:
+            continue
+        bucket_start = datetime.fromisoformat(row[0].replace("Z", "+00:00"))
+        counts.append((bucket_start, int(float(row[1] or 0))))
+    return sorted(counts)
+
+def planTimeChunks(counts: List[tuple], bucket: str, start: datetime, end: datetime, target: int) -> List[tuple]:
+    """
+    Pack consecutive histogram buckets into [(chunk start, chunk end)] holding at most
+    `target` rows each. A single bucket over the target is split evenly in time.
+    Chunks tile start..end without gaps, empty stretches join the chunk before them.
+    """
+    step = _BUCKET_STEPS[bucket]
+    boundaries = [start]
+    in_chunk = 0
+    for bucket_start, rows in counts:
+        bucket_start = max(bucket_start, start)
+        bucket_end = min(bucket_start + step, end)
+        if bucket_start >= end or rows <= 0:
+            continue
+        if rows > target:
+            if in_chunk == 0 and len(boundaries) > 1:
+                # nothing since the last boundary, stretch the previous chunk instead of leaving an empty one
+                boundaries[-1] = bucket_start
+            elif bucket_start > boundaries[-1]:
+                boundaries.append(bucket_start)
+            pieces = math.ceil(rows / target)
+            width = (bucket_end - bucket_start) / pieces
+            boundaries.extend(bucket_start + width * i for i in range(1, pieces))
+            boundaries.append(bucket_end)
+            in_chunk = 0
+            continue
+        if in_chunk + rows > target and bucket_start > boundaries[-1]:
+            boundaries.append(bucket_start)
+            in_chunk = 0
+        in_chunk += rows
+
+    # an empty tail (or a boundary at the very end) joins the last chunk
+    if boundaries[-1] >= end or (in_chunk == 0 and len(boundaries) > 1):
+        boundaries.pop()
+    boundaries.append(end)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+#---------------------Split and Retry---------------------
+# A request ERDDAP rejects as too large (413) or that times out (read timeout / 504)
+# is cut in two and each half downloaded on its own, recursively up to
+# user_options.split_retry_depth levels. tabledap halves its time constraint, griddap
+# halves its time axis (latitude for a single time step) on the axis values ERDDAP
+# reports, so no grid step is fetched twice. The halves are merged back into the file
+# the whole request would have written.
+
+HTTP_413 = "HTTP_413"
+HTTP_TIMEOUT = "HTTP_TIMEOUT"
+EMPTY_RESULT = "EMPTY_RESULT"
+SPLIT_STATUSES = {413: HTTP_413, 504: HTTP_TIMEOUT}
+# (selector position, axis name) tried in order when splitting a griddap request
+GRIDDAP_SPLIT_AXES = ((0, "time"), (-2, "latitude"))
+_GRID_RANGE = re.compile(r"^\((.+)\):(\d+):\((.+)\)$")
+
+def splitTabledapUrl(url: str, time_str: str) -> Optional[List[str]]:
+    """The url's time constraint cut in two at its midpoint, None if it has none or is down to a second"""
+    if not time_str:
+        return None
+    t = re.escape(time_str)
+    start_match = re.search(rf"&{t}%3E%3D([^&]+?)Z", url)
+    end_match = re.search(rf"&{t}%3C(?:%3D)?([^&]+?)Z", url)
+    if not (start_match and end_match):
+        return None
+    try:
+        start = datetime.fromisoformat(start_match.group(1))
+        end = datetime.fromisoformat(end_match.group(1))
+    except ValueError:
+        return None
+    mid = (start + (end - start) / 2).replace(microsecond=0)
+    if not start < mid < end:
+        return None
+
+    mid_str = mid.strftime('%Y-%m-%dT%H:%M:%S')
+    # the first half ends before mid, the second keeps the original (inclusive or not) end
+    first = f"{url[:end_match.start()]}&{time_str}%3C{mid_str}Z{url[end_match.end():]}"
+    second = f"{url[:start_match.start(1)]}{mid_str}{url[start_match.end(1):]}"
+    return [first, second]
+
+def griddapAxisValues(url: str, axis: str, selector: str, timeout: Optional[int] = None) -> List[str]:
+    """Values of `axis` that `selector` picks out of the griddap dataset `url` requests"""
+    base = url.split("?", 1)[0].rsplit(".", 1)[0]
+    text = fetchText(f"{base}.csvp?{axis}%5B{selector}%5D", timeout=timeout)
+    return [line.strip() for line in text.splitlines()[1:] if line.strip()]
+
+def splitGriddapUrl(url: str, timeout: Optional[int] = None) -> Optional[tuple]:
+    """(axis, [first half url, second half url]), None if no axis of the request has two values left"""
+    base, query = url.split("?", 1)
+    specs = query.split(",")
+    selectors = re.findall(r"%5B(.*?)%5D", specs[0])
+    if len(selectors) < 3:
+        return None
+
+    for position, axis in GRIDDAP_SPLIT_AXES:
+        match = _GRID_RANGE.match(selectors[position])
+        if not match or match.group(1) == match.group(3):
+            continue
+        values = griddapAxisValues(url, axis, selectors[position], timeout)
+        if len(values) < 2:
+            continue
+        half = len(values) // 2
+        stride = match.group(2)
+        halves = []
+        for first, last in ((values[0], values[half - 1]), (values[half], values[-1])):
+            new_specs = []
+            for spec in specs:
+                name = spec[:spec.index("%5B")]
+                spec_selectors = re.findall(r"%5B(.*?)%5D", spec)
+                spec_selectors[position] = f"({first}):{stride}:({last})"
+                new_specs.append(name + "".join(f"%5B{s}%5D" for s in spec_selectors))
+            halves.append(f"{base}?{','.join(new_specs)}")
+        return axis, halves
+    return None
+
+def mergeCsvParts(part_paths: List[str], file_path: str) -> None:
+    """Concatenate csvp files into `file_path` under the first file's header, the parts are removed"""
+    tmp_path = f"{file_path}.part"
+    with open(tmp_path, "wb") as out:
+        for i, path in enumerate(part_paths):
+            with open(path, "rb") as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out, http.STREAM_CHUNK_BYTES)
+    os.replace(tmp_path, file_path)
+    for path in part_paths:
+        os.remove(path)
+
+def mergeNcParts(part_paths: List[str], file_path: str, axis: str) -> None:
+    """Concatenate NetCDF files along `axis` into `file_path`, the parts are removed. Needs xarray."""
+    if xr is None:
+        raise ImportError("merging split griddap downloads needs xarray, pip install erddap2agol[griddap]")
+    parts = [xr.open_dataset(path) for path in part_paths]
+    tmp_path = f"{file_path}.part"
+    try:
+        xr.concat(parts, dim=axis).to_netcdf(tmp_path)
+    finally:
+        for ds in parts:
+            ds.close()
+    os.replace(tmp_path, file_path)
+    for path in part_paths:
+        os.remove(path)
+
+#---------------------In-Memory Downloads---------------------
+# A single-file tabledap download below IN_MEMORY_MAX_BYTES is kept in memory
+# (DatasetWrangler.data_buffer) and uploaded straight from the buffer, nothing is
+# written to e2a_temp. A body that grows past the limit spills to the usual file.
+
+IN_MEMORY_MAX_BYTES = 8 << 20
+
+def downloadToBuffer(url: str, file_path: str, timeout: int, max_bytes: int = IN_MEMORY_MAX_BYTES,
+                     on_chunk: Optional[Callable[[bytes], None]] = None, rewrite=None) -> Union[bytes, str]:
+    """
+    Stream `url` into memory, returning the body as bytes, or the path of `file_path` once
+    the body passes `max_bytes` (the rest streams to disk). Returns EMPTY_RESULT for a
+    query with no rows, request errors raise. `rewrite` as for http.writeStream.
+    """
+    buffer = BytesIO()
+    with http.stream(url, timeout=timeout) as response:
+        if isEmptyResult(response):
+            return EMPTY_RESULT
+        response.raise_for_status()
+        chunks = http.rewriteChunks(response.iter_content(chunk_size=http.STREAM_CHUNK_BYTES), rewrite)
+        for chunk in chunks:
+            if on_chunk:
+                on_chunk(chunk)
+            buffer.write(chunk)
+            if buffer.tell() > max_bytes:
+                break
+        else:
+            return buffer.getvalue()
+
+        part_path = f"{file_path}.part"
+        try:
+            with open(part_path, "wb") as f:
+                f.write(buffer.getbuffer())
+                buffer = None
+                for chunk in chunks:
+                    if on_chunk:
+                        on_chunk(chunk)
+                    f.write(chunk)
+            os.replace(part_path, file_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        return file_path
 
 #---------------------DatasetWrangler---------------------
 
@@ -50,7 +470,12 @@ class DatasetWrangler:
     moving_window_days: int = 7
     nc_global: Dict = field(default_factory=dict)
     DAS_filepath: Optional[os.PathLike] = None
+    das_dict: Optional[Dict] = field(default=None, repr=False)
     data_filepath: Optional[Union[os.PathLike, List[os.PathLike]]] = None
+    # body of an in-memory download, data_filepath then only names it and nothing is on disk
+    data_buffer: Optional[bytes] = field(default=None, repr=False)
+    # Parquet copies of the downloaded csvp files, in data_filepath order (see columnar_cache)
+    columnar_filepath: Optional[Union[str, List[str]]] = None
     url_s: Optional[Union[str, List[str]]] = None
     nan_url: Optional[str] = None
     has_error: Optional[bool] = False
@@ -60,6 +485,11 @@ class DatasetWrangler:
     has_alt: Optional[bool] = False
     time_str: Optional[str] = None
     
+    # parsed .das / raw .ncHeader payloads fetched ahead of time by prefetchMetadata
+    prefetched: Optional[Dict] = None
+    # run ledger of a resumable run, verified downloads from an earlier attempt are reused
+    ledger: Optional["rl.RunLedger"] = field(default=None, repr=False)
+
     lat_range = None
     lon_range = None
 
@@ -131,26 +561,29 @@ class DatasetWrangler:
             return func(self, *args, **kwargs)
         return wrapper
 
+    def _getPayload(self, kind: str, fetch: Callable[[], Any]) -> Any:
+        """Return the prefetched payload for `kind` if there is one, otherwise call `fetch`.
+        A prefetched exception is re-raised so both paths hit the same error handling."""
+        if self.prefetched and kind in self.prefetched:
+            payload = self.prefetched.pop(kind)
+            if isinstance(payload, Exception):
+                raise payload
+            return payload
+        return fetch()
+
     def getDas(self) -> None:
         """Fetch and parse DAS metadata.
         Sets major attributes for the dataset"""
-        default_url = f"{self.server}{self.dataset_id}.das"
-        if self.griddap:
-            if "tabledap" in self.server:
-                new_url = default_url.replace("tabledap", "griddap")
-                url = new_url
-            # other griddap params
-            
-        else:
-            url = default_url
+        url = dasUrl(self.server, self.dataset_id, self.griddap)
         try:
             # agnostic of protocol
             # print(url)
-            response = requests.get(url)
-            response.raise_for_status()
+            DAS_Dict = self._getPayload("das", lambda: fetchDas(url))
             self.DAS_response = True
-            DAS_Dict = dc.convertToDict(dc.parseDasResponse(response.text))
-            self.DAS_filepath = dc.saveToJson(DAS_Dict, self.dataset_id)
+            # das_client reads the dict in memory, the JSON copy is an optional write-behind
+            self.das_dict = DAS_Dict
+            if core.user_options.persist_das_bool:
+                self.DAS_filepath = dc.saveToJsonInBackground(DAS_Dict, self.dataset_id)
             
             #check for NC_Global and add to the nc_global attribute
             if "NC_GLOBAL" in DAS_Dict:
@@ -243,11 +676,12 @@ class DatasetWrangler:
             return None
         if self.has_error:
             return None
-        base_url = f"{self.server}{self.dataset_id}.ncHeader?"
+        base_url = ncHeaderUrl(self.server, self.dataset_id)
         print(f"Requesting headers @ {base_url}")
         try:
-            response = requests.get(base_url, timeout=timeOut_time)
-            match = re.search(r'dimensions:\s*(.*?)\s*variables:', response.text, re.DOTALL)
+            response_text = self._getPayload(
+                "ncHeader", lambda: fetchText(base_url, timeOut_time, raise_status=False))
+            match = re.search(r'dimensions:\s*(.*?)\s*variables:', response_text, re.DOTALL)
             if not match:
                 return None
             for line in match.group(1).split('\n'):
@@ -282,10 +716,16 @@ class DatasetWrangler:
     @skipFromError
     def calculateTimeSubset(self) -> dict:
         """Calculate time subsets based on row count.
-        Method applies if self.needs_Subset is True"""
+        Method applies if self.needs_Subset is True.
+        With user_options.adaptive_chunking_bool the subsets follow the dataset's actual
+        row distribution (see planAdaptiveSubsets), uniform time slices are the fallback."""
         chunk_size = self.chunk_size
         if not self.needs_Subset:
             return None
+        if core.user_options.adaptive_chunking_bool:
+            time_chunks = self.planAdaptiveSubsets()
+            if time_chunks:
+                return time_chunks
         try:
             start = self.data_start_time
             end = self.data_end_time
@@ -313,6 +753,46 @@ class DatasetWrangler:
             self.has_error = True
             return None
             
+    def probeTimeCounts(self, bucket: str, timeout_time: int = 120) -> List[tuple]:
+        """Rows per time bucket over the dataset's range, one small orderByCount request"""
+        count_var = "latitude" if "latitude" in (self.attribute_list or []) else \
+            next((a for a in self.attribute_list or [] if a != self.time_str), self.time_str)
+        start = self.data_start_time.strftime('%Y-%m-%dT%H:%M:%S')
+        end = self.data_end_time.strftime('%Y-%m-%dT%H:%M:%S')
+        query = (f'{self.time_str},{count_var}&{self.time_str}>={start}Z&{self.time_str}<={end}Z'
+                 f'&orderByCount("{self.time_str}/{bucket}")')
+        url = f"{self.server}{self.dataset_id}.csvp?{quote(query, safe='&=')}"
+        return parseTimeCounts(fetchText(url, timeout=timeout_time))
+
+    def planAdaptiveSubsets(self) -> Optional[dict]:
+        """
+        Subsets sized from a row-count histogram probed from ERDDAP, so bursty data doesn't
+        produce near-empty subsets next to ones far over chunk_size. None if the server
+        can't answer the probe (orderByCount needs ERDDAP 2.x).
+        """
+        start, end = self.data_start_time, self.data_end_time
+        bucket = probeBucket(end - start)
+        try:
+            counts = self.probeTimeCounts(bucket)
+            if start.tzinfo is None:
+                counts = [(bucket_start.replace(tzinfo=None), rows) for bucket_start, rows in counts]
+            chunks = planTimeChunks(counts, bucket, start, end, self.chunk_size) if counts else None
+        except Exception as e:
+            print(f"{self.dataset_id}: row count probe failed ({e}), using uniform subsets")
+            return None
+        if not chunks:
+            return None
+
+        time_chunks = {
+            f'Subset_{i+1}': {
+                'start': chunk_start.strftime('%Y-%m-%dT%H:%M:%S'),
+                'end': chunk_end.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+            for i, (chunk_start, chunk_end) in enumerate(chunks)
+        }
+        print(f"{self.dataset_id}: {len(time_chunks)} subsets planned from {len(counts)} {bucket} row counts")
+        return time_chunks
+
     def add_time_subset(self, subset_name: str, start: str, end: str) -> None:
         """Add time subset for chunked processing"""
         if not self.subsets:
@@ -328,17 +808,7 @@ class DatasetWrangler:
         """
 
         urls = []
-        # Prepare attributes
-        attrs = []
-        additionalAttr = self.attribute_list.copy() if self.attribute_list else []
-        if additionalAttr and 'depth' in additionalAttr:
-            additionalAttr.remove('depth')
-            attrs.append('depth')
-        if additionalAttr:
-            attrs.extend(additionalAttr)
-        if self.time_str in attrs:
-            attrs.remove(self.time_str)
-        attrs_encoded = '%2C'.join(attrs)
+        attrs_encoded = self._encodedAttributes()
         
         if self.no_time_range:
             url = f"{self.server}{self.dataset_id}.{dataformat}?{attrs_encoded}"
@@ -351,6 +821,19 @@ class DatasetWrangler:
         self.url_s = urls
         return urls
     
+    def _encodedAttributes(self) -> str:
+        """Requested variables (depth first, time excluded) joined for a tabledap query"""
+        attrs = []
+        additionalAttr = self.attribute_list.copy() if self.attribute_list else []
+        if additionalAttr and 'depth' in additionalAttr:
+            additionalAttr.remove('depth')
+            attrs.append('depth')
+        if additionalAttr:
+            attrs.extend(additionalAttr)
+        if self.time_str in attrs:
+            attrs.remove(self.time_str)
+        return '%2C'.join(attrs)
+
     def generateUrl_idv(self, dataformat: str, nrt_update: bool, attrs_encoded: str) -> List[str]:
         """Generate URL for datasets not requiring subsetting."""
         urls = []
@@ -377,15 +860,23 @@ class DatasetWrangler:
     def generateUrl_sub(self, dataformat: str, attrs_encoded: str) -> List[str]:
         """Generate URLs for chunked (subset) datasets."""
         urls = []
+        last = len(self.subsetDict) - 1
         for i, (subset_name, times) in enumerate(self.subsetDict.items()):
+            # subsets share their boundaries, only the last one includes its end time
+            end_op = "%3C%3D" if i == last else "%3C"
             time_constraints = (
                 f"&{self.time_str}%3E%3D{times['start']}Z"
-                f"&{self.time_str}%3C%3D{times['end']}Z"
+                f"&{self.time_str}{end_op}{times['end']}Z"
             )
             url = f"{self.server}{self.dataset_id}.{dataformat}?{self.time_str}%2C{attrs_encoded}{time_constraints}"
             urls.append(url)
         return urls
     
+    def generateUrl_since(self, since: str, dataformat: str = "csvp") -> str:
+        """URL for only the rows strictly newer than `since` (ISO, UTC), used by incremental NRT updates"""
+        time_constraint = f"&{self.time_str}%3E{since}Z"
+        return f"{self.server}{self.dataset_id}.{dataformat}?{self.time_str}%2C{self._encodedAttributes()}{time_constraint}"
+
     def generateGriddap_url(self, griddap_args: dict) -> List[str]:
                
         # lon_sel = "%5B%5D" 
@@ -563,123 +1054,331 @@ class DatasetWrangler:
         """
         if not self.griddap:
             if not self.needs_Subset:
-                return self._writeData_idv(connection_attempts, timeout_time)
+                result = self._writeData_idv(connection_attempts, timeout_time)
             else:
-                return self._writeData_sub(connection_attempts, timeout_time)
+                result = self._writeData_sub(connection_attempts, timeout_time)
+            self.cacheColumnar()
+            return result
         else:
             if getattr(self, "url_labels", None) and len(self.url_s) > 1:
                 return self._writeData_division(connection_attempts, timeout_time=180)
 
         return self._writeData_idv(connection_attempts, timeout_time=180)
     
-    def _downloadUrl(self, url: str, timeout_time: int, subset_num: Optional[int] = None, label_suffix: Optional[str] = None ) -> Optional[str]:
+    def cacheColumnar(self) -> None:
+        """Parquet copies of the downloaded csvp files when user_options.columnar_cache_bool is set"""
+        if not core.user_options.columnar_cache_bool or self.griddap or not self.data_filepath:
+            return
+        if self.data_buffer is not None:
+            return      # small enough to stay in memory, nothing to re-parse
+        if not cc.available():
+            print("\nThe columnar cache needs pyarrow (pip install pyarrow), keeping CSV only")
+            return
+        paths = self.data_filepath if isinstance(self.data_filepath, list) else [self.data_filepath]
+        cached = []
+        for path in paths:
+            try:
+                cached.append(cc.csvToParquet(path, self.das_dict))
+            except Exception as e:
+                print(f"\nCould not cache {os.path.basename(path)} as Parquet: {e}")
+                cached.append(None)
+        self.columnar_filepath = cached if isinstance(self.data_filepath, list) else cached[0]
+
+    def _dataFilename(self, subset_num: Optional[int] = None, label_suffix: Optional[str] = None,
+                      split_part: str = "") -> str:
+        # pieces of a split request are suffixed _p1, _p2, _p21... until they are merged
+        part = f"_p{split_part}" if split_part else ""
+
+        # ----------------------  GRIDDAP  (NetCDF)  ----------------------
+        if self.griddap:
+            if label_suffix:
+                safe = re.sub(r"[^A-Za-z0-9_-]", "_", label_suffix)
+                return f"{self.dataset_id}_{safe}{part}.nc"
+            elif subset_num is not None:
+                return f"{self.dataset_id}_subset_{subset_num}{part}.nc"
+            return f"{self.dataset_id}{part}.nc"
+
+        # ----------------------  TABLEDAP  (CSV)  -----------------------
+        if self.needs_Subset and subset_num is not None:
+            return f"{self.dataset_id}_subset_{subset_num}{part}.csv"
+        return f"{self.dataset_id}{part}.csv"
+
+    def _downloadUrl(self, url: str, timeout_time: int, subset_num: Optional[int] = None, label_suffix: Optional[str] = None,
+                     progress: Optional["DownloadProgress"] = None, split_part: str = "") -> Optional[str]:
         """
-        Download `url` and save it to a temporary file.
+        Stream `url` to a temporary file in fixed-size chunks, memory use is flat
+        regardless of the size of the dataset.
 
-        • tabledap  -> CSV : parsed into a DataFrame, then written *.csv
-        • griddap   -> NetCDF: raw bytes written directly *.nc
+        • tabledap  -> CSV : NaN cells emptied (CsvNaNFilter), optionally checked by a CsvStreamValidator
+        • griddap   -> NetCDF: bytes written as-is to *.nc
 
-        Returns the absolute file-path on success, or None on failure.
+        `progress` (a DownloadProgress) is credited with the bytes / rows of a successful download.
+        With a run ledger the file's checksum is recorded, and a file recorded by an earlier
+        attempt of the run that is still intact on disk is reused without a request.
+        Returns the absolute file-path on success, HTTP_413 / HTTP_TIMEOUT when the request
+        should be split, EMPTY_RESULT when no rows match, or None on other failures.
         """
         try:
-            response = requests.get(url, timeout=timeout_time)
-            response.raise_for_status()                    # 4xx / 5xx → exception
-
             # one call, common to both branches
             temp_dir = ec.getTempDir()
-
-            # ----------------------  GRIDDAP  (NetCDF)  ----------------------
-            if self.griddap:
-                if label_suffix:                             
-                    safe = re.sub(r"[^A-Za-z0-9_-]", "_", label_suffix)
-                    filename = f"{self.dataset_id}_{safe}.nc"
-                elif subset_num is not None:
-                    filename = f"{self.dataset_id}_subset_{subset_num}.nc"
-                else:
-                    filename = f"{self.dataset_id}.nc"
-
-                file_path = os.path.join(temp_dir, filename)
-                with open(file_path, "wb") as f:
-                    f.write(response.content)
+            validator = None
+            filename = self._dataFilename(subset_num, label_suffix, split_part)
+            if not self.griddap and core.user_options.validate_downloads_bool:
+                validator = CsvStreamValidator(requestedColumns(url))
+
+            file_path = os.path.join(temp_dir, filename)
+            if self.ledger and self.ledger.verifiedDownload(self.dataset_id, file_path, url):
+                print(f"\nReusing {filename} from an earlier attempt of this run")
+                if progress:
+                    progress.update(os.path.getsize(file_path), None)
                 return file_path
 
-            # ----------------------  TABLEDAP  (CSV)  -----------------------
-            else:
-                csv_data = StringIO(response.text)
-                df = pd.read_csv(csv_data, header=None, low_memory=False)
-
-                if self.needs_Subset and subset_num is not None:
-                    filename = f"{self.dataset_id}_subset_{subset_num}.csv"
-                else:
-                    filename = f"{self.dataset_id}.csv"
-
-                file_path = os.path.join(temp_dir, filename)
-                df.to_csv(file_path, index=False, header=False)
-
-                return file_path
+            hasher = hashlib.sha256() if self.ledger else None
+            def _onChunk(chunk: bytes) -> None:
+                if hasher:
+                    hasher.update(chunk)
+                if validator:
+                    validator.feed(chunk)
+
+            with http.stream(url, timeout=timeout_time) as response:
+                if not self.griddap and isEmptyResult(response):
+                    return EMPTY_RESULT
+                response.raise_for_status()                    # 4xx / 5xx → exception
+                rewrite = None if self.griddap else CsvNaNFilter()
+                byte_count = http.writeStream(response, file_path, on_chunk=_onChunk, rewrite=rewrite)
+
+            row_count = None
+            if validator:
+                try:
+                    row_count = validator.finish()
+                except ValueError:
+                    os.remove(file_path)
+                    raise
+
+            if hasher:
+                self.ledger.recordDownload(self.dataset_id, file_path, url, hasher.hexdigest(), byte_count)
+            if progress:
+                progress.update(byte_count, row_count)
+            return file_path
 
         except requests.exceptions.Timeout as e:
             print(f"\nTimeout for URL: {url} | Error: {e}")
+            return HTTP_TIMEOUT
         except requests.exceptions.RequestException as e:
             status = getattr(e.response, "status_code", None)
-            if status == "413":
-                print(f"\nHTTP 413 (Payload Too Large) for URL: {url}")
-                return "HTTP_413"
+            if status in SPLIT_STATUSES:
+                print(f"\nHTTP {status} ({e.response.reason}) for URL: {url}")
+                return SPLIT_STATUSES[status]
 
             print(f"\nRequest Exception | Error: {e}")
         except Exception as e:
             print(f"\nError processing URL | Exception: {e}")
 
         return None
-    
+
+    def _splitUrl(self, url: str, timeout_time: int) -> Optional[tuple]:
+        """(axis, [half urls]) for a request to split, None when it can't be cut any further"""
+        if self.griddap:
+            if xr is None:
+                # the halves could be downloaded but never merged back into one file
+                print(f"\n{self.dataset_id}: splitting a griddap request needs xarray to merge the halves "
+                      f"(pip install erddap2agol[griddap]), the request is not split")
+                return None
+            try:
+                return splitGriddapUrl(url, timeout=timeout_time)
+            except Exception as e:
+                print(f"\nCould not read the axis values to split {self.dataset_id}: {e}")
+                return None
+        halves = splitTabledapUrl(url, self.time_str)
+        return (self.time_str, halves) if halves else None
+
+    def _mergeParts(self, results: List[Optional[str]], axis: str, url: str, subset_num: Optional[int],
+                    label_suffix: Optional[str], split_part: str) -> Optional[str]:
+        """
+        Merge the downloaded halves of a split request into the file the whole request
+        would have written. None if a half failed (the other halves are removed),
+        EMPTY_RESULT if no half had any rows.
+        """
+        part_paths = [r for r in results if r and r != EMPTY_RESULT]
+        if any(r is None for r in results):
+            for path in part_paths:
+                os.remove(path)
+            return None
+        if not part_paths:
+            return EMPTY_RESULT
+
+        file_path = os.path.join(ec.getTempDir(), self._dataFilename(subset_num, label_suffix, split_part))
+        if len(part_paths) == 1:
+            os.replace(part_paths[0], file_path)
+        elif self.griddap:
+            mergeNcParts(part_paths, file_path, axis)
+        else:
+            mergeCsvParts(part_paths, file_path)
+
+        if self.ledger:
+            self.ledger.recordDownload(self.dataset_id, file_path, url, rl.fileChecksum(file_path),
+                                       os.path.getsize(file_path))
+        return file_path
+
+    def _downloadWithSplit(self, url: str, connection_attempts: int, timeout_time: int,
+                           progress: Optional["DownloadProgress"] = None, subset_num: Optional[int] = None,
+                           label_suffix: Optional[str] = None, split_part: str = "", depth: int = 0) -> Optional[str]:
+        """
+        _downloadUrl with retries and backoff. A 413 or timeout splits the request in two
+        (see splitTabledapUrl / splitGriddapUrl) and the halves are downloaded the same way
+        and merged, so an oversized request succeeds without tuning chunk_size.
+        Returns the file path, EMPTY_RESULT, or None on failure.
+        """
+        part = subset_num or label_suffix or "data"
+        for attempt in range(1, connection_attempts + 1):
+            print(f"\nDownloading {self.dataset_id} part {part}{split_part and f'.{split_part}'} "
+                  f"(Attempt: {attempt}/{connection_attempts})")
+            result = self._downloadUrl(url, timeout_time, subset_num, label_suffix, progress, split_part)
+            if result in (HTTP_413, HTTP_TIMEOUT):
+                break
+            if result:
+                return result
+            if attempt < connection_attempts:
+                time.sleep(http.backoffDelay(attempt))
+        else:
+            return None
+        return self._splitDownload(url, connection_attempts, timeout_time, progress, subset_num,
+                                   label_suffix, split_part, depth)
+
+    def _splitDownload(self, url: str, connection_attempts: int, timeout_time: int,
+                       progress: Optional["DownloadProgress"] = None, subset_num: Optional[int] = None,
+                       label_suffix: Optional[str] = None, split_part: str = "", depth: int = 0) -> Optional[str]:
+        """The halves of a request that hit 413 or timed out, downloaded with _downloadWithSplit and merged"""
+        part = subset_num or label_suffix or "data"
+        max_depth = int(core.user_options.split_retry_depth or 0)
+        split = self._splitUrl(url, timeout_time) if depth < max_depth else None
+        if not split:
+            print(f"\n{self.dataset_id} part {part} can't be split any further (depth {depth}/{max_depth})")
+            return None
+        axis, halves = split
+        print(f"\nSplitting {self.dataset_id} part {part} in two on {axis} (depth {depth + 1}/{max_depth})")
+        if progress:
+            progress.addParts(len(halves) - 1)
+
+        results = [
+            self._downloadWithSplit(half, connection_attempts, timeout_time, progress, subset_num,
+                                    label_suffix, f"{split_part}{i}", depth + 1)
+            for i, half in enumerate(halves, start=1)
+        ]
+        return self._mergeParts(results, axis, url, subset_num, label_suffix, split_part)
+
+    def writeNewRows(self, since: str, timeout_time: int = 120) -> tuple:
+        """
+        Stream only the rows newer than `since` to {dataset_id}_new.csv, or into data_buffer
+        when small. Returns (file path, row count), or (None, 0) when ERDDAP has nothing newer.
+        Request errors raise, a header that doesn't match the request raises ValueError.
+        """
+        url = self.generateUrl_since(since)
+        file_path = os.path.join(ec.getTempDir(), f"{self.dataset_id}_new.csv")
+        validator = CsvStreamValidator(requestedColumns(url))
+
+        # a small body stays in data_buffer, nothing is written to disk
+        max_bytes = IN_MEMORY_MAX_BYTES if core.user_options.in_memory_upload_bool else 0
+        self.data_buffer = None
+        body = downloadToBuffer(url, file_path, timeout_time, max_bytes=max_bytes, on_chunk=validator.feed,
+                                rewrite=CsvNaNFilter())
+        if body == EMPTY_RESULT:
+            return None, 0
+        in_memory = isinstance(body, bytes)
+
+        try:
+            row_count = validator.finish()
+        except ValueError:
+            if not in_memory:
+                os.remove(file_path)
+            raise
+        if row_count == 0:
+            if not in_memory:
+                os.remove(file_path)
+            return None, 0
+        if in_memory:
+            self.data_buffer = body
+        self.data_filepath = file_path
+        return file_path, row_count
+
     def _writeData_idv(self, connection_attempts: int, timeout_time: int) -> Optional[str]:
         """
         Download data from a single URL (non-subset case).
         Returns the file path on success, or None on failure.
         """
         url = self.url_s[0]
-        attempts = 0
-        filepath = None
-        while attempts < connection_attempts and not filepath:
-            attempts += 1
-            print(f"\nDownloading data data for {self.dataset_title} (Attempt: {attempts}/{connection_attempts})")
-            filepath = self._downloadUrl(url, timeout_time)
-            if filepath == "413" and self.griddap:
-                break
-            if filepath and filepath != "HTTP_413":
-                self.data_filepath = filepath
-                return filepath
-        else:
+        progress = DownloadProgress(self.dataset_id, 1)
+        print(f"\nDownloading data for {self.dataset_title}")
+        filepath = self._downloadToMemory(url, timeout_time, progress) if self._bufferable() else None
+        if filepath in (HTTP_413, HTTP_TIMEOUT):
+            # the server already refused the whole request, asking again on disk would only repeat that
+            filepath = self._splitDownload(url, connection_attempts, timeout_time, progress)
+        elif filepath is None:
+            filepath = self._downloadWithSplit(url, connection_attempts, timeout_time, progress)
+        if filepath == EMPTY_RESULT:
+            print(f"\nNo rows matched the request for {self.dataset_title}")
+            filepath = None
+        if not filepath:
+            print(f"\nMax retries exceeded for {self.dataset_id} URL: {url}")
             self.has_error = True
             return None
+        self.data_filepath = filepath
+        print(f"\n{progress.summary()}")
+        return filepath
     
+    def _bufferable(self) -> bool:
+        """Single-file tabledap (not glider) download that may stay in memory"""
+        if not core.user_options.in_memory_upload_bool or self.griddap or self.is_glider or self.ledger:
+            return False
+        # roughly 100 bytes a row, larger datasets go straight to disk
+        return self.row_count is None or self.row_count * 100 <= IN_MEMORY_MAX_BYTES
+
+    def _downloadToMemory(self, url: str, timeout_time: int, progress: "DownloadProgress") -> Optional[str]:
+        """
+        downloadToBuffer for _writeData_idv, sets data_buffer when the body stayed in memory.
+        Returns the (logical) file path, EMPTY_RESULT, HTTP_413 / HTTP_TIMEOUT when the request
+        should be split, or None to retry on the disk path.
+        """
+        file_path = os.path.join(ec.getTempDir(), self._dataFilename())
+        validator = CsvStreamValidator(requestedColumns(url)) if core.user_options.validate_downloads_bool else None
+        try:
+            body = downloadToBuffer(url, file_path, timeout_time, on_chunk=validator.feed if validator else None,
+                                    rewrite=CsvNaNFilter())
+            if body == EMPTY_RESULT:
+                return EMPTY_RESULT
+            row_count = validator.finish() if validator else None
+        except requests.exceptions.Timeout as e:
+            print(f"\nTimeout for URL: {url} | Error: {e}")
+            return HTTP_TIMEOUT
+        except requests.exceptions.RequestException as e:
+            status = getattr(e.response, "status_code", None)
+            if status in SPLIT_STATUSES:
+                print(f"\nHTTP {status} ({e.response.reason}) for URL: {url}")
+                return SPLIT_STATUSES[status]
+            print(f"\nIn-memory download failed ({e}), retrying to disk")
+            return None
+        except Exception as e:
+            print(f"\nIn-memory download failed ({e}), retrying to disk")
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            return None
+
+        if isinstance(body, bytes):
+            self.data_buffer = body
+            progress.update(len(body), row_count)
+        else:
+            progress.update(os.path.getsize(file_path), row_count)
+        return file_path
+
     def _writeData_sub(self, connection_attempts: int, timeout_time: int) -> Optional[List[str]]:
         """
-        Download data in subsets (chunked case).
-        Returns a list of file paths on success, or None on failure.
+        Download data in subsets (chunked case), several subsets at a time.
+        Returns a list of file paths in subset (time) order on success, or None on failure.
         """
         print(f"\nDownloading data for {self.dataset_id}")
-        filepaths = []
-        urls_queue = deque([(url, i + 1) for i, url in enumerate(self.url_s)])
-        attempts_dict = {url: 0 for url in self.url_s}
-        
-        while urls_queue:
-            url, subset_index = urls_queue.popleft()
-            attempts_dict[url] += 1
-            attempt_num = attempts_dict[url]
-            print(
-                f"\nDownloading subset {subset_index}/{len(self.url_s)} "
-                f"(Attempt: {attempt_num}/{connection_attempts})"
-            )
-            filepath = self._downloadUrl(url, timeout_time, subset_index)
-            if filepath:
-                filepaths.append(filepath)
-            else:
-                if attempt_num < connection_attempts:
-                    urls_queue.append((url, subset_index))
-                else:
-                    print(f"\nMax retries exceeded for subset {subset_index} URL: {url}")
-                    self.has_error = True
+        jobs = [(url, {"subset_num": i + 1}) for i, url in enumerate(self.url_s)]
+        results = self._downloadParallel(jobs, connection_attempts, timeout_time)
+        filepaths = [fp for fp in results if fp]
         if filepaths:
             self.data_filepath = filepaths
             return filepaths
@@ -691,37 +1390,41 @@ class DatasetWrangler:
         """
         Download each griddap division URL (day/week/month buckets).
         """
-        filepaths     = []
-        url_pairs     = list(zip(self.url_s, self.url_labels))   # label can be None
-        urls_queue    = deque(url_pairs)
-        attempts_dict = {url: 0 for url, _ in url_pairs}
-
-        while urls_queue:
-            url, label = urls_queue.popleft()
-            attempts_dict[url] += 1
-            attempt_num = attempts_dict[url]
-
-            print(f"\nDownloading chunk '{label or 'slice'}' "
-                f"(Attempt {attempt_num}/{connection_attempts})")
-
-            fp = self._downloadUrl(url,
-                                timeout_time,
-                                label_suffix=label)
-
-            if fp:
-                filepaths.append(fp)
-            else:
-                if attempt_num < connection_attempts:
-                    urls_queue.append((url, label))
-                else:
-                    print(f"Max retries exceeded for chunk '{label}'")
-                    self.has_error = True
-
+        jobs = [(url, {"label_suffix": label}) for url, label in zip(self.url_s, self.url_labels)]
+        results = self._downloadParallel(jobs, connection_attempts, timeout_time)
+        filepaths = [fp for fp in results if fp]
         if filepaths:
             self.data_filepath = filepaths
             return filepaths
         return None
 
+    def _downloadParallel(self, jobs: List[tuple], connection_attempts: int, timeout_time: int) -> List[Optional[str]]:
+        """
+        Download (url, _downloadUrl kwargs) jobs with user_options.subset_workers threads,
+        each job retried with backoff and split on 413 / timeout. Results come back in job
+        order, None where a job failed or matched no rows.
+        """
+        progress = DownloadProgress(self.dataset_id, len(jobs))
+
+        def _job(job) -> Optional[str]:
+            url, kwargs = job
+            part = kwargs.get("subset_num") or kwargs.get("label_suffix") or "slice"
+            filepath = self._downloadWithSplit(url, connection_attempts, timeout_time, progress, **kwargs)
+            if filepath == EMPTY_RESULT:
+                print(f"\n{self.dataset_id} part {part} has no rows, skipping it")
+                return None
+            if filepath:
+                return filepath
+            print(f"\nMax retries exceeded for {self.dataset_id} part {part} URL: {url}")
+            self.has_error = True
+            return None
+
+        max_workers = max(1, min(len(jobs), int(core.user_options.subset_workers or 1)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_job, jobs))
+        print(f"\n{progress.summary()}")
+        return results
+
     def calculateTimeRange(self, intervalType=None) -> int:
         start = datetime.fromisoformat(self.data_start_time)
         end = datetime.fromisoformat(self.data_end_time)
@@ -1,9 +1,11 @@
-import sys, os, requests, json, pandas as pd
+import sys, os, requests, json, time, threading, pandas as pd
 from datetime import datetime, timedelta
+from typing import Dict, Optional
 from io import StringIO
 import tempfile
 from . import data_wrangler as dw
 from . import das_client as dc
+from . import http_client as http
 from erddap2agol import run
 
 
@@ -49,36 +51,150 @@ def getErddapConfDir():
 
     return os.path.join(erddap_conf_dir, 'active_erddaps.json')
 
-def getErddapList() -> None:
-    url = "https://raw.githubusercontent.com/IrishMarineInstitute/awesome-erddap/master/erddaps.json"
-    response = requests.get(url)
-    
+#---------------------Server registry---------------------
+# The awesome-erddap list is cached next to active_erddaps.json and revalidated with
+# its ETag once ERDDAP_LIST_TTL has passed, so listing or picking a server normally
+# costs no request. A health table (server_health.json) keeps each server's latency,
+# ERDDAP version and when it was last seen up. A server's /version endpoint is probed
+# when it is selected, the list only shows what earlier probes recorded, so listing
+# ~100 servers never fans out requests to all of them.
+
+ERDDAP_LIST_URL = "https://raw.githubusercontent.com/IrishMarineInstitute/awesome-erddap/master/erddaps.json"
+ERDDAP_LIST_TTL = 24 * 3600
+HEALTH_TTL = 3600
+HEALTH_TIMEOUT = 10
+SLOW_SERVER_MS = 2000
+_health_lock = threading.Lock()
+
+def _confPath(filename: str) -> str:
+    return os.path.join(os.path.dirname(getErddapConfDir()), filename)
+
+def _readJson(filepath: str, default):
+    try:
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def _writeJson(filepath: str, data) -> None:
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, filepath)
+
+def getErddapList(refresh: bool = False) -> Optional[str]:
+    """
+    Path of the cached awesome-erddap list. Used as is while younger than ERDDAP_LIST_TTL,
+    then revalidated with a conditional GET (a 304 only renews it). When GitHub can't be
+    reached an existing copy is kept.
+    """
+    filepath = getErddapConfDir()
+    meta_path = _confPath('active_erddaps.meta.json')
+    meta = _readJson(meta_path, {}) if os.path.exists(filepath) else {}
+    if meta and not refresh and time.time() - meta.get("fetched_at", 0) < ERDDAP_LIST_TTL:
+        return filepath
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        response = http.get(ERDDAP_LIST_URL, headers=headers, timeout=30)
+    except requests.exceptions.RequestException as e:
+        if meta:
+            print(f"\nCould not refresh the ERDDAP list ({e}), using the cached copy")
+            return filepath
+        print(f"\nFailed to fetch ERDDAP List from {ERDDAP_LIST_URL}: {e}")
+        return None
+
+    if response.status_code == 304 and meta:
+        meta["fetched_at"] = time.time()
+        _writeJson(meta_path, meta)
+        return filepath
+
     if response.status_code == 200:
         try:
             data = response.json()
         except json.JSONDecodeError as e:
-            print(f"Error decoding ERDDAP list from {url}")
+            print(f"Error decoding ERDDAP list from {ERDDAP_LIST_URL}")
             print(f"Error: {e}")
-            return
-        
-        filepath = getErddapConfDir()
-
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=4)
-        
+            return filepath if meta else None
+
+        _writeJson(filepath, data)
+        _writeJson(meta_path, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        })
         return filepath
     else:
-        print(f"\nFailed to fetch ERDDAP List from {url}.") 
+        print(f"\nFailed to fetch ERDDAP List from {ERDDAP_LIST_URL}.")
         print(f"Status code: {response.status_code}")
-        return None
+        return filepath if meta else None
+
+def erddapBaseUrl(url: str) -> str:
+    """awesome-erddap url with index.html and trailing slashes removed"""
+    if url.endswith("index.html"):
+        url = url[:-10]
+    return url.rstrip('/')
+
+def loadHealth() -> Dict[str, Dict]:
+    return _readJson(_confPath('server_health.json'), {})
+
+def probeServer(baseurl: str, timeout: int = HEALTH_TIMEOUT) -> Dict:
+    """GET {baseurl}/version, record latency / version / up-down in the health table and return the entry"""
+    baseurl = erddapBaseUrl(baseurl)
+    now = time.time()
+    started = time.perf_counter()
+    try:
+        response = http.get(f"{baseurl}/version", timeout=timeout)
+        # body looks like "ERDDAP_version=2.23", servers older than 1.82 have no /version page
+        version = response.text.strip().split("=", 1)[-1][:20] if response.ok else "unknown"
+        if response.status_code == 404:
+            response = http.get(baseurl, timeout=timeout)
+        response.raise_for_status()
+        entry = {
+            "up": True,
+            "latency_ms": round((time.perf_counter() - started) * 1000),
+            "version": version,
+            "last_up": now,
+        }
+    except requests.exceptions.RequestException as e:
+        entry = {"up": False, "error": str(e)[:200]}
+
+    with _health_lock:
+        table = loadHealth()
+        previous = table.get(baseurl, {})
+        entry = {**previous, **entry, "checked_at": now}
+        table[baseurl] = entry
+        _writeJson(_confPath('server_health.json'), table)
+    return entry
+
+def healthLabel(entry: Optional[Dict]) -> str:
+    """Short status for the server list, empty while a server hasn't been probed"""
+    if not entry:
+        return ""
+    if not entry.get("up"):
+        if entry.get("last_up"):
+            return f"[DOWN, last up {datetime.fromtimestamp(entry['last_up']).strftime('%Y-%m-%d')}]"
+        return "[DOWN]"
+    version = entry.get("version", "unknown")
+    label = f"[{'v' + version if version != 'unknown' else 'old version'}, {entry.get('latency_ms', '?')} ms"
+    if entry.get("latency_ms", 0) > SLOW_SERVER_MS:
+        label += ", SLOW"
+    return label + "]"
 
 def showErddapList() -> None:
     filepath = getErddapList()
     with open(filepath, 'r') as f:
         data = json.load(f)
-    
+
+    # statuses from earlier probes only, a server is probed when it is selected (setErddap)
+    health = loadHealth()
     for index, erddap in enumerate(data, start=1):
-        print(f"{index}. ERDDAP Server: {erddap['name']}")
+        label = healthLabel(health.get(erddapBaseUrl(erddap['url'])))
+        print(f"{index}. ERDDAP Server: {erddap['name']} {label}".rstrip())
 
 
 
@@ -167,36 +283,38 @@ class ERDDAPHandler:
             if baseurl.endswith("index.html"):
                 baseurl = baseurl[:-10].rstrip('/')
 
-            try:
-                serv_check = requests.get(baseurl)
-                serv_check.raise_for_status()
-
-                server_url = f"{baseurl}/{protocol}/"
-              
+            # a recent successful probe stands in for the liveness check
+            health = loadHealth().get(erddapBaseUrl(baseurl), {})
+            if not (health.get("up") and time.time() - health.get("checked_at", 0) < HEALTH_TTL):
+                health = probeServer(baseurl)
+            if not health.get("up"):
+                print(f"{erddap_dict['name']} is not responding ({health.get('error', 'unknown error')})")
+                return None
+            if health.get("latency_ms", 0) > SLOW_SERVER_MS:
+                print(f"Note: {erddap_dict['name']} is slow to respond ({health['latency_ms']} ms)")
 
-                # Set server info URL 
-                # https://www.ncei.noaa.gov/erddap/tabledap/allDatasets.json
-                server_info_url = f"{baseurl}tabledap/allDatasets.json"
-                # server_info_url = f"{baseurl}/info/index.json?itemsPerPage=100000"
-                
+            server_url = f"{baseurl}/{protocol}/"
+          
 
-                return cls(
-                    server= server_url,
-                    serverInfo= server_info_url,
-                    protocol= protocol,
-                    datasetid=None,
-                    fileType = None,
-                    geoParams = {
-                    "locationType": "coordinates",
-                    "latitudeFieldName": "latitude__degrees_north_",
-                    "longitudeFieldName": "longitude__degrees_east_",
-                    "timeFieldName": "time__UTC_",
-                    },
-                )
+            # Set server info URL 
+            # https://www.ncei.noaa.gov/erddap/tabledap/allDatasets.json
+            server_info_url = f"{baseurl}tabledap/allDatasets.json"
+            # server_info_url = f"{baseurl}/info/index.json?itemsPerPage=100000"
             
-            except requests.exceptions.HTTPError as http_err:
-                print(f"HTTP error {http_err} occurred when connecting to {baseurl}")
-                return None
+
+            return cls(
+                server= server_url,
+                serverInfo= server_info_url,
+                protocol= protocol,
+                datasetid=None,
+                fileType = None,
+                geoParams = {
+                "locationType": "coordinates",
+                "latitudeFieldName": "latitude__degrees_north_",
+                "longitudeFieldName": "longitude__degrees_east_",
+                "timeFieldName": "time__UTC_",
+                },
+            )
     @property
     def availData(self): 
         if self._availData is None:
@@ -282,7 +400,7 @@ class ERDDAPHandler:
         # ---------------------------------------------------------
 
         try:
-            resp = requests.get(self.serverInfo, timeout=30)
+            resp = http.get(self.serverInfo, timeout=30)
             resp.raise_for_status()
             data = resp.json()
 
@@ -326,8 +444,9 @@ class ERDDAPHandler:
             print(f"Error fetching dataset ID list: {exc}")
             return []
         
-    def createDatasetObjects(self, dataset_ids: list, griddap_kwargs: dict= None) -> None:
-        """Creates DatasetWrangler objects for each dataset ID from the attributes of the selected data"""
+    def createDatasetObjects(self, dataset_ids: list, griddap_kwargs: dict= None, prefetch: bool = True) -> None:
+        """Creates DatasetWrangler objects for each dataset ID from the attributes of the selected data.
+        With prefetch, DAS/ncHeader requests run concurrently before the objects are built."""
         if "gliders.ioos.us" in self.server:
             gliderBool = True
         else:
@@ -342,6 +461,11 @@ class ERDDAPHandler:
             griddap_bool = False
             kwargs = None
 
+        if prefetch:
+            payloads = dw.prefetchMetadata(self.server, dataset_ids, griddap_bool, self.is_nrt, gliderBool)
+        else:
+            payloads = {}
+
         for dataset_id in dataset_ids:
             dataset = dw.DatasetWrangler(
                 dataset_id= dataset_id,
@@ -350,16 +474,15 @@ class ERDDAPHandler:
                 griddap= griddap_bool,
                 is_nrt= self.is_nrt,
                 is_glider= gliderBool,
-                griddap_args=kwargs
+                griddap_args=kwargs,
+                prefetched=payloads.get(dataset_id)
             )
             self.datasets.append(dataset)
-    
-    
-       
+
     def getDatasetsFromSearch(self, search: str) -> list:
         url = f"{self.serverInfo}"
         try:
-            responseObj = requests.get(url)
+            responseObj = http.get(url)
         
             if responseObj.status_code != 200:
                 print(f"Error fetching dataset list: {responseObj.status_code}")
@@ -430,7 +553,7 @@ class ERDDAPHandler:
     @staticmethod
     def return_response(generatedUrl: str):
         try:
-            response = requests.get(generatedUrl)
+            response = http.get(generatedUrl)
             response.raise_for_status()
             return response.text, response.status_code
         except Exception as err:
@@ -0,0 +1,198 @@
+import json, os
+from typing import Iterable, Iterator, List
+import numpy as np
+import pandas as pd
+from . import columnar_cache as cc
+
+#--------------------------------------------------------------------------------
+# Glider track GeoJSON.
+# A glider csvp becomes one LineString feature per pair of consecutive fixes,
+# carrying the properties of the segment's end point. Segment coordinates come
+# from shifted NumPy arrays and the properties are JSON-encoded a column at a
+# time, so no per-row Series are built. Features are written to disk one by one,
+# the FeatureCollection never exists in memory as a whole.
+#
+# Track modes instead merge the fixes of each dive / profile, or of each hour or
+# day, into one MultiLineString with aggregated attributes, optionally simplified
+# with Douglas-Peucker, cutting the feature count by the points per group.
+#--------------------------------------------------------------------------------
+
+GLIDER_X = "longitude (degrees_east)"
+GLIDER_Y = "latitude (degrees_north)"
+GLIDER_TIME = "time (UTC)"
+
+TRACK_MODES = ("segments", "profile", "hour", "day")
+# csvp column names (units stripped) that identify a dive / profile, first match wins
+PROFILE_COLUMNS = ("profile_id", "profile", "dive_number", "dive", "divenum")
+_TIME_BUCKETS = {"hour": "60min", "day": "1D"}
+METERS_PER_DEGREE = 111320.0
+
+
+def jsonColumn(series: pd.Series) -> List[str]:
+    """JSON literals for every value of a column, missing / non-finite values become null"""
+    if series.dtype.kind == "M":
+        # typed times (columnar cache) are written the way the csvp has them
+        series = series.dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    values = series.to_numpy()
+    if series.dtype.kind == "f":
+        # float32 (typed columnar data) as its own shortest repr, not the widened double's
+        literals = [str(v) for v in values] if values.dtype.itemsize == 4 else [repr(v) for v in values.tolist()]
+        for i in np.flatnonzero(~np.isfinite(values)):
+            literals[i] = "null"
+        return literals
+    if series.dtype.kind in "iu":
+        return [str(v) for v in values.tolist()]
+    if series.dtype.kind == "b":
+        return ["true" if v else "false" for v in values.tolist()]
+    missing = series.isna().to_numpy()
+    return ["null" if gone else json.dumps(v) for v, gone in zip(values.tolist(), missing)]
+
+def segmentFeatures(df: pd.DataFrame, X: str = GLIDER_X, Y: str = GLIDER_Y) -> Iterator[str]:
+    """
+    Encoded GeoJSON LineString features joining each fix to the next, rows without
+    coordinates are dropped first. Properties are the end point's non-coordinate columns.
+    """
+    df = df.dropna(subset=[X, Y])
+    if len(df) < 2:
+        return
+    xs = df[X].to_numpy(dtype=float)
+    ys = df[Y].to_numpy(dtype=float)
+    segments = np.column_stack([xs[:-1], ys[:-1], xs[1:], ys[1:]]).tolist()
+
+    data_columns = [col for col in df.columns if col not in (X, Y)]
+    end_points = df[data_columns].iloc[1:]
+    keys = [f"{json.dumps(str(col))}: " for col in data_columns]
+    columns = [jsonColumn(end_points[col]) for col in data_columns]
+
+    rows = zip(*columns) if columns else [()] * len(segments)
+    for (x0, y0, x1, y1), values in zip(segments, rows):
+        properties = ", ".join(key + value for key, value in zip(keys, values))
+        yield ('{"type": "Feature", "geometry": {"type": "LineString", '
+               f'"coordinates": [[{x0!r}, {y0!r}], [{x1!r}, {y1!r}]]}}, "properties": {{{properties}}}}}')
+
+#---------------------Track Mode---------------------
+def simplifyMask(xs: np.ndarray, ys: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker on coordinate arrays, True for the points to keep. Iterative, each
+    step measures the whole span between two kept points at once.
+    """
+    n = len(xs)
+    keep = np.zeros(n, dtype=bool)
+    if n < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        dx, dy = xs[j] - xs[i], ys[j] - ys[i]
+        px, py = xs[i + 1:j] - xs[i], ys[i + 1:j] - ys[i]
+        norm = np.hypot(dx, dy)
+        dist = np.abs(dy * px - dx * py) / norm if norm else np.hypot(px, py)
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    return keep
+
+def _baseName(col: str) -> str:
+    return str(col).split(" (", 1)[0].strip()
+
+def trackGroups(df: pd.DataFrame, mode: str, time_col: str = GLIDER_TIME) -> pd.Series:
+    """Group key of every row for a track mode, profile mode falls back to hours without a profile column"""
+    if mode == "profile":
+        by_name = {_baseName(col).lower(): col for col in df.columns}
+        profile_col = next((by_name[name] for name in PROFILE_COLUMNS if name in by_name), None)
+        if profile_col is not None:
+            return df[profile_col]
+        print("No profile / dive column in the glider data, grouping the track by hour instead")
+        mode = "hour"
+    times = pd.to_datetime(df[time_col], utc=True, errors="coerce")
+    return times.dt.floor(_TIME_BUCKETS[mode])
+
+def trackFeatures(df: pd.DataFrame, mode: str, tolerance_m: float = 0.0, X: str = GLIDER_X,
+                  Y: str = GLIDER_Y, time_col: str = GLIDER_TIME) -> Iterator[str]:
+    """
+    Encoded MultiLineString features, one per group of `mode`. Each run of consecutive
+    fixes in a group is a part, starting at the previous run's last fix so the track has
+    no gaps. Numeric attributes are group means, others the group's first value, plus
+    point_count and the group's end_time. `tolerance_m` > 0 simplifies every part.
+    """
+    df = df.dropna(subset=[X, Y]).reset_index(drop=True)
+    if len(df) < 2:
+        return
+    xs = df[X].to_numpy(dtype=float)
+    ys = df[Y].to_numpy(dtype=float)
+    has_time = time_col in df.columns
+    keys = trackGroups(df, mode, time_col) if (mode == "profile" or has_time) else pd.Series(0, index=df.index)
+    # missing keys (no profile id, unparseable time) form their own group
+    keys = keys.astype(object).where(keys.notna(), "missing")
+
+    # simplification in degrees of latitude, longitude scaled to match at the track's latitude
+    tolerance = max(float(tolerance_m or 0), 0.0) / METERS_PER_DEGREE
+    x_scale = np.cos(np.radians(np.nanmean(ys)))
+
+    run_ids = (keys != keys.shift()).cumsum().to_numpy()
+    run_starts = np.flatnonzero(np.diff(run_ids, prepend=run_ids[0] - 1))
+    run_ends = np.append(run_starts[1:], len(df))
+    parts: dict = {}
+    for start, end in zip(run_starts, run_ends):
+        lo = max(start - 1, 0)
+        if end - lo < 2:
+            continue
+        keep = simplifyMask(xs[lo:end] * x_scale, ys[lo:end], tolerance)
+        coords = np.column_stack([xs[lo:end][keep], ys[lo:end][keep]]).tolist()
+        parts.setdefault(keys.iat[start], []).append(coords)
+
+    data_columns = [col for col in df.columns if col not in (X, Y)]
+    # the profile column is the group key, it stays as the group's value rather than a mean
+    numeric = [col for col in data_columns if df[col].dtype.kind in "iufb" and col != keys.name]
+    grouped = df[data_columns].groupby(keys, sort=False)
+    attributes = grouped.first()
+    if numeric:
+        attributes[numeric] = grouped[numeric].mean()
+    attributes["point_count"] = grouped.size()
+    if has_time:
+        attributes["end_time"] = grouped[time_col].last()
+    attributes = attributes.loc[[key for key in attributes.index if key in parts]]
+
+    names = [f"{json.dumps(str(col))}: " for col in attributes.columns]
+    columns = [jsonColumn(attributes[col]) for col in attributes.columns]
+    for key, values in zip(attributes.index, zip(*columns)):
+        properties = ", ".join(name + value for name, value in zip(names, values))
+        yield ('{"type": "Feature", "geometry": {"type": "MultiLineString", '
+               f'"coordinates": {json.dumps(parts[key])}}}, "properties": {{{properties}}}}}')
+
+def writeFeatureCollection(features: Iterable[str], savepath: str) -> int:
+    """Stream encoded features into a FeatureCollection at `savepath`, returns the feature count"""
+    tmp_path = f"{savepath}.part"
+    count = 0
+    with open(tmp_path, "w") as f:
+        f.write('{"type": "FeatureCollection", "features": [')
+        for feature in features:
+            if count:
+                f.write(", ")
+            f.write(feature)
+            count += 1
+        f.write("]}")
+    os.replace(tmp_path, savepath)
+    return count
+
+def csvToLineGeojson(filepath: str, savepath: str, X: str = GLIDER_X, Y: str = GLIDER_Y,
+                     mode: str = "segments", tolerance_m: float = 0.0, columnar_path: str = None) -> int:
+    """
+    Glider csvp at `filepath` -> FeatureCollection at `savepath`, returns the feature count.
+    `mode` "segments" writes a LineString per pair of fixes, the other TRACK_MODES a
+    MultiLineString per dive / profile, hour or day (see trackFeatures). The table is read
+    from `columnar_path`, its Parquet copy, when there is one.
+    """
+    df = cc.readTable(filepath, parquet_path=columnar_path)
+    if mode in (None, "segments"):
+        return writeFeatureCollection(segmentFeatures(df, X, Y), savepath)
+    if mode not in TRACK_MODES:
+        raise ValueError(f"unknown glider track mode {mode!r}, expected one of {TRACK_MODES}")
+    return writeFeatureCollection(trackFeatures(df, mode, tolerance_m, X, Y), savepath)
@@ -0,0 +1,191 @@
+import os, random, threading, requests
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+#--------------------------------------------------------------------------------
+# Shared HTTP client for every ERDDAP (and awesome-erddap) request.
+# One pooled keep-alive session per host, urllib3 retries with exponential backoff
+# that honour Retry-After on 429/503, and a per-host cap on in-flight requests so
+# the concurrent stages don't hammer small regional servers.
+#--------------------------------------------------------------------------------
+
+MAX_REQUESTS_PER_HOST = 4
+RETRY_ATTEMPTS = 3
+BACKOFF_FACTOR = 1.0
+BACKOFF_MAX = 60
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+USER_AGENT = "erddap2agol"
+STREAM_CHUNK_BYTES = 1 << 20
+
+
+class HostSlots:
+    """
+    Counting semaphore for one host whose limit can change while slots are held.
+    Lowering it lets the requests in flight finish, new ones wait until the count
+    is under the new limit.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def setLimit(self, limit: int) -> None:
+        with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    def release(self) -> None:
+        with self._cond:
+            if self.active <= 0:
+                raise ValueError("host slot released too many times")
+            self.active -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+_sessions: Dict[str, requests.Session] = {}
+_host_slots: Dict[str, HostSlots] = {}
+_lock = threading.Lock()
+
+
+def hostKey(url: str) -> str:
+    """scheme://netloc of a url, used to key sessions and concurrency slots"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+def setHostLimit(limit: int) -> None:
+    """Change the per-host cap, including hosts with requests in flight"""
+    global MAX_REQUESTS_PER_HOST
+    with _lock:
+        MAX_REQUESTS_PER_HOST = max(1, int(limit))
+        for slot in _host_slots.values():
+            slot.setLimit(MAX_REQUESTS_PER_HOST)
+
+def _retryPolicy() -> Retry:
+    # read errors are left to the callers' own attempt loops, a timed out
+    # download shouldn't silently cost 3x its timeout here
+    return Retry(
+        total=RETRY_ATTEMPTS,
+        connect=RETRY_ATTEMPTS,
+        read=0,
+        status=RETRY_ATTEMPTS,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+def getSession(url: str) -> requests.Session:
+    """Return the pooled session for the host of `url`, creating it on first use"""
+    key = hostKey(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=max(10, MAX_REQUESTS_PER_HOST),
+                max_retries=_retryPolicy(),
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT})
+            _sessions[key] = session
+        return session
+
+def hostSlot(url: str) -> HostSlots:
+    key = hostKey(url)
+    with _lock:
+        slot = _host_slots.get(key)
+        if slot is None:
+            slot = HostSlots(MAX_REQUESTS_PER_HOST)
+            _host_slots[key] = slot
+        return slot
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    requests.get through the shared session, holding one of the host's slots.
+    Use stream() instead when the body is read incrementally.
+    """
+    with hostSlot(url):
+        return getSession(url).get(url, **kwargs)
+
+@contextmanager
+def stream(url: str, **kwargs) -> Iterator[requests.Response]:
+    """Streaming GET that keeps the host slot until the body has been consumed"""
+    with hostSlot(url):
+        response = getSession(url).get(url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
+
+def rewriteChunks(chunks: Iterable[bytes], rewrite=None) -> Iterator[bytes]:
+    """
+    `chunks` passed through `rewrite`, any object with feed(chunk) -> bytes and
+    flush() -> bytes (see data_wrangler.CsvNaNFilter). Unchanged without one.
+    """
+    for chunk in chunks:
+        yield rewrite.feed(chunk) if rewrite else chunk
+    if rewrite:
+        yield rewrite.flush()
+
+def writeStream(response: requests.Response, file_path: str, chunk_size: int = STREAM_CHUNK_BYTES,
+                on_chunk: Optional[Callable[[bytes], None]] = None, rewrite=None) -> int:
+    """
+    Write a streamed response body to `file_path` chunk by chunk and return the byte count.
+    The body lands in a .part file that is only renamed once complete. With `rewrite`
+    (see rewriteChunks) the rewritten bytes are what is written, counted and passed to on_chunk.
+    """
+    part_path = f"{file_path}.part"
+    written = 0
+    try:
+        with open(part_path, "wb") as f:
+            for chunk in rewriteChunks(response.iter_content(chunk_size=chunk_size), rewrite):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                written += len(chunk)
+                if on_chunk:
+                    on_chunk(chunk)
+        os.replace(part_path, file_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return written
+
+def backoffDelay(attempt: int) -> float:
+    """Exponential backoff with jitter for the download retry loops (attempt starts at 1)"""
+    delay = min(BACKOFF_MAX, BACKOFF_FACTOR * (2 ** max(0, attempt - 1)))
+    return delay + random.uniform(0, delay / 2)
+
+def closeSessions() -> None:
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+def _resetAfterFork() -> None:
+    # a forked worker (NRT process pool) must not reuse the parent's pooled sockets,
+    # they are dropped without closing so the parent's connections stay intact
+    global _sessions, _host_slots, _lock
+    _sessions, _host_slots, _lock = {}, {}, threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_resetAfterFork)
@@ -0,0 +1,152 @@
+import os, json, time, sqlite3, hashlib, threading
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+#--------------------------------------------------------------------------------
+# SQLite run ledger for resumable multi-dataset runs.
+# Every dataset of a run records the stages it has completed (DAS fetched, size
+# known, each file downloaded with its checksum, item added, published, each
+# subset appended). Rerunning the same selection after a crash skips whatever the
+# ledger says is already done instead of re-downloading and creating _1 duplicates.
+# A run is identified by server + protocol + dataset ids, its rows are cleared once
+# every dataset is done, and rows older than RUN_LEDGER_TTL are ignored.
+#--------------------------------------------------------------------------------
+
+RUN_LEDGER_TTL = 24 * 3600
+HASH_CHUNK_BYTES = 1 << 20
+
+STAGE_DAS = "das"
+STAGE_SIZE = "size"
+STAGE_DOWNLOAD = "download"
+STAGE_ADDED = "added"
+STAGE_PUBLISHED = "published"
+STAGE_APPENDED = "appended"
+STAGE_DONE = "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stages (
+    run_key     TEXT NOT NULL,
+    dataset_id  TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    part        TEXT NOT NULL DEFAULT '',
+    checksum    TEXT,
+    detail      TEXT,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (run_key, dataset_id, stage, part)
+)
+"""
+
+
+def getLedgerPath() -> str:
+    agol_home = os.getenv('AGOL_HOME', '/arcgis/home')
+    os.makedirs(agol_home, exist_ok=True)
+    return os.path.join(agol_home, 'e2a_run_ledger.sqlite')
+
+def runKey(server: str, protocol: str, dataset_ids: List[str]) -> str:
+    """Stable id for a selection, the same server/protocol/datasets resume the same run"""
+    ids = ",".join(sorted(dataset_ids or []))
+    return hashlib.sha1(f"{server}|{protocol}|{ids}".encode("utf-8")).hexdigest()
+
+def fileChecksum(file_path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+@dataclass
+class RunLedger:
+    run_key: str
+    db_path: str = field(default_factory=getLedgerPath)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute("DELETE FROM stages WHERE updated_at < ?", (time.time() - RUN_LEDGER_TTL,))
+
+    @classmethod
+    def forRun(cls, server: str, protocol: str, dataset_ids: List[str]) -> "RunLedger":
+        ledger = cls(runKey(server, protocol, dataset_ids))
+        resumed = ledger.datasetsWithProgress()
+        if resumed:
+            print(f"\nResuming an earlier run, {len(resumed)} dataset(s) have recorded progress")
+        return ledger
+
+    def _connect(self) -> sqlite3.Connection:
+        # a connection per call, the pipeline stages write from several threads
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    #---------------------Records---------------------
+    def record(self, dataset_id: str, stage: str, part: str = "", checksum: str = None, detail: Dict = None) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.run_key, dataset_id, stage, part, checksum, json.dumps(detail or {}), time.time()),
+            )
+
+    def get(self, dataset_id: str, stage: str, part: str = "") -> Optional[Dict]:
+        """The record of a completed stage as {"checksum", **detail}, None if it hasn't completed"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT checksum, detail FROM stages WHERE run_key=? AND dataset_id=? AND stage=? AND part=?",
+                (self.run_key, dataset_id, stage, part),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"checksum": row[0], **json.loads(row[1] or "{}")}
+
+    def parts(self, dataset_id: str, stage: str) -> Dict[str, Dict]:
+        """All recorded parts of a stage, keyed by part"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT part, checksum, detail FROM stages WHERE run_key=? AND dataset_id=? AND stage=?",
+                (self.run_key, dataset_id, stage),
+            ).fetchall()
+        return {part: {"checksum": checksum, **json.loads(detail or "{}")} for part, checksum, detail in rows}
+
+    def isDone(self, dataset_id: str) -> bool:
+        return self.get(dataset_id, STAGE_DONE) is not None
+
+    def datasetsWithProgress(self) -> List[str]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT DISTINCT dataset_id FROM stages WHERE run_key=?", (self.run_key,)).fetchall()
+        return [r[0] for r in rows]
+
+    #---------------------Stage helpers---------------------
+    def recordMetadata(self, dataset) -> None:
+        """DAS / size stages of a DatasetWrangler once its __post_init__ has run"""
+        if dataset.DAS_response:
+            self.record(dataset.dataset_id, STAGE_DAS, detail={"attributes": len(dataset.attribute_list or [])})
+        if dataset.row_count is not None:
+            self.record(dataset.dataset_id, STAGE_SIZE, detail={"row_count": dataset.row_count})
+
+    def recordDownload(self, dataset_id: str, file_path: str, url: str, checksum: str, byte_count: int) -> None:
+        self.record(dataset_id, STAGE_DOWNLOAD, part=os.path.basename(file_path), checksum=checksum,
+                    detail={"url": url, "bytes": byte_count})
+
+    def verifiedDownload(self, dataset_id: str, file_path: str, url: str) -> bool:
+        """True when `file_path` was downloaded from `url` earlier in this run and is unchanged on disk"""
+        entry = self.get(dataset_id, STAGE_DOWNLOAD, part=os.path.basename(file_path))
+        if not entry or entry.get("url") != url or not os.path.exists(file_path):
+            return False
+        if os.path.getsize(file_path) != entry.get("bytes"):
+            return False
+        return fileChecksum(file_path) == entry["checksum"]
+
+    #---------------------Run completion---------------------
+    def finish(self, dataset_ids: List[str]) -> bool:
+        """Clear the run once every dataset is done, otherwise keep it for the next attempt"""
+        pending = [d for d in dataset_ids if not self.isDone(d)]
+        if pending:
+            print(f"\n{len(pending)} dataset(s) did not finish, rerun the same selection to resume them")
+            return False
+        self.clear()
+        return True
+
+    def clear(self) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM stages WHERE run_key=?", (self.run_key,))
@@ -1,7 +1,11 @@
 from arcgis.gis import GIS
 from dataclasses import dataclass, field
 from typing import Optional, Dict
-import sys
+from datetime import datetime, timezone
+import sys, os, io, re, json, time, hashlib, concurrent.futures
+import pandas as pd
+from . import http_client as http
+from . import catalog_index as ci
 
 @dataclass
 class UpdateManager:
@@ -83,3 +87,212 @@ class UpdateManager:
         except Exception as e:
             print(f"An error occurred while searching for items: {e}")
 
+
+#---------------------Incremental NRT updates---------------------
+# Instead of overwriting the whole moving window, read the newest timestamp
+# already in the layer, append only the rows after it and trim rows that
+# have fallen out of the window.
+
+def layerTimeField(feature_layer, time_str: str = None) -> Optional[str]:
+    """Name of the layer's date field, preferring the one published from the ERDDAP time variable"""
+    date_fields = [f["name"] for f in feature_layer.properties.fields if f["type"] == "esriFieldTypeDate"]
+    if not date_fields:
+        return None
+    if time_str:
+        for name in date_fields:
+            if name.lower().startswith(time_str.lower()):
+                return name
+    return date_fields[0]
+
+def layerMaxTime(feature_layer, time_field: str) -> Optional[datetime]:
+    """Newest value of `time_field` in the layer (UTC), None for an empty layer"""
+    result = feature_layer.query(
+        where="1=1",
+        out_statistics=[{
+            "statisticType": "max",
+            "onStatisticField": time_field,
+            "outStatisticFieldName": "max_time",
+        }],
+        return_geometry=False,
+    )
+    if not result.features:
+        return None
+    max_time = result.features[0].attributes.get("max_time")
+    if max_time is None:
+        return None
+    if isinstance(max_time, datetime):
+        return max_time if max_time.tzinfo else max_time.replace(tzinfo=timezone.utc)
+    # hosted layers report dates as epoch milliseconds
+    return datetime.fromtimestamp(max_time / 1000, tz=timezone.utc)
+
+def appendCsv(gis: GIS, feature_layer, csv_path: str, title: str, data: bytes = None) -> bool:
+    """
+    Upload `csv_path` as a temporary item, append it to the layer, then remove the item.
+    With `data` the CSV is uploaded from memory and `csv_path` only names it.
+    """
+    user_root = gis.content.folders.get()
+    item_properties = {"title": f"{title}_{int(time.time())}", "type": "CSV", "tags": "e2a_temp"}
+    if data is not None:
+        # Folder.add validates "fileName" but names the upload from "file_name"
+        item_properties["fileName"] = item_properties["file_name"] = os.path.basename(csv_path)
+    item = user_root.add(
+        item_properties=item_properties,
+        file=csv_path if data is None else io.BytesIO(data),
+    ).result()
+    try:
+        analyze_params = gis.content.analyze(item=item.id, file_type="csv")
+        return bool(feature_layer.append(
+            item_id=item.id,
+            upload_format="csv",
+            source_info=analyze_params["publishParameters"],
+            upsert=False,
+        ))
+    finally:
+        if gis.properties.portalName == "ArcGIS Enterprise":
+            item.delete()
+        else:
+            item.delete(permanent=True)
+
+#---------------------Direct feature edits---------------------
+# A handful of new rows is cheaper to send with edit_features than through a
+# staging item (add, analyze, append, delete). Columns are matched to the layer's
+# fields by their sanitized names, "time (UTC)" -> time__UTC_.
+
+EDIT_FEATURES_MAX_ROWS = 2000
+EDIT_BATCH_ROWS = 500
+
+def _fieldKey(name: str) -> str:
+    return re.sub(r"[^0-9a-z]", "_", str(name).lower())
+
+def frameFeatures(df: pd.DataFrame, feature_layer) -> list:
+    """Point features (WGS84) for the rows of a tabledap csvp frame, attributes named like the layer's fields"""
+    fields = {_fieldKey(f["name"]): f for f in feature_layer.properties.fields}
+    base = {col: str(col).split(" (", 1)[0].strip().lower() for col in df.columns}
+    x_col = next((col for col, name in base.items() if name == "longitude"), None)
+    y_col = next((col for col, name in base.items() if name == "latitude"), None)
+
+    columns = {}
+    for col in df.columns:
+        field = fields.get(_fieldKey(col))
+        if field is None:
+            continue
+        values = df[col]
+        if field["type"] == "esriFieldTypeDate":
+            # hosted layers take dates as epoch milliseconds
+            times = pd.to_datetime(values, utc=True, errors="coerce")
+            values = pd.Series((times - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1), index=df.index)
+            values = values.where(times.notna())
+        columns[field["name"]] = values.astype(object).where(values.notna(), None).tolist()
+
+    names = list(columns)
+    xs = df[x_col].tolist() if x_col is not None else [None] * len(df)
+    ys = df[y_col].tolist() if y_col is not None else [None] * len(df)
+    features = []
+    for i, row in enumerate(zip(*columns.values()) if names else [()] * len(df)):
+        feature = {"attributes": dict(zip(names, row))}
+        if pd.notna(xs[i]) and pd.notna(ys[i]):
+            feature["geometry"] = {"x": float(xs[i]), "y": float(ys[i]), "spatialReference": {"wkid": 4326}}
+        features.append(feature)
+    return features
+
+def appendRows(feature_layer, data: bytes, batch_size: int = EDIT_BATCH_ROWS) -> int:
+    """Add the rows of an in-memory csvp body with edit_features, returns the number of features added"""
+    df = pd.read_csv(io.BytesIO(data), low_memory=False)
+    features = frameFeatures(df, feature_layer)
+    added = 0
+    for start in range(0, len(features), batch_size):
+        result = feature_layer.edit_features(adds=features[start:start + batch_size])
+        added += sum(1 for r in result.get("addResults", []) if r.get("success"))
+    return added
+
+def pruneBefore(feature_layer, time_field: str, cutoff: datetime) -> int:
+    """Delete rows older than `cutoff`, returns the number of features removed"""
+    where = f"{time_field} < TIMESTAMP '{cutoff.strftime('%Y-%m-%d %H:%M:%S')}'"
+    result = feature_layer.delete_features(where=where)
+    return sum(1 for r in result.get("deleteResults", []) if r.get("success"))
+
+
+#---------------------NRT change detection---------------------
+# Before a cycle, one allDatasets request per server gives every NRT dataset's
+# current maxTime. Items whose maxTime matches the one stored when they were last
+# published are skipped outright. Full overwrites also hash the payload as it
+# downloads, an unchanged hash skips the overwrite. Appends hash the new rows: the
+# stored hash is only saved after a successful append, so the same rows coming back
+# (a layer max time that didn't move past them) are not appended a second time. Every item is still refreshed
+# once NRT_MAX_SKIP_AGE has passed so expired rows leave the moving window.
+
+NRT_MAX_SKIP_AGE = 24 * 3600
+PAYLOAD_HASH_CHUNK = 1 << 20
+
+def getNrtStatePath() -> str:
+    agol_home = os.getenv('AGOL_HOME', '/arcgis/home')
+    os.makedirs(agol_home, exist_ok=True)
+    return os.path.join(agol_home, 'e2a_nrt_state.json')
+
+def loadNrtState() -> Dict[str, Dict]:
+    """{agol_id: {"dataset_id", "max_time", "payload_hash", "published_at"}}"""
+    try:
+        with open(getNrtStatePath(), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def saveNrtState(state: Dict[str, Dict]) -> None:
+    filepath = getNrtStatePath()
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp_path, filepath)
+
+def catalogMaxTimes(datasets: Dict[str, Dict[str, Optional[str]]], timeout: int = 60) -> Dict[str, str]:
+    """
+    {dataset_id: maxTime} from one allDatasets request per server, every server at once.
+    Datasets whose server can't be reached, or that report no maxTime, are left out.
+    """
+    by_root: Dict[str, set] = {}
+    for dataset_id, info in datasets.items():
+        if info.get("base_url"):
+            by_root.setdefault(ci.erddapRoot(info["base_url"]), set()).add(dataset_id)
+    if not by_root:
+        return {}
+
+    def _fetch(root: str) -> Dict[str, str]:
+        try:
+            response = http.get(f"{root}/tabledap/allDatasets.json?datasetID,maxTime", timeout=timeout)
+            response.raise_for_status()
+            rows = response.json()["table"]["rows"]
+        except Exception as e:
+            print(f"Could not read dataset max times from {root}: {e}")
+            return {}
+        return {ds_id: max_time for ds_id, max_time in rows if ds_id in by_root[root] and max_time}
+
+    max_times: Dict[str, str] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(by_root)) as executor:
+        for found in executor.map(_fetch, by_root):
+            max_times.update(found)
+    return max_times
+
+def isUnchanged(entry: Optional[Dict], max_time: Optional[str], max_age: int = NRT_MAX_SKIP_AGE) -> bool:
+    """True when the item was published from the same maxTime recently enough to skip it"""
+    if not entry or not max_time or entry.get("max_time") != max_time:
+        return False
+    return time.time() - entry.get("published_at", 0) < max_age
+
+def payloadHash(data: bytes = None, file_path: str = None) -> str:
+    """blake2b digest of an in-memory body or of a file, the same digest downloadWithHash computes"""
+    hasher = hashlib.blake2b()
+    if data is not None:
+        hasher.update(data)
+        return hasher.hexdigest()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(PAYLOAD_HASH_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def downloadWithHash(url: str, file_path: str, timeout: int = 300) -> str:
+    """Stream `url` to `file_path`, returning the blake2b digest computed along the way"""
+    hasher = hashlib.blake2b()
+    with http.stream(url, timeout=timeout) as response:
+        response.raise_for_status()
+        http.writeStream(response, file_path, chunk_size=PAYLOAD_HASH_CHUNK, on_chunk=hasher.update)
+    return hasher.hexdigest()
@@ -77,7 +77,12 @@
 
 import os, sys, datetime, tempfile, json, time, traceback, platform
 import urllib.request, urllib.parse, shutil, filecmp, zlib
-import base64, collections
+import base64, collections, hashlib
+
+try:
+    import xxhash    # Optional, faster than zlib.crc32 on large files when installed
+except ImportError:
+    xxhash = None
 
 if not __name__ == "__main__":
     # Make sure arcgis module is loaded if importing
@@ -92,6 +97,9 @@ dataItemTypes = ["Service Definition", "CSV", "Shapefile", "Tile Package", "Feat
 ] # From 'Service2Data' Relationship, less 'Feature Service': https://developers.arcgis.com/rest/users-groups-and-items/relationship-types.htm
 
 # Item types that are simply a file-based item
+blockSize = 1 << 20     # Read/Download buffer, files are never read whole into memory
+hashAlgorithm = "auto"  # Content digest: "auto" (xxhash if installed, else crc32), "xxhash", "blake2b", or "crc32"
+
 fileItemTypes = ["Microsoft Word", "Microsoft PowerPoint", "PDF", "Image", "Visio Document", "Map Package", "Code Sample"] + dataItemTypes
 
 def _getManager( item, verbose=None, outcome=None):
@@ -151,17 +159,62 @@ Return: True or False if <compoundKey> is in <obj> (checkIfIn = True)
             return True if checkIfIn else obj[ keys[0]]
         return False
 
-def _getCRC( filename):
-    # Calculate CRC for datafile <filename>
-    crc = 0
+class _CRC32:
+    # Chained crc32 with the hashlib interface
+    def __init__( self):
+        self.value = 0
+    def update( self, block):
+        self.value = zlib.crc32( block, self.value)
+    def hexdigest( self):
+        return "{:08x}".format( self.value & 0xffffffff)
+
+def _resolveAlgorithm( algorithm=None):
+    # Name of digest actually used for <algorithm>, "auto" and "xxhash" fall back to crc32 without xxhash
+    algorithm = (algorithm or hashAlgorithm).lower()
+    if algorithm in ["auto", "xxhash"]:
+        return "xxhash" if xxhash else "crc32"
+    return algorithm if algorithm == "blake2b" else "crc32"
+
+def _newHasher( algorithm=None):
+    # Return streaming hasher for <algorithm>, defaults to module 'hashAlgorithm'
+    algorithm = _resolveAlgorithm( algorithm)
+    if algorithm == "xxhash":
+        return xxhash.xxh3_64() if hasattr( xxhash, "xxh3_64") else xxhash.xxh64()
+    if algorithm == "blake2b":
+        return hashlib.blake2b()
+    return _CRC32()
+
+def _getCRC( filename, algorithm=None):
+    # Calculate content digest for datafile <filename>, read in 'blockSize' chunks
+    hasher = _newHasher( algorithm)
     if os.path.exists( filename):
         with open( filename, "rb") as iFP:
-            block = True
+            block = iFP.read( blockSize)
             while block:
-                block = iFP.read()
-                if block:
-                    crc += zlib.crc32( block) & 0xffffffff
-    return crc
+                hasher.update( block)
+                block = iFP.read( blockSize)
+    return hasher.hexdigest()
+
+def _savedCRC( filename, algorithm=None):
+    # Digest recorded for <filename> when it was downloaded, None if missing or the file changed since
+    try:
+        with open( filename + ".crc", "r") as iFP:
+            saved = json.load( iFP)
+        stat = os.stat( filename)
+        if saved[ "algorithm"] == _resolveAlgorithm( algorithm) and saved[ "filesize"] == stat.st_size and saved[ "mtime"] == stat.st_mtime:
+            return saved[ "CRC"]
+    except Exception:
+        pass
+    return None
+
+def _saveCRC( filename, crcValue, algorithm=None):
+    # Record digest of freshly downloaded <filename>, so the next run skips re-reading it
+    try:
+        stat = os.stat( filename)
+        with open( filename + ".crc", "w") as oFP:
+            json.dump( {"algorithm": _resolveAlgorithm( algorithm), "CRC": crcValue, "filesize": stat.st_size, "mtime": stat.st_mtime}, oFP)
+    except Exception:
+        pass
 
 def _asyncJob( service, endpoint, data, verbose=None, indent="", noWait=False, timeout=None):
     """Internal Function: _asyncJob( <service>, <endpoint>, <data>[, <verbose>[, <indent>[, <noWait>]])
@@ -2134,6 +2187,7 @@ Or
             # Download Web data for update!
             #
             lastFile = {}
+            downloadCRC = None
             if updateFile.split(":")[0].lower() in ["ftp", "http", "https"]:
                 outputFile = os.path.join( tempfile.gettempdir() if not outPath else outPath, outputFile)
 
@@ -2199,7 +2253,7 @@ Or
                             # Trigger CRC File comparison if we have an existing download!
                             # Save CRC, Size, and Name of existing file
                             crcStart = datetime.datetime.now()
-                            crcValue = _getCRC( outputFile)
+                            crcValue = _savedCRC( outputFile) or _getCRC( outputFile)
                             lastFile = { "filename": outputFile, "CRC": crcValue, "filesize": os.stat( outputFile).st_size}
                             if maxVerbose:
                                 print( "\nElapsed Time to Calc CRC value on existing file: {}, Value: {}".format( datetime.datetime.now() - crcStart, crcValue))
@@ -2212,13 +2266,18 @@ Or
                     if not verbose == False:
                         print( "\nDownloading Data...")
 
+                    # Digest is computed while downloading, no second pass over the file
+                    hasher = _newHasher()
                     with open( outputFile, "wb") as oFP:
-                        buffer = request.read()
+                        buffer = request.read( blockSize)
                         while buffer:
                             oFP.write( buffer)
-                            buffer = request.read()
+                            hasher.update( buffer)
+                            buffer = request.read( blockSize)
 
                         updateFile = outputFile
+                        downloadCRC = hasher.hexdigest()
+                    _saveCRC( outputFile, downloadCRC)
 
                 except Exception as e:
                     status = "Failed to Download data from url, Outcome: '{}'".format( e)
@@ -2348,7 +2407,7 @@ Or
                     # Same Size, Check contents
                     #if filecmp.cmp( updateFile, lastFile):
                     crcStart = datetime.datetime.now()
-                    crcValue = _getCRC( updateFile)
+                    crcValue = downloadCRC if downloadCRC else _getCRC( updateFile)
                     if maxVerbose:
                         print( "\nElapsed Time to Calc CRC value on file download: {}, Value: {}".format( datetime.datetime.now() - crcStart, crcValue))
 
@@ -0,0 +1,204 @@
+import time, heapq, itertools, multiprocessing as mp
+from multiprocessing.connection import wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+from . import http_client as http
+
+#--------------------------------------------------------------------------------
+# Process pool with per-task deadlines.
+# concurrent.futures can't stop a task once it runs, so a hung overwrite holds its
+# worker until the pool shuts down. Here every worker is a process of its own with
+# a private pipe: a task past its deadline gets its worker killed and replaced, and
+# goes back on a retry queue with backoff. A cycle budget bounds the whole run,
+# whatever is still queued or running when it is spent is reported as skipped.
+#--------------------------------------------------------------------------------
+
+POLL_SECONDS = 1.0
+
+
+@dataclass
+class TaskResult:
+    key: Any
+    status: str                 # "done", "failed", "timeout" or "skipped"
+    value: Any = None
+    error: str = ""
+    attempts: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class _Task:
+    key: Any
+    func: Callable
+    args: tuple
+    attempts: int = 0
+
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Any
+    task: Optional[_Task] = None
+    started: float = 0.0
+    deadline: float = 0.0
+
+
+def _workerLoop(conn, initializer: Optional[Callable]) -> None:
+    """Runs in the worker process, one task at a time until it receives None"""
+    if initializer:
+        initializer()
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        func, args = message
+        try:
+            conn.send((True, func(*args)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class DeadlinePool:
+    """
+    run() yields a TaskResult per task as they finish. A task that overruns `timeout`
+    or whose worker dies is retried up to `retries` times after http.backoffDelay,
+    the last attempt is reported as "timeout" / "failed". A task that raises fails at once.
+    """
+    def __init__(self, max_workers: int = 4, timeout: float = 300, retries: int = 1,
+                 cycle_budget: float = 0, initializer: Optional[Callable] = None):
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.cycle_budget = cycle_budget or 0
+        self.initializer = initializer
+        self._workers: List[_Worker] = []
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = mp.Pipe()
+        process = mp.Process(target=_workerLoop, args=(child_conn, self.initializer), daemon=True)
+        process.start()
+        child_conn.close()
+        return _Worker(process=process, conn=parent_conn)
+
+    def _kill(self, worker: _Worker) -> None:
+        worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+
+    def _replace(self, worker: _Worker, respawn: bool = True) -> None:
+        self._kill(worker)
+        if respawn:
+            self._workers[self._workers.index(worker)] = self._spawn()
+        else:
+            self._workers.remove(worker)
+
+    def shutdown(self) -> None:
+        for worker in self._workers:
+            if worker.task is None and worker.process.is_alive():
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+                worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+        self._workers = []
+
+    def run(self, tasks: List[Tuple[Any, Callable, tuple]]) -> Iterator[TaskResult]:
+        queue = [_Task(key, func, args) for key, func, args in tasks]
+        if not queue:
+            return
+        queue.reverse()             # popped from the end, so tasks start in the given order
+        retry_heap: List[Tuple[float, int, _Task]] = []
+        self._retry_ids = itertools.count()
+        cycle_end = time.time() + self.cycle_budget if self.cycle_budget else float("inf")
+        self._workers = [self._spawn() for _ in range(min(self.max_workers, len(queue)))]
+        try:
+            while queue or retry_heap or any(w.task for w in self._workers):
+                now = time.time()
+                if now >= cycle_end:
+                    yield from self._abandon(queue, retry_heap)
+                    return
+
+                while retry_heap and retry_heap[0][0] <= now:
+                    queue.append(heapq.heappop(retry_heap)[2])
+                for worker in list(self._workers):
+                    if worker.task is None and queue:
+                        task = queue.pop()
+                        task.attempts += 1
+                        worker.task, worker.started = task, time.time()
+                        worker.deadline = worker.started + self.timeout if self.timeout else float("inf")
+                        try:
+                            worker.conn.send((task.func, task.args))
+                        except OSError:
+                            # the worker died before its first task, e.g. in the initializer
+                            worker.task = None
+                            result = self._lost(worker, task, "worker process died", queue, retry_heap)
+                            if result:
+                                yield result
+
+                busy = [w for w in self._workers if w.task]
+                wake = min([w.deadline for w in busy] + [cycle_end] + [r[0] for r in retry_heap[:1]])
+                ready = wait([w.conn for w in busy], timeout=max(0.0, min(wake - time.time(), POLL_SECONDS)))
+
+                now = time.time()
+                for worker in busy:
+                    task = worker.task
+                    if worker.conn in ready:
+                        try:
+                            ok, value = worker.conn.recv()
+                        except (EOFError, OSError):
+                            ok, value = None, "worker process died"
+                    elif now >= worker.deadline:
+                        ok, value = None, f"no result after {self.timeout} s"
+                    elif not worker.process.is_alive():
+                        ok, value = None, "worker process died"
+                    else:
+                        continue
+
+                    seconds = now - worker.started
+                    worker.task = None
+                    if ok:
+                        yield TaskResult(task.key, "done", value=value, attempts=task.attempts, seconds=seconds)
+                        continue
+                    if ok is False:
+                        # the task raised, retrying won't change a bad item
+                        yield TaskResult(task.key, "failed", error=value, attempts=task.attempts, seconds=seconds)
+                        continue
+
+                    result = self._lost(worker, task, value, queue, retry_heap)
+                    if result:
+                        yield result
+        finally:
+            self.shutdown()
+
+    def _lost(self, worker: _Worker, task: _Task, reason: str, queue: List[_Task],
+              retry_heap: list) -> Optional[TaskResult]:
+        """
+        A hung or dead worker can't be reused, its replacement logs in afresh. The task goes
+        on the retry heap, or its final "failed" / "timeout" result is returned.
+        """
+        now = time.time()
+        retry = task.attempts <= self.retries
+        self._replace(worker, respawn=bool(retry or queue or retry_heap))
+        status = "failed" if "died" in reason else "timeout"
+        if retry:
+            heapq.heappush(retry_heap, (now + http.backoffDelay(task.attempts), next(self._retry_ids), task))
+            print(f"Retrying {task.key} (attempt {task.attempts + 1}) after {status}: {reason}")
+            return None
+        return TaskResult(task.key, status, error=reason, attempts=task.attempts, seconds=now - worker.started)
+
+    def _abandon(self, queue: List[_Task], retry_heap: list) -> Iterator[TaskResult]:
+        """Results for everything left when the cycle budget runs out"""
+        for worker in self._workers:
+            if worker.task:
+                task, worker.task = worker.task, None
+                self._kill(worker)
+                yield TaskResult(task.key, "skipped", error="cycle budget spent while running",
+                                 attempts=task.attempts, seconds=time.time() - worker.started)
+        for task in reversed(queue):
+            yield TaskResult(task.key, "skipped", error="cycle budget spent", attempts=task.attempts)
+        for _, _, task in sorted(retry_heap):
+            yield TaskResult(task.key, "skipped", error="cycle budget spent before retry", attempts=task.attempts)
@@ -0,0 +1,76 @@
+import os, sys
+from contextlib import contextmanager
+import pytest, requests
+
+# tests import the package as `src`, the way the notebooks and erddap_client_tests do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+
+@pytest.fixture(autouse=True)
+def agolHome(tmp_path, monkeypatch):
+    """Every test gets its own AGOL_HOME, nothing is written to /arcgis/home"""
+    monkeypatch.setenv("AGOL_HOME", str(tmp_path))
+    return tmp_path
+
+
+class FakeResponse:
+    """Stand-in for requests.Response: status, body, headers and a json payload"""
+    def __init__(self, status_code=200, text="", headers=None, payload=None):
+        self.status_code = status_code
+        self.content = text.encode() if isinstance(text, str) else text
+        self.text = self.content.decode()
+        self.headers = headers or {}
+        self.payload = payload
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def iter_content(self, chunk_size=1):
+        return (self.content[i:i + chunk_size] for i in range(0, len(self.content), chunk_size))
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(str(self.status_code), response=self)
+
+    def close(self):
+        pass
+
+
+class FakeServer:
+    """
+    Stands in for http.get / http.stream. Records (url, headers) for every request and
+    answers with `respond(url, headers)`, which returns a FakeResponse or an exception to raise.
+    """
+    def __init__(self):
+        self.requests = []
+        self.respond = lambda url, headers: FakeResponse()
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        self.requests.append((url, headers or {}))
+        result = self.respond(url, headers or {})
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    @contextmanager
+    def stream(self, url, **kwargs):
+        yield self.get(url, **kwargs)
+
+    @property
+    def urls(self):
+        return [url for url, headers in self.requests]
+
+
+@pytest.fixture
+def fakeResponse():
+    return FakeResponse
+
+
+@pytest.fixture
+def fakeServer():
+    return FakeServer()
@@ -0,0 +1,60 @@
+from src import catalog_harvest as ch
+from src import catalog_index as ci
+
+COLUMNS = ["datasetID", "title", "summary", "maxTime", "tabledap"]
+A, B, C = "https://a/erddap", "https://b/erddap", "https://c/erddap"
+
+
+def _index(root, *rows):
+    return ci.CatalogIndex.fromCatalog(root, {"table": {"columnNames": COLUMNS, "rows": [list(r) + ["x"] for r in rows]}})
+
+
+def _catalog(health=None):
+    catalog = ch.HarvestedCatalog(indexes={
+        A: _index(A, ("buoy1", "Buoy 1", "wind", "2024-01-01T00:00:00Z"),
+                  ("glider", "Glider", "temperature", "2023-01-01T00:00:00Z")),
+        B: _index(B, ("buoy1", "Buoy  1", "wind", "2024-03-01T00:00:00Z"),
+                  ("local", "Local temperature", "temperature", "2024-01-01T00:00:00Z")),
+        C: _index(C, ("glider", "Glider", "temperature", "2023-01-01T00:00:00Z"),
+                  ("buoy1", "Another buoy", "wind", "2024-06-01T00:00:00Z")),
+    })
+    catalog.dedupe(health or {})
+    return catalog
+
+
+def test_mirrors_are_listed_once_from_the_latest_copy():
+    entries = {(e.dataset_id, e.title): e for e in _catalog().entries()}
+    assert len(entries) == 4
+    buoy = entries[("buoy1", "Buoy  1")]
+    assert (buoy.server, buoy.mirrors) == (B, [A])
+    # same id, different title: not a mirror
+    assert entries[("buoy1", "Another buoy")].mirrors == []
+
+
+def test_equal_copies_prefer_the_faster_server():
+    glider = [e for e in _catalog().entries() if e.dataset_id == "glider"]
+    assert [(e.server, e.mirrors) for e in glider] == [(A, [C])]
+
+    health = {A: {"latency_ms": 900}, C: {"latency_ms": 50}}
+    glider = [e for e in _catalog(health).entries() if e.dataset_id == "glider"]
+    assert [(e.server, e.mirrors) for e in glider] == [(C, [A])]
+
+
+def test_search_collapses_mirrors():
+    results = _catalog().search("temperature")
+    assert [(e.dataset_id, e.server) for e in results] == [("local", B), ("glider", A)]
+    assert results[1].url == "https://a/erddap/tabledap/glider"
+
+
+def test_harvestCatalogs_lists_failed_servers(monkeypatch):
+    indexes = {A: _index(A, ("buoy1", "Buoy 1", "wind", ""))}
+    monkeypatch.setattr(ci, "getCatalogIndex", lambda root, refresh, ttl: indexes.get(root))
+    catalog = ch.harvestCatalogs([A + "/tabledap/", B, A])
+    assert list(catalog.indexes) == [A]
+    assert catalog.failed == [B]
+    assert len(catalog) == 1
+
+
+def test_datasetsByServer():
+    entries = [ch.CatalogEntry("x", A), ch.CatalogEntry("y", B), ch.CatalogEntry("z", A)]
+    assert ch.datasetsByServer(entries) == {A: ["x", "z"], B: ["y"]}
@@ -0,0 +1,77 @@
+import pytest
+from src import catalog_index as ci
+
+ROOT = "https://h/erddap"
+COLUMNS = ["datasetID", "title", "summary", "institution", "cdm_data_type",
+           "minLongitude", "maxLongitude", "minLatitude", "maxLatitude",
+           "minTime", "maxTime", "griddap", "tabledap"]
+ROWS = [
+    ["allDatasets", "All Datasets", "", "", "Other", None, None, None, None, "", "", "", "x"],
+    ["buoy_42001", "Temperature at Buoy 42001", "Sea surface temperature", "NDBC", "TimeSeries",
+     -89.7, -89.7, 25.9, 25.9, "2010-01-01T00:00:00Z", "2020-01-01T00:00:00Z", "", "x"],
+    ["glider_sam", "Glider Sam", "Salinity and temperature profiles", "USF", "TrajectoryProfile",
+     -88.0, -85.0, 27.0, 29.0, "2023-05-01T00:00:00Z", "2023-06-01T00:00:00Z", "", "x"],
+    ["mur_sst", "MUR SST", "Sea surface temperature analysis", "JPL", "Grid",
+     0.0, 360.0, -90.0, 90.0, "2002-06-01T00:00:00Z", "2024-01-01T00:00:00Z", "x", ""],
+    ["pacific_buoy", "Pacific buoy", "Wind speed", "NDBC", "TimeSeries",
+     200.0, 200.0, 20.0, 20.0, "2015-01-01T00:00:00Z", "2016-01-01T00:00:00Z", "", "x"],
+]
+
+
+@pytest.fixture
+def index():
+    return ci.CatalogIndex.fromCatalog(ROOT, {"table": {"columnNames": COLUMNS, "rows": ROWS}})
+
+
+def test_fromCatalog_skips_allDatasets(index):
+    assert index.ids == ["buoy_42001", "glider_sam", "mur_sst", "pacific_buoy"]
+    assert index.protocols == ["t", "t", "g", "t"]
+
+
+def test_search_ranks_title_matches_first(index):
+    assert index.search("temperature") == ["buoy_42001", "glider_sam", "mur_sst"]
+
+
+def test_search_needs_every_term_and_matches_prefixes(index):
+    assert index.search("sea temp") == ["buoy_42001", "mur_sst"]
+    assert index.search("sal+temp") == ["glider_sam"]
+    assert index.search("nothing") == []
+
+
+def test_search_excludes_terms(index):
+    assert index.search("temperature -glider -jpl") == ["buoy_42001"]
+
+
+def test_search_filters(index):
+    assert index.search(protocol="griddap") == ["mur_sst"]
+    assert index.search("temperature", start="2021-01-01", end="2023-12-31") == ["glider_sam", "mur_sst"]
+    # 0..360 datasets match a query in -180..180
+    assert index.search("buoy", bbox=(-170.0, 10.0, -150.0, 30.0)) == ["pacific_buoy"]
+
+
+def test_scoredSearch_sums_field_scores(index):
+    scores = dict(index.scoredSearch("buoy"))
+    # "buoy" in buoy_42001's title and id, in pacific_buoy's title and id
+    assert scores == {0: 3, 3: 3}
+
+
+def test_save_and_load_round_trip(index):
+    index.save()
+    loaded = ci.CatalogIndex.load(ROOT)
+    assert loaded.ids == index.ids
+    assert loaded.search("temperature") == index.search("temperature")
+    assert ci.CatalogIndex.load("https://other/erddap") is None
+
+
+def test_describe(index):
+    titles, dates = index.describe(["mur_sst", "unknown"])
+    assert titles == {"mur_sst": "MUR SST"}
+    assert dates == {"mur_sst": ("2002-06-01T00:00:00Z", "2024-01-01T00:00:00Z")}
+
+
+def test_parseQuery_pulls_out_filters():
+    assert ci.parseQuery("sea temp time:2020-01-01/ bbox:-98,18,-80,31") == (
+        "sea temp", "2020-01-01", None, (-98.0, 18.0, -80.0, 31.0))
+    assert ci.parseQuery("wind+speed") == ("wind speed", None, None, None)
+    with pytest.raises(ValueError):
+        ci.parseQuery("bbox:1,2,3")
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from src import data_wrangler as dw
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _hours(*rows):
+    return [(START + timedelta(hours=i), n) for i, n in enumerate(rows)]
+
+
+def _assertTiles(chunks, start, end):
+    assert chunks[0][0] == start and chunks[-1][1] == end
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+    assert all(lo < hi for lo, hi in chunks)
+
+
+def test_probeBucket_grows_with_the_span():
+    assert dw.probeBucket(timedelta(days=7)) == "1hour"
+    assert dw.probeBucket(timedelta(days=365)) == "1day"
+    assert dw.probeBucket(timedelta(days=20000)) == "1month"
+
+
+def test_parseTimeCounts_skips_header_and_sorts():
+    text = "time (UTC),latitude\n2024-01-01T02:00:00Z,5\n2024-01-01T00:00:00Z,3.0\n,7\n"
+    assert dw.parseTimeCounts(text) == [(START, 3), (START + timedelta(hours=2), 5)]
+
+
+def test_planTimeChunks_packs_buckets_up_to_the_target():
+    end = START + timedelta(hours=6)
+    chunks = dw.planTimeChunks(_hours(40, 40, 40, 40, 40, 40), "1hour", START, end, 100)
+    _assertTiles(chunks, START, end)
+    assert len(chunks) == 3
+
+
+def test_planTimeChunks_splits_a_burst_evenly():
+    end = START + timedelta(hours=3)
+    chunks = dw.planTimeChunks(_hours(10, 1000, 10), "1hour", START, end, 100)
+    _assertTiles(chunks, START, end)
+    burst = [c for c in chunks if START + timedelta(hours=1) <= c[0] < START + timedelta(hours=2)]
+    assert len(burst) == 10
+    assert {hi - lo for lo, hi in burst} == {timedelta(minutes=6)}
+
+
+def test_planTimeChunks_empty_stretches_join_a_neighbour():
+    end = START + timedelta(hours=10)
+    chunks = dw.planTimeChunks(_hours(90, 0, 0, 0, 0, 0, 0, 0, 0, 90), "1hour", START, end, 100)
+    _assertTiles(chunks, START, end)
+    assert len(chunks) == 2
+
+
+def test_planTimeChunks_one_chunk_when_everything_fits():
+    end = START + timedelta(hours=3)
+    assert dw.planTimeChunks(_hours(1, 2, 3), "1hour", START, end, 100) == [(START, end)]
+
+
+def _wrangler(counts=None, error=None):
+    dataset = dw.DatasetWrangler.__new__(dw.DatasetWrangler)
+    dataset.dataset_id = "buoy"
+    dataset.data_start_time = START
+    dataset.data_end_time = START + timedelta(hours=6)
+    dataset.chunk_size = 100
+
+    def probe(bucket, timeout_time=120):
+        if error:
+            raise error
+        return counts
+    dataset.probeTimeCounts = probe
+    return dataset
+
+
+def test_planAdaptiveSubsets_names_subsets_in_time_order():
+    subsets = _wrangler(_hours(60, 60, 60, 60, 60, 60)).planAdaptiveSubsets()
+    assert list(subsets) == ["Subset_1", "Subset_2", "Subset_3", "Subset_4", "Subset_5", "Subset_6"]
+    assert subsets["Subset_1"] == {"start": "2024-01-01T00:00:00", "end": "2024-01-01T01:00:00"}
+    assert subsets["Subset_6"]["end"] == "2024-01-01T06:00:00"
+
+
+def test_planAdaptiveSubsets_falls_back_when_the_probe_fails():
+    assert _wrangler(error=OSError("no orderByCount")).planAdaptiveSubsets() is None
+    assert _wrangler([]).planAdaptiveSubsets() is None
@@ -0,0 +1,76 @@
+import os
+import pytest
+from src import columnar_cache as cc
+from src import data_wrangler as dw
+from src import core
+
+pytest.importorskip("pyarrow")
+
+CSVP = ("time (UTC),sst (degree_C),count,station (1)\n"
+        "2024-01-01T00:00:00Z,21.5,3,a\n"
+        "2024-01-01T01:00:00Z,NaN,4,\n")
+DAS = {
+    "NC_GLOBAL": {"title": {"datatype": "String", "value": "Buoy"}},
+    "time": {"units": {"datatype": "String", "value": "seconds since 1970-01-01T00:00:00Z"},
+             "actual_range": {"datatype": "Float64", "value": "1.7e9, 1.8e9"}},
+    "sst": {"actual_range": {"datatype": "Float32", "value": "20.0, 30.0"}},
+    "count": {"_FillValue": {"datatype": "Int32", "value": "-1"}},
+    "station": {"long_name": {"datatype": "String", "value": "Station"}},
+}
+
+
+@pytest.fixture
+def csvFile(tmp_path):
+    path = tmp_path / "buoy.csv"
+    path.write_text(CSVP)
+    return str(path)
+
+
+def test_csvToParquet_round_trip_with_das_types(csvFile):
+    parquet_path = cc.csvToParquet(csvFile, DAS)
+    assert parquet_path == cc.columnarPath(csvFile) and os.path.exists(parquet_path)
+    assert not os.path.exists(f"{parquet_path}.part")
+
+    df = cc.readColumns(parquet_path)
+    assert list(df.columns) == ["time (UTC)", "sst (degree_C)", "count", "station (1)"]
+    assert str(df["time (UTC)"].dt.tz) == "UTC"
+    assert df["time (UTC)"].iloc[1].isoformat() == "2024-01-01T01:00:00+00:00"
+    # types from the DAS, not widened the way a CSV parse would guess them
+    assert str(df["sst (degree_C)"].dtype) == "float32" and df["sst (degree_C)"].isna().tolist() == [False, True]
+    assert str(df["count"].dtype) == "int32"
+    assert df["station (1)"].iloc[0] == "a" and df["station (1)"].isna().iloc[1]
+
+
+def test_readTable_prefers_the_columnar_copy(csvFile):
+    parquet_path = cc.csvToParquet(csvFile, DAS)
+    df = cc.readTable(csvFile, columns=["count"], parquet_path=parquet_path)
+    assert list(df.columns) == ["count"] and str(df["count"].dtype) == "int32"
+
+    os.remove(parquet_path)
+    df = cc.readTable(csvFile, columns=["count"], parquet_path=parquet_path)
+    assert df["count"].tolist() == [3, 4] and str(df["count"].dtype) == "int64"
+
+
+def test_values_that_do_not_fit_the_das_type_are_cached_as_text(csvFile):
+    das = {**DAS, "station": {"actual_range": {"datatype": "Int32", "value": "0, 9"}}}
+    df = cc.readColumns(cc.csvToParquet(csvFile, das))
+    assert df["count"].tolist() == ["3", "4"]
+
+
+def test_without_pyarrow_the_csv_is_used(csvFile, monkeypatch, capsys):
+    parquet_path = cc.csvToParquet(csvFile, DAS)
+    monkeypatch.setattr(cc, "pa", None)
+    assert not cc.available()
+    assert cc.dasColumnTypes(DAS) == {}
+    os.remove(parquet_path)
+    assert cc.csvToParquet(csvFile, DAS) is None
+    assert not os.path.exists(parquet_path)
+    assert cc.readTable(csvFile, parquet_path=parquet_path)["count"].tolist() == [3, 4]
+
+    monkeypatch.setattr(core.user_options, "columnar_cache_bool", True)
+    dataset = dw.DatasetWrangler.__new__(dw.DatasetWrangler)
+    dataset.griddap, dataset.data_buffer, dataset.columnar_filepath = False, None, None
+    dataset.data_filepath, dataset.das_dict = csvFile, DAS
+    dataset.cacheColumnar()
+    assert dataset.columnar_filepath is None
+    assert "needs pyarrow" in capsys.readouterr().out
@@ -0,0 +1,92 @@
+import os, json, time, threading
+import pytest
+from src import das_cache
+
+URL = "https://h/erddap/tabledap/buoy.das"
+DAS = 'Attributes {\n NC_GLOBAL {\n    String title "Buoy";\n }\n}\n'
+
+
+@pytest.fixture
+def server(fakeServer, fakeResponse, monkeypatch):
+    """Answers 304 when the client's ETag matches"""
+    fakeServer.etag = '"v1"'
+
+    def respond(url, headers):
+        if headers.get("If-None-Match") == fakeServer.etag:
+            return fakeResponse(304)
+        return fakeResponse(text=DAS, headers={"ETag": fakeServer.etag})
+    fakeServer.respond = respond
+    monkeypatch.setattr(das_cache.http, "get", fakeServer.get)
+    return fakeServer
+
+
+def test_fresh_entry_needs_no_request(server):
+    first = das_cache.fetchDas(URL)
+    second = das_cache.fetchDas(URL)
+    assert first == second
+    assert "NC_GLOBAL" in first
+    assert len(server.requests) == 1
+
+
+def test_stale_entry_is_revalidated_with_etag(server):
+    das_cache.fetchDas(URL)
+    das = das_cache.fetchDas(URL, ttl=0)
+    assert server.requests[1][1] == {"If-None-Match": '"v1"'}
+    assert "NC_GLOBAL" in das
+    # the 304 renewed the entry, so it is fresh again
+    assert das_cache.isFresh(das_cache.loadEntry(URL))
+
+
+def test_changed_etag_refetches(server):
+    das_cache.fetchDas(URL)
+    server.etag = '"v2"'
+    das_cache.fetchDas(URL, ttl=0)
+    assert das_cache.loadEntry(URL)["etag"] == '"v2"'
+
+
+def test_http_error_raises_and_caches_nothing(server, fakeResponse):
+    server.respond = lambda url, headers: fakeResponse(404)
+    with pytest.raises(OSError):
+        das_cache.fetchDas(URL)
+    assert das_cache.loadEntry(URL) is None
+
+
+def test_entry_from_older_version_is_ignored():
+    das_cache.saveEntry(URL, {"fetched_at": time.time(), "das": {}})
+    with open(das_cache._entryPath(URL), "w") as f:
+        json.dump({"version": das_cache.CACHE_VERSION - 1, "url": URL, "fetched_at": time.time(), "das": {}}, f)
+    assert das_cache.loadEntry(URL) is None
+
+
+def test_evict_removes_least_recently_used_first():
+    urls = [f"https://h/erddap/tabledap/ds{i}.das" for i in range(3)]
+    for i, url in enumerate(urls):
+        das_cache.saveEntry(url, {"fetched_at": time.time(), "das": {"x": "y" * 100}})
+        os.utime(das_cache._entryPath(url), (1000 + i, 1000 + i))
+    das_cache._touch(urls[0])
+    das_cache.evict(max_bytes=sum(os.path.getsize(das_cache._entryPath(u)) for u in (urls[0], urls[2])))
+    assert das_cache.loadEntry(urls[1]) is None
+    assert das_cache.loadEntry(urls[0]) is not None
+    assert das_cache.loadEntry(urls[2]) is not None
+
+
+def test_concurrent_saves_of_one_url_never_tear_the_entry():
+    entries = [{"fetched_at": time.time(), "das": {"NC_GLOBAL": {"n": str(i) * 5000}}} for i in range(8)]
+    threads = [threading.Thread(target=das_cache.saveEntry, args=(URL, entry)) for entry in entries]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    saved = das_cache.loadEntry(URL)["das"]["NC_GLOBAL"]["n"]
+    assert saved in {e["das"]["NC_GLOBAL"]["n"] for e in entries}
+    assert not [f for f in os.listdir(das_cache.getCacheDir()) if f.endswith(".tmp")]
+
+
+def test_eviction_runs_once_enough_has_been_written(monkeypatch):
+    scans = []
+    monkeypatch.setattr(das_cache, "evict", lambda: scans.append(1))
+    monkeypatch.setattr(das_cache, "_unchecked_bytes", 0)
+    monkeypatch.setattr(das_cache, "EVICT_CHECK_BYTES", 1000)
+    for i in range(10):
+        das_cache.saveEntry(f"https://h/erddap/tabledap/ds{i}.das", {"fetched_at": 0, "das": {"x": "y" * 200}})
+    assert 1 <= len(scans) <= 3
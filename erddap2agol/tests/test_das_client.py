@@ -0,0 +1,78 @@
+import json, os
+from types import SimpleNamespace
+from src import das_client as dc
+
+
+def _dataset(das_dict=None, dataset_id="buoy", time_str="time"):
+    return SimpleNamespace(das_dict=das_dict, dataset_id=dataset_id, time_str=time_str,
+                           dataset_title=dataset_id, needs_Subset=None, no_time_range=None, has_error=False)
+
+
+def test_loadDas_prefers_the_dict_in_memory():
+    das = {"time": {}}
+    assert dc.loadDas(_dataset(das)) is das
+
+
+def test_loadDas_falls_back_to_the_saved_json():
+    with open(os.path.join(dc.getConfDir(), "buoy.json"), "w") as f:
+        json.dump({"time": {"units": {"datatype": "String", "value": "s"}}}, f)
+    assert dc.loadDas(_dataset())["time"]["units"]["value"] == "s"
+
+
+def test_saveToJsonInBackground_writes_behind():
+    path = dc.saveToJsonInBackground({"a": 1}, "later")
+    dc._json_writer.submit(lambda: None).result()
+    with open(path) as f:
+        assert json.load(f) == {"a": 1}
+
+
+def test_getTimeFromJson_reads_the_in_memory_range():
+    das = {"time": {"actual_range": {"datatype": "Float64", "value": "1.5e+9, 1.6e+9"}}}
+    start, end = dc.getTimeFromJson(_dataset(das))
+    assert start.timestamp() == 1.5e9
+    assert end.timestamp() == 1.6e9
+
+
+def test_getTimeFromJson_without_range_turns_off_subsetting():
+    dataset = _dataset({"time": {"units": {"datatype": "String", "value": "s"}}})
+    assert dc.getTimeFromJson(dataset) is None
+    assert dataset.no_time_range is True
+    assert dataset.needs_Subset is False
+
+
+DAS = '''Attributes {
+ s {
+  time {
+    String _CoordinateAxisType "Time";
+    Float64 actual_range 1.5e+9, 1.6e+9;
+    String units "seconds since 1970-01-01T00:00:00Z";
+  }
+  sst {
+    Float32 actual_range 10.5, 30.25;
+    Int32 flag_values 1, 2, 4;
+    String long_name "Sea \\"surface\\" temperature";
+  }
+ }
+  NC_GLOBAL {
+    String license "The data may be used
+and redistributed for free.";
+    Float64 geospatial_lat_min 27.0;
+    String title "Buoy";
+  }
+}
+'''
+
+
+def test_parseDasResponse_sections_and_multiline_license():
+    das = dc.convertToDict(dc.parseDasResponse(DAS))
+    assert {"time", "sst", "NC_GLOBAL"} <= set(das)
+    assert das["time"]["actual_range"] == {"datatype": "Float64", "value": "1.5e+9, 1.6e+9"}
+    assert das["NC_GLOBAL"]["license"]["value"].endswith("The data may be used\nand redistributed for free.")
+    assert das["NC_GLOBAL"]["title"]["value"] == "Buoy"
+
+
+def test_rangeValues_from_string_or_pair():
+    das = dc.convertToDict(dc.parseDasResponse(DAS))
+    assert dc.rangeValues(das["time"]["actual_range"]["value"]) == (1.5e9, 1.6e9)
+    assert dc.rangeValues(das["sst"]["actual_range"]["value"]) == (10.5, 30.25)
+    assert dc.rangeValues([1, 2]) == (1.0, 2.0)
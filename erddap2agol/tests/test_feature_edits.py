@@ -0,0 +1,51 @@
+import io
+from types import SimpleNamespace
+import pandas as pd
+from src import update_manager as um
+
+CSVP = (b"time (UTC),latitude (degrees_north),longitude (degrees_east),sst (degree_C),station,qc\n"
+        b"2024-01-01T00:00:00Z,27.5,-90.0,21.5,a,1\n"
+        b"2024-01-01T01:00:00Z,,,,b,1\n"
+        b"not a time,27.6,-90.1,21.7,c,1\n")
+
+
+class _Layer:
+    """Hosted layer stub, edit_features records each batch and rejects the features named in `reject`"""
+    def __init__(self, reject=()):
+        self.properties = SimpleNamespace(fields=[
+            {"name": "time__UTC_", "type": "esriFieldTypeDate"},
+            {"name": "latitude__degrees_north_", "type": "esriFieldTypeDouble"},
+            {"name": "longitude__degrees_east_", "type": "esriFieldTypeDouble"},
+            {"name": "sst__degree_C_", "type": "esriFieldTypeDouble"},
+            {"name": "station", "type": "esriFieldTypeString"},
+        ])
+        self.reject = set(reject)
+        self.batches = []
+
+    def edit_features(self, adds):
+        self.batches.append(adds)
+        return {"addResults": [{"success": f["attributes"]["station"] not in self.reject} for f in adds]}
+
+
+def test_frameFeatures_maps_columns_to_layer_fields():
+    features = um.frameFeatures(pd.read_csv(io.BytesIO(CSVP)), _Layer())
+    first, empty, bad_time = features
+    assert first == {
+        "attributes": {"time__UTC_": 1704067200000, "latitude__degrees_north_": 27.5,
+                       "longitude__degrees_east_": -90.0, "sst__degree_C_": 21.5, "station": "a"},
+        "geometry": {"x": -90.0, "y": 27.5, "spatialReference": {"wkid": 4326}},
+    }
+    # blank cells become nulls and a row without coordinates has no geometry
+    assert empty["attributes"]["sst__degree_C_"] is None and "geometry" not in empty
+    assert bad_time["attributes"]["time__UTC_"] is None
+    # columns the layer has no field for are left out
+    assert all("qc" not in f["attributes"] for f in features)
+
+
+def test_appendRows_sends_batches_and_counts_successes():
+    body = CSVP + b"".join(b"2024-01-02T00:00:00Z,27.5,-90.0,20.0,s%d,1\n" % i for i in range(4))
+    layer = _Layer(reject={"b"})
+    assert um.appendRows(layer, body, batch_size=3) == 6
+    assert [len(batch) for batch in layer.batches] == [3, 3, 1]
+    assert [f["attributes"]["station"] for batch in layer.batches for f in batch] == \
+        ["a", "b", "c", "s0", "s1", "s2", "s3"]
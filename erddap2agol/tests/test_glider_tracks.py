@@ -0,0 +1,108 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from src import glider_tracks as gt
+
+X, Y, T = gt.GLIDER_X, gt.GLIDER_Y, gt.GLIDER_TIME
+
+
+def _glider(n=12):
+    times = pd.date_range("2024-01-01", periods=n, freq="20min", tz="UTC").strftime("%Y-%m-%dT%H:%M:%SZ")
+    return pd.DataFrame({
+        T: times,
+        X: np.linspace(-88.0, -87.0, n),
+        Y: np.linspace(28.0, 28.5, n),
+        "temperature (degree_C)": np.where(np.arange(n) % 5 == 3, np.nan, np.linspace(20, 22, n)),
+        "profile_id": np.arange(n) // 4,
+        "platform": "usf-sam",
+    })
+
+
+def _legacySegments(df):
+    # the per-row loop pointTableToGeojsonLine used before the column-wise builder
+    df = df.replace({np.nan: None}).dropna(subset=[X, Y])
+    data_columns = [col for col in df.columns if col not in [X, Y]]
+    features = []
+    for i in range(len(df) - 1):
+        start = [df.iloc[i][X], df.iloc[i][Y]]
+        end = [df.iloc[i + 1][X], df.iloc[i + 1][Y]]
+        features.append({"type": "Feature",
+                         "geometry": {"type": "LineString", "coordinates": [start, end]},
+                         "properties": df.iloc[i + 1][data_columns].to_dict()})
+    return json.loads(json.dumps(features))
+
+
+def test_segmentFeatures_match_the_legacy_loop():
+    df = _glider()
+    df.loc[6, [X, Y]] = np.nan
+    features = [json.loads(f) for f in gt.segmentFeatures(df)]
+    assert features == _legacySegments(df)
+    assert features[2]["properties"]["temperature (degree_C)"] is None
+
+
+def test_segmentFeatures_need_two_fixes():
+    assert list(gt.segmentFeatures(_glider(1))) == []
+
+
+def test_jsonColumn_non_finite_values_are_null():
+    assert gt.jsonColumn(pd.Series([1.5, np.nan, np.inf])) == ["1.5", "null", "null"]
+    assert gt.jsonColumn(pd.Series([0.1], dtype="float32")) == ["0.1"]
+    assert gt.jsonColumn(pd.Series(["a", None])) == ['"a"', "null"]
+
+
+def test_simplifyMask_drops_collinear_points():
+    xs = np.arange(10, dtype=float)
+    keep = gt.simplifyMask(xs, xs * 2, tolerance=0.01)
+    assert keep.tolist() == [True] + [False] * 8 + [True]
+
+
+def test_simplifyMask_keeps_points_beyond_the_tolerance():
+    xs = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
+    ys = np.array([0.0, 0.0, 1.0, 0.0, 0.0])
+    assert gt.simplifyMask(xs, ys, tolerance=0.5).tolist() == [True, False, True, False, True]
+    assert gt.simplifyMask(xs, ys, tolerance=2.0).tolist() == [True, False, False, False, True]
+    assert gt.simplifyMask(xs, ys, tolerance=0).all()
+
+
+def test_trackGroups_profile_falls_back_to_hours(capsys):
+    df = _glider().drop(columns="profile_id")
+    keys = gt.trackGroups(df, "profile")
+    assert keys.nunique() == 4
+    assert "by hour" in capsys.readouterr().out
+
+
+def test_trackFeatures_one_feature_per_profile():
+    df = _glider()
+    features = [json.loads(f) for f in gt.trackFeatures(df, "profile")]
+    assert len(features) == 3
+    assert [f["properties"]["point_count"] for f in features] == [4, 4, 4]
+    assert [f["properties"]["profile_id"] for f in features] == [0, 1, 2]
+    # later parts start at the previous profile's last fix, the track has no gaps
+    first, second = features[0]["geometry"]["coordinates"][0], features[1]["geometry"]["coordinates"][0]
+    assert second[0] == first[-1]
+    assert features[1]["properties"]["temperature (degree_C)"] == pytest.approx(df["temperature (degree_C)"][4:8].mean())
+    assert features[-1]["properties"]["end_time"] == df[T].iloc[-1]
+
+
+def test_trackFeatures_simplify_straight_runs():
+    features = [json.loads(f) for f in gt.trackFeatures(_glider(), "day", tolerance_m=10)]
+    assert len(features) == 1
+    assert features[0]["geometry"]["coordinates"] == [[[-88.0, 28.0], [-87.0, 28.5]]]
+    assert features[0]["properties"]["point_count"] == 12
+
+
+def test_csvToLineGeojson_writes_a_segment_per_pair(tmp_path):
+    path = tmp_path / "glider.csv"
+    _glider().to_csv(path, index=False)
+    out = tmp_path / "out.geojson"
+    assert gt.csvToLineGeojson(str(path), str(out)) == 11
+    assert len(json.loads(out.read_text())["features"]) == 11
+
+
+def test_csvToLineGeojson_track_modes(tmp_path):
+    path = tmp_path / "glider.csv"
+    _glider().to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        gt.csvToLineGeojson(str(path), str(tmp_path / "out.geojson"), mode="week")
+    assert gt.csvToLineGeojson(str(path), str(tmp_path / "out.geojson"), mode="profile") == 3
@@ -0,0 +1,97 @@
+import threading, time
+import pytest
+from src import http_client as http
+
+URL = "https://erddap.example.org/erddap/tabledap/buoy.csvp"
+
+
+@pytest.fixture(autouse=True)
+def freshClient(monkeypatch):
+    monkeypatch.setattr(http, "MAX_REQUESTS_PER_HOST", 2)
+    monkeypatch.setattr(http, "_host_slots", {})
+    monkeypatch.setattr(http, "_sessions", {})
+
+
+def _peak(slot_for, workers, hold=0.05, during=None):
+    """Run `workers` threads through the slot and return the most that held one at once"""
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with slot_for():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(hold)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    if during:
+        during()
+    for t in threads:
+        t.join(timeout=10)
+    return peak[0]
+
+
+def test_hostSlot_is_shared_per_host():
+    assert http.hostSlot(URL) is http.hostSlot("HTTPS://erddap.example.org/erddap/info")
+    assert http.hostSlot(URL) is not http.hostSlot("https://other.example.org/erddap")
+
+
+def test_hostSlot_caps_requests_in_flight():
+    assert _peak(lambda: http.hostSlot(URL), workers=8) == 2
+
+
+def test_setHostLimit_applies_to_held_slots():
+    slot = http.hostSlot(URL)
+    slot.acquire()
+    slot.acquire()
+    http.setHostLimit(1)
+    # the slot in use is kept, both holders still count against the new limit
+    assert http.hostSlot(URL) is slot and slot.limit == 1
+    slot.release()
+    assert slot.active == 1
+    waiter = threading.Thread(target=slot.acquire)
+    waiter.start()
+    waiter.join(timeout=0.2)
+    assert waiter.is_alive()
+    slot.release()
+    waiter.join(timeout=5)
+    assert not waiter.is_alive() and slot.active == 1
+    slot.release()
+
+
+def test_setHostLimit_raises_the_cap_for_waiting_requests():
+    def raise_limit():
+        time.sleep(0.02)
+        http.setHostLimit(6)
+    assert _peak(lambda: http.hostSlot(URL), workers=6, hold=0.2, during=raise_limit) == 6
+
+
+def test_setHostLimit_at_least_one():
+    http.setHostLimit(0)
+    assert http.MAX_REQUESTS_PER_HOST == 1
+
+
+def test_release_without_acquire():
+    with pytest.raises(ValueError):
+        http.hostSlot(URL).release()
+
+
+def test_getSession_retry_policy():
+    session = http.getSession(URL)
+    assert http.getSession(URL + "?x") is session
+    retry = session.get_adapter(URL).max_retries
+    assert retry.read == 0
+    assert retry.total == retry.connect == retry.status == http.RETRY_ATTEMPTS
+    assert set(retry.status_forcelist) == {429, 500, 502, 503, 504}
+    assert retry.respect_retry_after_header and not retry.raise_on_status
+    assert session.headers["User-Agent"] == http.USER_AGENT
+
+
+def test_backoffDelay_grows_and_is_capped():
+    assert 1.0 <= http.backoffDelay(1) <= 1.5
+    assert 4.0 <= http.backoffDelay(3) <= 6.0
+    assert http.backoffDelay(20) <= http.BACKOFF_MAX * 1.5
@@ -0,0 +1,202 @@
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from src import data_wrangler as dw
+from src import update_manager as um
+from src import core
+
+SERVER = "https://h/erddap/tabledap/"
+HEADER = "time (UTC),latitude (degrees_north),longitude (degrees_east),sst (degree_C)\n"
+ROWS = "2024-01-02T00:00:00Z,27.5,-90.0,21.5\n2024-01-02T01:00:00Z,27.5,-90.0,21.7\n"
+
+
+def _dataset():
+    dataset = dw.DatasetWrangler.__new__(dw.DatasetWrangler)
+    dataset.dataset_id = "buoy"
+    dataset.server = SERVER
+    dataset.time_str = "time"
+    dataset.attribute_list = ["time", "latitude", "longitude", "sst"]
+    dataset.data_buffer = dataset.data_filepath = None
+    return dataset
+
+
+class _Layer:
+    """Hosted layer stub: one date field, max-time statistics, edits are recorded"""
+    def __init__(self, max_time=None):
+        self.properties = SimpleNamespace(fields=[
+            {"name": "time__UTC_", "type": "esriFieldTypeDate"},
+            {"name": "sst__degree_C_", "type": "esriFieldTypeDouble"},
+        ])
+        self.max_time = max_time
+        self.adds, self.deletes = [], []
+
+    def query(self, where, out_statistics, return_geometry):
+        if self.max_time is None:
+            return SimpleNamespace(features=[])
+        return SimpleNamespace(features=[SimpleNamespace(attributes={"max_time": self.max_time})])
+
+    def edit_features(self, adds):
+        self.adds.extend(adds)
+        return {"addResults": [{"success": True} for _ in adds]}
+
+    def delete_features(self, where):
+        self.deletes.append(where)
+        return {"deleteResults": [{"success": True}, {"success": True}, {"success": False}]}
+
+
+def test_generateUrl_since_asks_for_newer_rows_only():
+    url = _dataset().generateUrl_since("2024-01-01T12:00:00")
+    assert url == ("https://h/erddap/tabledap/buoy.csvp?time%2Clatitude%2Clongitude%2Csst"
+                   "&time%3E2024-01-01T12:00:00Z")
+
+
+@pytest.mark.parametrize("in_memory", [True, False])
+def test_writeNewRows_keeps_the_rows_after_since(monkeypatch, fakeServer, fakeResponse, in_memory):
+    monkeypatch.setattr(core.user_options, "in_memory_upload_bool", in_memory)
+    fakeServer.respond = lambda url, headers: fakeResponse(text=HEADER + ROWS)
+    monkeypatch.setattr(dw.http, "stream", fakeServer.stream)
+    dataset = _dataset()
+
+    path, rows = dataset.writeNewRows("2024-01-02T00:00:00")
+    assert fakeServer.urls == [dataset.generateUrl_since("2024-01-02T00:00:00")]
+    assert rows == 2
+    if in_memory:
+        assert dataset.data_buffer == (HEADER + ROWS).encode()
+        assert not os.path.exists(path)
+    else:
+        assert dataset.data_buffer is None
+        with open(path) as f:
+            assert f.read() == HEADER + ROWS
+        os.remove(path)
+
+
+@pytest.mark.parametrize("body, status", [("Error: Your query produced no matching results.", 404), (HEADER, 200)])
+def test_writeNewRows_nothing_newer(monkeypatch, fakeServer, fakeResponse, body, status):
+    fakeServer.respond = lambda url, headers: fakeResponse(status, text=body)
+    monkeypatch.setattr(dw.http, "stream", fakeServer.stream)
+    dataset = _dataset()
+    assert dataset.writeNewRows("2024-01-02T00:00:00") == (None, 0)
+    assert dataset.data_buffer is None
+
+
+def test_layerMaxTime_from_epoch_milliseconds():
+    newest = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert um.layerMaxTime(_Layer(newest.timestamp() * 1000), "time__UTC_") == newest
+    assert um.layerMaxTime(_Layer(newest.replace(tzinfo=None)), "time__UTC_") == newest
+    assert um.layerMaxTime(_Layer(), "time__UTC_") is None
+
+
+def test_pruneBefore_deletes_outside_the_window():
+    layer = _Layer()
+    assert um.pruneBefore(layer, "time__UTC_", datetime(2024, 1, 1, 6, tzinfo=timezone.utc)) == 2
+    assert layer.deletes == ["time__UTC_ < TIMESTAMP '2024-01-01 06:00:00'"]
+
+
+class _NrtDataset:
+    """DatasetWrangler stub for the append worker, hands back `body` as newly written rows"""
+    body = None
+    requested = []
+
+    def __init__(self, dataset_id, dataset_title, server, is_nrt, prefetched):
+        self.time_str = "time"
+        self.moving_window_days = 7
+        self.data_buffer = None
+
+    def writeNewRows(self, since):
+        _NrtDataset.requested.append(since)
+        if self.body is None:
+            return None, 0
+        self.data_buffer = self.body.encode()
+        return "/tmp/buoy_new.csv", self.body.count("\n") - 1
+
+
+@pytest.fixture
+def appendWorker(monkeypatch):
+    layer = _Layer()
+    item = SimpleNamespace(layers=[layer])
+    monkeypatch.setattr(core, "_workerGis", lambda: SimpleNamespace(content=SimpleNamespace(get=lambda agol_id: item)))
+    monkeypatch.setattr(core.dw, "DatasetWrangler", _NrtDataset)
+    monkeypatch.setattr(_NrtDataset, "requested", [])
+    monkeypatch.setattr(core.OverwriteFS, "overwriteFeatureService", lambda *a, **k: pytest.fail("overwrote"))
+
+    def run(last_hash=None):
+        return core.nrtAppendWorkerFunc("abc123", "buoy", SERVER, False, True, True, False, None, last_hash)
+    return layer, run
+
+
+def test_nrtAppendWorkerFunc_appends_rows_after_the_layer_max_time(appendWorker, monkeypatch):
+    layer, run = appendWorker
+    newest = datetime.now(timezone.utc) - timedelta(hours=1)
+    layer.max_time = newest.timestamp() * 1000
+    monkeypatch.setattr(_NrtDataset, "body", HEADER + ROWS)
+
+    seconds, summary, payload_hash = run()
+    assert _NrtDataset.requested == [newest.strftime("%Y-%m-%dT%H:%M:%S")]
+    assert [f["attributes"]["sst__degree_C_"] for f in layer.adds] == [21.5, 21.7]
+    assert len(layer.deletes) == 1
+    assert summary.startswith("appended 2 rows") and summary.endswith("removed 2 expired rows")
+
+
+def test_nrtAppendWorkerFunc_starts_at_the_window_and_prunes_with_no_new_rows(appendWorker):
+    layer, run = appendWorker
+    layer.max_time = (datetime.now(timezone.utc) - timedelta(days=30)).timestamp() * 1000
+
+    seconds, summary, payload_hash = run()
+    since = datetime.strptime(_NrtDataset.requested[0], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    # a layer older than the window only asks for the rows inside it
+    assert abs(since - (datetime.now(timezone.utc) - timedelta(days=7))) < timedelta(minutes=1)
+    assert layer.adds == []
+    assert len(layer.deletes) == 1
+    assert summary.startswith("appended 0 rows")
+
+
+def test_payloadHash_same_for_memory_and_file(tmp_path):
+    path = tmp_path / "new.csv"
+    path.write_text(HEADER + ROWS)
+    assert um.payloadHash((HEADER + ROWS).encode()) == um.payloadHash(file_path=str(path))
+    assert um.payloadHash(HEADER.encode()) != um.payloadHash((HEADER + ROWS).encode())
+
+
+def test_nrtAppendWorkerFunc_skips_rows_it_already_appended(appendWorker, monkeypatch):
+    layer, run = appendWorker
+    layer.max_time = (datetime.now(timezone.utc) - timedelta(hours=1)).timestamp() * 1000
+    monkeypatch.setattr(_NrtDataset, "body", HEADER + ROWS)
+
+    seconds, summary, payload_hash = run()
+    assert payload_hash == um.payloadHash((HEADER + ROWS).encode())
+    assert len(layer.adds) == 2
+
+    # the same rows again (the layer max time didn't move past them) are not appended twice
+    seconds, summary, second_hash = run(last_hash=payload_hash)
+    assert second_hash == payload_hash
+    assert len(layer.adds) == 2
+    assert "already appended" in summary
+    # the window is still pruned
+    assert len(layer.deletes) == 2
+
+
+def test_updateNRT_hands_the_stored_hash_to_the_append_worker(monkeypatch):
+    state = {"abc123": {"dataset_id": "buoy", "max_time": None, "payload_hash": "ff", "published_at": 0}}
+    monkeypatch.setattr(um, "loadNrtState", lambda: state)
+    monkeypatch.setattr(um, "saveNrtState", lambda state: None)
+    monkeypatch.setattr(um, "catalogMaxTimes", lambda datasets: {})
+    monkeypatch.setattr(um, "UpdateManager", lambda: SimpleNamespace(
+        gis=None, searchContent=lambda: None,
+        datasets={"buoy": {"agol_id": "abc123", "base_url": SERVER}}))
+    monkeypatch.setattr(core.dw, "prefetchMetadataByServer", lambda pairs, is_nrt: {})
+    tasks = []
+
+    class _Pool:
+        def __init__(self, **kwargs):
+            pass
+
+        def run(self, queued):
+            tasks.extend(queued)
+            return iter([])
+    monkeypatch.setattr(core.wp, "DeadlinePool", _Pool)
+
+    core.updateNRT(incremental=True)
+    [(key, func, args)] = tasks
+    assert func is core.nrtAppendWorkerFunc
+    assert args[-1] == "ff"
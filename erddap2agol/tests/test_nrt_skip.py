@@ -0,0 +1,52 @@
+import time
+from src import update_manager as um
+
+MAX_TIME = "2024-05-01T12:00:00Z"
+
+
+def test_isUnchanged_same_maxTime_recently_published():
+    entry = {"max_time": MAX_TIME, "published_at": time.time() - 60}
+    assert um.isUnchanged(entry, MAX_TIME)
+
+
+def test_isUnchanged_new_data_or_unknown():
+    entry = {"max_time": MAX_TIME, "published_at": time.time()}
+    assert not um.isUnchanged(entry, "2024-05-01T13:00:00Z")
+    assert not um.isUnchanged(entry, None)
+    assert not um.isUnchanged(None, MAX_TIME)
+    assert not um.isUnchanged({}, MAX_TIME)
+
+
+def test_isUnchanged_republishes_after_max_age():
+    entry = {"max_time": MAX_TIME, "published_at": time.time() - um.NRT_MAX_SKIP_AGE - 1}
+    assert not um.isUnchanged(entry, MAX_TIME)
+    assert um.isUnchanged(entry, MAX_TIME, max_age=um.NRT_MAX_SKIP_AGE * 2)
+
+
+def test_nrt_state_round_trip():
+    assert um.loadNrtState() == {}
+    state = {"abc123": {"dataset_id": "buoy", "max_time": MAX_TIME, "payload_hash": "ff", "published_at": 1.0}}
+    um.saveNrtState(state)
+    assert um.loadNrtState() == state
+
+
+def test_catalogMaxTimes_one_request_per_server(monkeypatch, fakeServer, fakeResponse):
+    table = {"table": {"columnNames": ["datasetID", "maxTime"],
+                       "rows": [["buoy", MAX_TIME], ["glider", None], ["other", MAX_TIME]]}}
+
+    def respond(url, headers):
+        if url.startswith("https://down"):
+            return ConnectionError("refused")
+        return fakeResponse(payload=table)
+    fakeServer.respond = respond
+    monkeypatch.setattr(um.http, "get", fakeServer.get)
+
+    datasets = {
+        "buoy": {"base_url": "https://a/erddap/tabledap/"},
+        "glider": {"base_url": "https://a/erddap/tabledap/"},
+        "wind": {"base_url": "https://down/erddap/tabledap/"},
+        "local": {"base_url": None},
+    }
+    assert um.catalogMaxTimes(datasets) == {"buoy": MAX_TIME}
+    assert sorted(fakeServer.urls) == ["https://a/erddap/tabledap/allDatasets.json?datasetID,maxTime",
+                                 "https://down/erddap/tabledap/allDatasets.json?datasetID,maxTime"]
@@ -0,0 +1,48 @@
+import hashlib, os, zlib
+import pytest
+from src.utils import OverwriteFS as ofs
+
+
+@pytest.fixture
+def datafile(tmp_path, monkeypatch):
+    # several read blocks plus a partial one
+    monkeypatch.setattr(ofs, "blockSize", 1000)
+    path = tmp_path / "data.csv"
+    path.write_bytes(os.urandom(3500))
+    return str(path)
+
+
+def test_getCRC_chained_blocks_match_a_single_crc32(datafile):
+    with open(datafile, "rb") as f:
+        expected = "{:08x}".format(zlib.crc32(f.read()) & 0xffffffff)
+    assert ofs._getCRC(datafile, "crc32") == expected
+
+
+def test_getCRC_blake2b(datafile):
+    with open(datafile, "rb") as f:
+        assert ofs._getCRC(datafile, "blake2b") == hashlib.blake2b(f.read()).hexdigest()
+
+
+def test_auto_falls_back_to_crc32_without_xxhash(monkeypatch):
+    monkeypatch.setattr(ofs, "xxhash", None)
+    assert ofs._resolveAlgorithm("auto") == "crc32"
+    assert ofs._resolveAlgorithm("xxhash") == "crc32"
+    assert ofs._resolveAlgorithm("md5") == "crc32"
+
+
+def test_saved_digest_is_reused(datafile):
+    assert ofs._savedCRC(datafile, "crc32") is None
+    ofs._saveCRC(datafile, "cafe", "crc32")
+    assert ofs._savedCRC(datafile, "crc32") == "cafe"
+
+
+def test_saved_digest_ignored_after_the_file_changes(datafile):
+    ofs._saveCRC(datafile, "cafe", "crc32")
+    with open(datafile, "ab") as f:
+        f.write(b"more rows")
+    assert ofs._savedCRC(datafile, "crc32") is None
+
+
+def test_saved_digest_ignored_for_another_algorithm(datafile):
+    ofs._saveCRC(datafile, "cafe", "crc32")
+    assert ofs._savedCRC(datafile, "blake2b") is None
@@ -0,0 +1,66 @@
+import threading, time
+from src import data_wrangler as dw
+from src import core
+
+
+def _dataset(monkeypatch, workers=4):
+    monkeypatch.setattr(core.user_options, "subset_workers", workers)
+    dataset = dw.DatasetWrangler.__new__(dw.DatasetWrangler)
+    dataset.dataset_id = "buoy"
+    dataset.has_error = False
+    return dataset
+
+
+def test_results_in_job_order_and_progress_per_dataset(monkeypatch):
+    dataset = _dataset(monkeypatch)
+    finished, progresses, lock = [], set(), threading.Lock()
+
+    def download(url, attempts, timeout, progress, subset_num):
+        # the first subsets take the longest, so they finish last
+        time.sleep(0.02 * (5 - subset_num))
+        with lock:
+            finished.append(subset_num)
+            progresses.add(id(progress))
+        progress.update(100, 10)
+        return f"/tmp/buoy_subset_{subset_num}.csv"
+    monkeypatch.setattr(dataset, "_downloadWithSplit", download)
+
+    jobs = [(f"url{i}", {"subset_num": i}) for i in range(1, 5)]
+    results = dataset._downloadParallel(jobs, 3, 60)
+    assert finished != [1, 2, 3, 4]
+    assert results == [f"/tmp/buoy_subset_{i}.csv" for i in range(1, 5)]
+    assert len(progresses) == 1
+    assert not dataset.has_error
+
+
+def test_failures_and_empty_parts(monkeypatch, capsys):
+    dataset = _dataset(monkeypatch)
+    outcomes = {1: "/tmp/a.csv", 2: None, 3: dw.EMPTY_RESULT}
+    monkeypatch.setattr(dataset, "_downloadWithSplit",
+                        lambda url, attempts, timeout, progress, subset_num: outcomes[subset_num])
+
+    results = dataset._downloadParallel([(f"url{i}", {"subset_num": i}) for i in (1, 2, 3)], 3, 60)
+    assert results == ["/tmp/a.csv", None, None]
+    assert dataset.has_error
+    out = capsys.readouterr().out
+    assert "Max retries exceeded for buoy part 2 URL: url2" in out
+    assert "buoy part 3 has no rows" in out
+
+
+def test_workers_bounded_by_the_option(monkeypatch):
+    dataset = _dataset(monkeypatch, workers=2)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def download(url, attempts, timeout, progress, subset_num):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return url
+    monkeypatch.setattr(dataset, "_downloadWithSplit", download)
+
+    assert dataset._downloadParallel([(f"url{i}", {"subset_num": i}) for i in range(6)], 3, 60) == [
+        f"url{i}" for i in range(6)]
+    assert peak[0] == 2
@@ -0,0 +1,116 @@
+import threading, time
+import pytest
+from src import agol_wrangler as aw
+from src import run_ledger as rl
+
+
+class _Dataset:
+    def __init__(self, dataset_id, fail_download=False):
+        self.dataset_id = self.dataset_title = dataset_id
+        self.fail_download = fail_download
+        self.has_error = False
+        self.is_glider = False
+        self.data_filepath = self.columnar_filepath = self.data_buffer = None
+
+    def writeErddapData(self):
+        if self.fail_download:
+            raise RuntimeError("server down")
+        self.data_filepath = f"/tmp/{self.dataset_id}.csv"
+
+
+class _TempDataset(_Dataset):
+    """Downloads to a real file under `folder`"""
+    def __init__(self, dataset_id, folder):
+        super().__init__(dataset_id)
+        self.folder = folder
+
+    def writeErddapData(self):
+        self.data_filepath = str(self.folder / f"{self.dataset_id}.csv")
+        with open(self.data_filepath, "w") as f:
+            f.write("time (UTC)\n")
+
+
+def _wrangler(datasets):
+    wrangler = aw.AgolWrangler.__new__(aw.AgolWrangler)
+    wrangler.datasets = datasets
+    wrangler.ledger = None
+    return wrangler
+
+
+def test_queue_bounds_downloads_ahead_of_publishing(monkeypatch):
+    datasets = [_Dataset(f"ds{i}") for i in range(10)]
+    wrangler = _wrangler(datasets)
+    lock = threading.Lock()
+    waiting, peak, published = [0], [0], []
+
+    def writeErddapData(dataset):
+        dataset.data_filepath = f"/tmp/{dataset.dataset_id}.csv"
+        with lock:
+            waiting[0] += 1
+            peak[0] = max(peak[0], waiting[0])
+    monkeypatch.setattr(_Dataset, "writeErddapData", writeErddapData)
+
+    def publishDataset(dataset, inputDataType, timeoutTime):
+        with lock:
+            waiting[0] -= 1
+        time.sleep(0.02)
+        published.append(dataset.dataset_id)
+        return True
+    monkeypatch.setattr(wrangler, "publishDataset", publishDataset)
+    summary = []
+    monkeypatch.setattr(wrangler, "_publishSummary", lambda count, seconds: summary.append(count))
+
+    wrangler.pipelinePublish(download_workers=1, publish_workers=1, queue_size=2, cleanup=False)
+    # queued datasets plus the one each download worker holds while the queue is full
+    assert peak[0] <= 2 + 1
+    assert published == [f"ds{i}" for i in range(10)]
+    assert summary == [10]
+
+
+def test_every_dataset_reaches_the_publish_stage(monkeypatch):
+    datasets = [_Dataset("ok1"), _Dataset("down", fail_download=True), _Dataset("boom"), _Dataset("ok2")]
+    wrangler = _wrangler(datasets)
+    seen = []
+
+    def publishDataset(dataset, inputDataType, timeoutTime):
+        seen.append(dataset.dataset_id)
+        if dataset.dataset_id == "boom":
+            raise RuntimeError("publish failed")
+        return not dataset.has_error
+    monkeypatch.setattr(wrangler, "publishDataset", publishDataset)
+    summary = []
+    monkeypatch.setattr(wrangler, "_publishSummary", lambda count, seconds: summary.append(count))
+
+    finished = threading.Event()
+    threading.Thread(target=lambda: (wrangler.pipelinePublish(download_workers=2, publish_workers=2,
+                                                              queue_size=1, cleanup=False), finished.set()),
+                     daemon=True).start()
+    # failures on either side must not leave the other stage waiting
+    assert finished.wait(10)
+    assert sorted(seen) == ["boom", "down", "ok1", "ok2"]
+    assert datasets[1].has_error
+    assert summary == [2]
+
+
+@pytest.mark.parametrize("with_ledger", [True, False])
+def test_cleanup_keeps_the_files_of_an_unfinished_dataset_for_the_ledger(monkeypatch, tmp_path, with_ledger):
+    datasets = [_TempDataset("ok", tmp_path), _TempDataset("rejected", tmp_path), _TempDataset("boom", tmp_path)]
+    wrangler = _wrangler(datasets)
+    if with_ledger:
+        wrangler.ledger = rl.RunLedger.forRun("https://h/erddap/tabledap/", "tabledap", ["ok", "rejected", "boom"])
+
+    def publishDataset(dataset, inputDataType, timeoutTime):
+        if dataset.dataset_id == "boom":
+            raise RuntimeError("publish failed")
+        if dataset.dataset_id == "rejected":
+            return False
+        if wrangler.ledger:
+            wrangler.ledger.record(dataset.dataset_id, rl.STAGE_DONE)
+        return True
+    monkeypatch.setattr(wrangler, "publishDataset", publishDataset)
+    monkeypatch.setattr(wrangler, "_publishSummary", lambda count, seconds: None)
+
+    wrangler.pipelinePublish(download_workers=2, publish_workers=2, queue_size=1)
+    left = sorted(path.name for path in tmp_path.glob("*.csv"))
+    # without a ledger nothing could resume a failed dataset, so its files go too
+    assert left == (["boom.csv", "rejected.csv"] if with_ledger else [])
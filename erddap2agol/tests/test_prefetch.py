@@ -0,0 +1,83 @@
+import threading, time
+from src import data_wrangler as dw
+from src import core
+
+SERVER = "https://h/erddap/tabledap/"
+
+
+def _fakeFetchers(monkeypatch, failing=()):
+    calls = []
+
+    def fetchDas(url):
+        calls.append(url)
+        if any(url.endswith(f"/{ds_id}.das") for ds_id in failing):
+            raise OSError("boom")
+        return {"NC_GLOBAL": {}}
+
+    def fetchText(url, timeout=None, raise_status=True):
+        calls.append(url)
+        return "header"
+
+    monkeypatch.setattr(dw, "fetchDas", fetchDas)
+    monkeypatch.setattr(dw, "fetchText", fetchText)
+    return calls
+
+
+def test_prefetchMetadata_fetches_das_and_header(monkeypatch):
+    monkeypatch.setattr(core.user_options, "bypass_chunking_bool", False)
+    calls = _fakeFetchers(monkeypatch)
+    payloads = dw.prefetchMetadata(SERVER, ["a", "b"])
+    assert set(payloads) == {"a", "b"}
+    assert payloads["a"] == {"das": {"NC_GLOBAL": {}}, "ncHeader": "header"}
+    assert len(calls) == 4
+
+
+def test_prefetchMetadata_failed_das_skips_header(monkeypatch):
+    monkeypatch.setattr(core.user_options, "bypass_chunking_bool", False)
+    calls = _fakeFetchers(monkeypatch, failing=("a",))
+    payloads = dw.prefetchMetadata(SERVER, ["a"])
+    assert isinstance(payloads["a"]["das"], OSError)
+    assert "ncHeader" not in payloads["a"]
+    assert len(calls) == 1
+
+
+def test_prefetchMetadata_nrt_needs_no_header(monkeypatch):
+    calls = _fakeFetchers(monkeypatch)
+    payloads = dw.prefetchMetadata(SERVER, ["a"], is_nrt=True)
+    assert "ncHeader" not in payloads["a"]
+    assert calls == [dw.dasUrl(SERVER, "a")]
+
+
+def test_prefetchMetadataByServer_keys_by_server(monkeypatch):
+    _fakeFetchers(monkeypatch)
+    payloads = dw.prefetchMetadataByServer([("https://h1/erddap/tabledap/", "a"), ("https://h2/erddap/tabledap/", "a")], is_nrt=True)
+    assert set(payloads) == {("https://h1/erddap/tabledap/", "a"), ("https://h2/erddap/tabledap/", "a")}
+
+
+def test_prefetchMetadataByServer_groups_per_server_within_each_limit(monkeypatch):
+    monkeypatch.setattr(core.user_options, "max_requests_per_host", 2)
+    servers = [f"https://h{i}/erddap/tabledap/" for i in range(3)]
+    requested = {server: [] for server in servers}
+    active, peak, lock = {}, {}, threading.Lock()
+
+    def fetchDas(url):
+        server = url.rsplit("/", 1)[0] + "/"
+        with lock:
+            requested[server].append(url.rsplit("/", 1)[1])
+            active[server] = active.get(server, 0) + 1
+            peak[server] = max(peak.get(server, 0), active[server])
+            peak["all"] = max(peak.get("all", 0), sum(active.values()))
+        time.sleep(0.02)
+        with lock:
+            active[server] -= 1
+        return {"NC_GLOBAL": {}}
+    monkeypatch.setattr(dw, "fetchDas", fetchDas)
+
+    pairs = [(server, f"ds{j}") for j in range(5) for server in servers]
+    payloads = dw.prefetchMetadataByServer(pairs, is_nrt=True)
+    assert set(payloads) == set(pairs)
+    # each server is asked only for its own datasets, at most two at a time
+    assert all(sorted(requested[server]) == [f"ds{j}.das" for j in range(5)] for server in servers)
+    assert all(peak[server] <= 2 for server in servers)
+    # while the servers are fetched side by side
+    assert peak["all"] > 2
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+import pytest
+from src import run_ledger as rl
+from src import core
+
+URL = "https://h/erddap/tabledap/buoy.csvp?time"
+
+
+@pytest.fixture
+def ledger():
+    return rl.RunLedger(rl.runKey("https://h/erddap", "tabledap", ["buoy"]))
+
+
+@pytest.fixture
+def download(tmp_path, ledger):
+    path = tmp_path / "buoy.csv"
+    path.write_bytes(b"time (UTC)\n2024-01-01T00:00:00Z\n")
+    ledger.recordDownload("buoy", str(path), URL, rl.fileChecksum(str(path)), path.stat().st_size)
+    return path
+
+
+def test_runKey_ignores_dataset_order():
+    assert rl.runKey("s", "tabledap", ["a", "b"]) == rl.runKey("s", "tabledap", ["b", "a"])
+    assert rl.runKey("s", "tabledap", ["a"]) != rl.runKey("s", "griddap", ["a"])
+
+
+def test_verifiedDownload_accepts_an_intact_file(ledger, download):
+    assert ledger.verifiedDownload("buoy", str(download), URL)
+
+
+def test_verifiedDownload_rejects_another_url(ledger, download):
+    assert not ledger.verifiedDownload("buoy", str(download), URL + ",sst")
+
+
+def test_verifiedDownload_rejects_a_changed_file(ledger, download):
+    # same size, different bytes, only the checksum can tell
+    download.write_bytes(download.read_bytes().replace(b"2024", b"2025"))
+    assert not ledger.verifiedDownload("buoy", str(download), URL)
+
+
+def test_verifiedDownload_rejects_a_truncated_or_missing_file(ledger, download):
+    download.write_bytes(b"time (UTC)\n")
+    assert not ledger.verifiedDownload("buoy", str(download), URL)
+    download.unlink()
+    assert not ledger.verifiedDownload("buoy", str(download), URL)
+
+
+def test_parts_and_finish(ledger):
+    ledger.record("buoy", rl.STAGE_APPENDED, part="buoy_2.csv")
+    ledger.record("buoy", rl.STAGE_APPENDED, part="buoy_3.csv")
+    assert set(ledger.parts("buoy", rl.STAGE_APPENDED)) == {"buoy_2.csv", "buoy_3.csv"}
+    assert not ledger.finish(["buoy"])
+    ledger.record("buoy", rl.STAGE_DONE)
+    assert ledger.finish(["buoy"])
+    assert ledger.datasetsWithProgress() == []
+
+
+def test_a_new_ledger_for_the_same_run_resumes(ledger):
+    ledger.record("buoy", rl.STAGE_PUBLISHED, detail={"item_id": "abc"})
+    resumed = rl.RunLedger(ledger.run_key)
+    assert resumed.get("buoy", rl.STAGE_PUBLISHED)["item_id"] == "abc"
+
+
+def test_gliderWorkflow_publishes_through_the_ledger(monkeypatch):
+    server = "https://gliders.ioos.us/erddap/tabledap/"
+    datasets = [SimpleNamespace(dataset_id=d, generateUrl=lambda: None) for d in ("g1", "g2")]
+    erddapObj = SimpleNamespace(serverInfo="https://gliders.ioos.us/erddap/info/index.json", protocol="tabledap",
+                                getDatasetIDList=lambda: ["g1", "g2"], datasets=[])
+    erddapObj.createDatasetObjects = lambda ids: erddapObj.datasets.extend(datasets)
+    monkeypatch.setattr(core, "erddapSelection", lambda GliderServ: erddapObj)
+    monkeypatch.setattr(rl.RunLedger, "recordMetadata", lambda self, dataset: None)
+    published = []
+
+    class _Agol:
+        def __init__(self, erddap_obj):
+            pass
+
+        def makeItemProperties(self):
+            pass
+
+        def pipelinePublish(self):
+            for dataset in self.datasets:
+                assert dataset.ledger is self.ledger
+                self.ledger.record(dataset.dataset_id, rl.STAGE_DONE)
+                published.append(dataset.dataset_id)
+    monkeypatch.setattr(core.aw, "AgolWrangler", _Agol)
+
+    core.gliderWorkflow("ru29")
+    assert published == ["g1", "g2"]
+    # every dataset finished, so the run was cleared
+    ledger = rl.RunLedger(rl.runKey(server, "tabledap", ["g1", "g2"]))
+    assert ledger.datasetsWithProgress() == []
+    assert datasets[0].ledger is not None
@@ -0,0 +1,39 @@
+import json
+import pytest
+from src import erddap_wrangler as ec
+
+SERVERS = [{"name": "Alpha", "url": "https://alpha/erddap/index.html"},
+           {"name": "Beta", "url": "https://beta/erddap/"}]
+
+
+@pytest.fixture
+def serverList(tmp_path, monkeypatch, fakeServer, fakeResponse):
+    path = tmp_path / "erddaps.json"
+    path.write_text(json.dumps(SERVERS))
+    monkeypatch.setattr(ec, "getErddapList", lambda refresh=False: str(path))
+    fakeServer.respond = lambda url, headers: fakeResponse(text="ERDDAP_version=2.23\n")
+    monkeypatch.setattr(ec.http, "get", fakeServer.get)
+    return fakeServer
+
+
+def test_showErddapList_sends_no_requests(serverList, capsys):
+    ec.probeServer("https://alpha/erddap")
+    serverList.requests.clear()
+
+    ec.showErddapList()
+    out = capsys.readouterr().out
+    assert serverList.requests == []
+    # statuses recorded by earlier probes are still shown
+    assert "1. ERDDAP Server: Alpha [v2.23," in out
+    assert "2. ERDDAP Server: Beta\n" in out
+
+
+def test_setErddap_probes_only_the_selected_server(serverList):
+    erddapObj = ec.ERDDAPHandler.setErddap(1)
+    assert serverList.urls == ["https://alpha/erddap/version"]
+    assert erddapObj.server == "https://alpha/erddap/tabledap/"
+    assert ec.loadHealth()["https://alpha/erddap"]["up"]
+
+    # a recent probe stands in for the next selection
+    ec.ERDDAPHandler.setErddap(1)
+    assert len(serverList.urls) == 1
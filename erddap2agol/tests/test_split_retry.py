@@ -0,0 +1,90 @@
+import pytest
+from src import data_wrangler as dw
+
+TABLEDAP = ("https://h/erddap/tabledap/buoy.csvp?time,sst"
+            "&time%3E%3D2024-01-01T00:00:00Z&time%3C%3D2024-01-03T00:00:00Z")
+GRIDDAP = ("https://h/erddap/griddap/sst.nc?"
+           "sst%5B(2024-01-01T00:00:00Z):1:(2024-01-04T00:00:00Z)%5D%5B(20.0):1:(30.0)%5D%5B(-90.0):1:(-80.0)%5D,"
+           "mask%5B(2024-01-01T00:00:00Z):1:(2024-01-04T00:00:00Z)%5D%5B(20.0):1:(30.0)%5D%5B(-90.0):1:(-80.0)%5D")
+
+
+def test_splitTabledapUrl_cuts_at_the_midpoint():
+    first, second = dw.splitTabledapUrl(TABLEDAP, "time")
+    assert "time%3E%3D2024-01-01T00:00:00Z" in first
+    assert "time%3C2024-01-02T00:00:00Z" in first
+    assert "time%3E%3D2024-01-02T00:00:00Z" in second
+    # the second half keeps the original inclusive end
+    assert "time%3C%3D2024-01-03T00:00:00Z" in second
+
+
+def test_splitTabledapUrl_stops_at_one_second():
+    url = ("https://h/erddap/tabledap/buoy.csvp?time"
+           "&time%3E%3D2024-01-01T00:00:00Z&time%3C%3D2024-01-01T00:00:01Z")
+    assert dw.splitTabledapUrl(url, "time") is None
+
+
+def test_splitTabledapUrl_needs_a_time_constraint():
+    assert dw.splitTabledapUrl("https://h/erddap/tabledap/buoy.csvp?time,sst", "time") is None
+    assert dw.splitTabledapUrl(TABLEDAP, None) is None
+
+
+def test_splitGriddapUrl_halves_the_time_axis(monkeypatch):
+    requested = []
+
+    def fetchText(url, timeout=None, raise_status=True):
+        requested.append(url)
+        days = "\n".join(f"2024-01-0{d}T00:00:00Z" for d in range(1, 5))
+        return f"time (UTC)\n{days}\n"
+    monkeypatch.setattr(dw, "fetchText", fetchText)
+
+    axis, (first, second) = dw.splitGriddapUrl(GRIDDAP)
+    assert axis == "time"
+    assert requested == ["https://h/erddap/griddap/sst.csvp?time%5B(2024-01-01T00:00:00Z):1:(2024-01-04T00:00:00Z)%5D"]
+    # every variable of the request gets the same halves
+    assert first.count("(2024-01-01T00:00:00Z):1:(2024-01-02T00:00:00Z)") == 2
+    assert second.count("(2024-01-03T00:00:00Z):1:(2024-01-04T00:00:00Z)") == 2
+    assert first.count("(20.0):1:(30.0)") == 2
+
+
+def test_splitGriddapUrl_falls_back_to_latitude(monkeypatch):
+    url = GRIDDAP.replace("(2024-01-04T00:00:00Z)", "(2024-01-01T00:00:00Z)")
+
+    def fetchText(url, timeout=None, raise_status=True):
+        assert "latitude" in url
+        return "latitude (degrees_north)\n20.0\n25.0\n30.0\n"
+    monkeypatch.setattr(dw, "fetchText", fetchText)
+
+    axis, (first, second) = dw.splitGriddapUrl(url)
+    assert axis == "latitude"
+    assert "%5B(20.0):1:(20.0)%5D" in first
+    assert "%5B(25.0):1:(30.0)%5D" in second
+
+
+def test_splitGriddapUrl_none_when_nothing_is_left(monkeypatch):
+    monkeypatch.setattr(dw, "fetchText", lambda url, timeout=None, raise_status=True: "time (UTC)\n2024-01-01T00:00:00Z\n")
+    url = GRIDDAP.replace("(30.0)", "(20.0)")
+    assert dw.splitGriddapUrl(url) is None
+
+
+def test_mergeCsvParts_keeps_one_header(tmp_path):
+    parts = []
+    for i, rows in enumerate((["1,a", "2,b"], ["3,c"])):
+        path = tmp_path / f"part{i}.csv"
+        path.write_text("n,s\n" + "\n".join(rows) + "\n")
+        parts.append(str(path))
+    out = tmp_path / "buoy.csv"
+    dw.mergeCsvParts(parts, str(out))
+    assert out.read_text() == "n,s\n1,a\n2,b\n3,c\n"
+    assert not any((tmp_path / f"part{i}.csv").exists() for i in range(2))
+
+
+def test_griddap_requests_are_not_split_without_xarray(monkeypatch, capsys):
+    monkeypatch.setattr(dw, "xr", None)
+    monkeypatch.setattr(dw, "splitGriddapUrl", lambda *a, **k: pytest.fail("split without xarray"))
+    dataset = dw.DatasetWrangler.__new__(dw.DatasetWrangler)
+    dataset.dataset_id = "sst"
+    dataset.griddap = True
+    assert dataset._splitUrl(GRIDDAP, 60) is None
+    assert "xarray" in capsys.readouterr().out
+    with pytest.raises(ImportError):
+        dw.mergeNcParts([], "sst.nc", "time")
@@ -0,0 +1,160 @@
+import os
+import pytest, requests
+from src import data_wrangler as dw
+from src import http_client as http
+from src import core
+
+CSVP = (b"time (UTC),latitude (degrees_north),station,sst (degree_C)\n"
+        b"2024-01-01T00:00:00Z,27.5,\"a,NaN\",NaN\n"
+        b"2024-01-01T01:00:00Z,NaN,NaNa,20.5\r\n"
+        b"2024-01-01T02:00:00Z,27.6,b,NaN")
+
+
+def _chunks(body: bytes, size: int):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def _filtered(body: bytes, size: int) -> bytes:
+    return b"".join(http.rewriteChunks(_chunks(body, size), dw.CsvNaNFilter()))
+
+
+def test_CsvNaNFilter_empties_nan_cells_only():
+    out = _filtered(CSVP, 1 << 20)
+    assert out == (b"time (UTC),latitude (degrees_north),station,sst (degree_C)\n"
+                   b"2024-01-01T00:00:00Z,27.5,\"a,NaN\",\n"
+                   b"2024-01-01T01:00:00Z,,NaNa,20.5\r\n"
+                   b"2024-01-01T02:00:00Z,27.6,b,")
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16])
+def test_CsvNaNFilter_same_result_for_any_chunking(size):
+    assert _filtered(CSVP, size) == _filtered(CSVP, 1 << 20)
+
+
+def test_CsvStreamValidator_counts_rows_and_checks_header():
+    validator = dw.CsvStreamValidator(["time", "latitude", "station", "sst"])
+    for chunk in _chunks(CSVP, 5):
+        validator.feed(chunk)
+    assert validator.finish() == 3
+    assert validator.header[0] == "time (UTC)"
+
+
+def test_CsvStreamValidator_trailing_newline_is_not_a_row():
+    validator = dw.CsvStreamValidator()
+    validator.feed(b"a,b\n1,2\n")
+    assert validator.finish() == 1
+
+
+def test_CsvStreamValidator_rejects_mismatched_header():
+    validator = dw.CsvStreamValidator(["time", "depth"])
+    validator.feed(CSVP)
+    with pytest.raises(ValueError):
+        validator.finish()
+
+
+def test_CsvStreamValidator_rejects_empty_body():
+    with pytest.raises(ValueError):
+        dw.CsvStreamValidator().finish()
+
+
+def test_requestedColumns_stops_at_first_constraint():
+    url = "https://h/erddap/tabledap/x.csvp?time%2Clatitude,sst&time%3E=2024-01-01"
+    assert dw.requestedColumns(url) == ["time", "latitude", "sst"]
+
+
+def test_writeStream_writes_rewritten_bytes(tmp_path, fakeResponse):
+    seen = []
+    path = tmp_path / "out.csv"
+    written = http.writeStream(fakeResponse(text=CSVP), str(path), chunk_size=4, on_chunk=seen.append,
+                               rewrite=dw.CsvNaNFilter())
+    assert path.read_bytes() == _filtered(CSVP, 1 << 20)
+    assert written == len(path.read_bytes()) == len(b"".join(seen))
+    assert not (tmp_path / "out.csv.part").exists()
+
+
+def _smallDataset(monkeypatch):
+    monkeypatch.setattr(core.user_options, "in_memory_upload_bool", True)
+    dataset = dw.DatasetWrangler.__new__(dw.DatasetWrangler)
+    dataset.dataset_id = dataset.dataset_title = "buoy"
+    dataset.url_s = ["https://h/erddap/tabledap/buoy.csvp?time,sst"]
+    dataset.griddap = dataset.is_glider = dataset.needs_Subset = False
+    dataset.ledger = dataset.row_count = dataset.data_buffer = None
+    dataset.has_error = False
+    return dataset
+
+
+def _httpError(status):
+    response = requests.Response()
+    response.status_code, response.reason = status, "Payload Too Large"
+    return requests.exceptions.HTTPError(f"{status}", response=response)
+
+
+@pytest.mark.parametrize("error, sentinel", [
+    (_httpError(413), dw.HTTP_413),
+    (requests.exceptions.ReadTimeout("read timed out"), dw.HTTP_TIMEOUT),
+])
+def test_in_memory_413_or_timeout_splits_without_a_disk_retry(monkeypatch, error, sentinel):
+    dataset = _smallDataset(monkeypatch)
+    calls = []
+
+    def downloadToBuffer(url, *args, **kwargs):
+        calls.append(url)
+        raise error
+    monkeypatch.setattr(dw, "downloadToBuffer", downloadToBuffer)
+    monkeypatch.setattr(dataset, "_downloadWithSplit", lambda *a, **k: pytest.fail("whole request retried on disk"))
+    monkeypatch.setattr(dataset, "_splitDownload", lambda url, *a, **k: calls.append(("split", url)) or "merged.csv")
+
+    assert dataset._downloadToMemory(dataset.url_s[0], 60, dw.DownloadProgress("buoy", 1)) == sentinel
+    calls.clear()
+    assert dataset._writeData_idv(3, 60) == "merged.csv"
+    assert calls == [dataset.url_s[0], ("split", dataset.url_s[0])]
+
+
+def test_in_memory_other_errors_retry_on_disk(monkeypatch):
+    dataset = _smallDataset(monkeypatch)
+
+    def downloadToBuffer(url, *args, **kwargs):
+        raise requests.exceptions.ConnectionError("reset")
+    monkeypatch.setattr(dw, "downloadToBuffer", downloadToBuffer)
+    monkeypatch.setattr(dataset, "_splitDownload", lambda *a, **k: pytest.fail("split without a 413"))
+    monkeypatch.setattr(dataset, "_downloadWithSplit", lambda *a, **k: "disk.csv")
+    assert dataset._writeData_idv(3, 60) == "disk.csv"
+
+
+def test_downloadToBuffer_keeps_a_small_body_in_memory(tmp_path, monkeypatch, fakeServer, fakeResponse):
+    fakeServer.respond = lambda url, headers: fakeResponse(text=CSVP)
+    monkeypatch.setattr(dw.http, "stream", fakeServer.stream)
+    path = tmp_path / "buoy.csv"
+    assert dw.downloadToBuffer("u", str(path), 60, max_bytes=len(CSVP)) == CSVP
+    assert not path.exists()
+
+
+def test_downloadToBuffer_spills_to_disk_past_the_cap(tmp_path, monkeypatch, fakeServer, fakeResponse):
+    fakeServer.respond = lambda url, headers: fakeResponse(text=CSVP)
+    monkeypatch.setattr(dw.http, "stream", fakeServer.stream)
+    monkeypatch.setattr(dw.http, "STREAM_CHUNK_BYTES", 8)
+    seen = []
+    path = tmp_path / "buoy.csv"
+    assert dw.downloadToBuffer("u", str(path), 60, max_bytes=20, on_chunk=seen.append) == str(path)
+    # the buffered head and the rest that streamed after it, each chunk seen once
+    assert path.read_bytes() == b"".join(seen) == CSVP
+    assert not (tmp_path / "buoy.csv.part").exists()
+
+
+def test_downloadToMemory_sets_data_buffer_only_below_the_cap(tmp_path, monkeypatch, fakeServer, fakeResponse):
+    monkeypatch.setattr(dw.ec, "getTempDir", lambda: str(tmp_path))
+    monkeypatch.setattr(core.user_options, "validate_downloads_bool", False)
+    fakeServer.respond = lambda url, headers: fakeResponse(text=CSVP)
+    monkeypatch.setattr(dw.http, "stream", fakeServer.stream)
+    downloadToBuffer = dw.downloadToBuffer
+
+    for cap, in_memory in ((1 << 20, True), (16, False)):
+        monkeypatch.setattr(dw, "downloadToBuffer", lambda *a, **k: downloadToBuffer(*a, max_bytes=cap, **k))
+        dataset = _smallDataset(monkeypatch)
+        progress = dw.DownloadProgress("buoy", 1)
+        file_path = dataset._downloadToMemory(dataset.url_s[0], 60, progress)
+        assert file_path == str(tmp_path / dataset._dataFilename())
+        assert os.path.exists(file_path) != in_memory
+        assert (dataset.data_buffer is not None) == in_memory
+        body = dataset.data_buffer if in_memory else (tmp_path / dataset._dataFilename()).read_bytes()
+        assert body == _filtered(CSVP, 1 << 20)
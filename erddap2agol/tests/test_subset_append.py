@@ -0,0 +1,87 @@
+import threading, time
+from types import SimpleNamespace
+import pytest
+from src import agol_wrangler as aw
+
+
+class _Layer:
+    def __init__(self, fail_first=()):
+        self.appended = []
+        self.fail_first = set(fail_first)
+        self.active = 0
+        self.most_active = 0
+        self.lock = threading.Lock()
+
+    def append(self, item_id, upload_format, source_info, upsert):
+        with self.lock:
+            self.active += 1
+            self.most_active = max(self.most_active, self.active)
+        try:
+            time.sleep(0.01)
+            if item_id in self.fail_first:
+                self.fail_first.discard(item_id)
+                raise RuntimeError("busy")
+            self.appended.append(item_id)
+            return True
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class _Item:
+    def __init__(self, item_id):
+        self.id = item_id
+        self.deleted = False
+
+    def delete(self, permanent=False):
+        self.deleted = True
+
+
+def _wrangler(analyzed):
+    wrangler = aw.AgolWrangler.__new__(aw.AgolWrangler)
+    wrangler.ledger = None
+    wrangler.enterprise_bool = False
+
+    def analyze(item, file_type):
+        analyzed.append(item)
+        return {"publishParameters": {"name": "subset"}}
+    wrangler.gis = SimpleNamespace(content=SimpleNamespace(analyze=analyze))
+    return wrangler
+
+
+@pytest.fixture(autouse=True)
+def noBackoff(monkeypatch):
+    monkeypatch.setattr(aw.http, "backoffDelay", lambda attempt: 0)
+
+
+def test_subsets_append_one_at_a_time_in_order():
+    layer = _Layer(fail_first={"subset_3"})
+    published = SimpleNamespace(layers=[layer], title="buoy")
+    items = []
+
+    def add_item(dataset, path):
+        # later subsets finish uploading first
+        time.sleep(0.05 / int(path[-1]))
+        items.append(_Item(f"subset_{path[-1]}"))
+        return items[-1]
+
+    analyzed = []
+    paths = [f"part{i}" for i in range(1, 7)]
+    _wrangler(analyzed)._appendSubsets(SimpleNamespace(dataset_id="buoy"), published, paths, add_item)
+    assert layer.appended == [f"subset_{i}" for i in range(2, 7)]
+    assert layer.most_active == 1
+    assert len(analyzed) == 1
+    assert all(item.deleted for item in items)
+
+
+def test_a_failed_upload_does_not_stop_later_subsets():
+    layer = _Layer()
+    published = SimpleNamespace(layers=[layer], title="buoy")
+
+    def add_item(dataset, path):
+        if path == "part3":
+            raise RuntimeError("409 already exists")
+        return _Item(f"subset_{path[-1]}")
+
+    _wrangler([])._appendSubsets(SimpleNamespace(dataset_id="buoy"), published, ["part1", "part2", "part3", "part4"], add_item)
+    assert layer.appended == ["subset_2", "subset_4"]
@@ -0,0 +1,106 @@
+import os, time, functools
+import pytest
+from src import worker_pool as wp
+
+# tasks run in worker processes, so they are module-level functions
+
+
+def _square(n):
+    return n * n
+
+
+def _raise(message):
+    raise ValueError(message)
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _hangOnce(marker):
+    # the first attempt hangs, the retry finds the marker and returns
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        time.sleep(30)
+    return "retried"
+
+
+def _failingInit():
+    raise RuntimeError("portal login failed")
+
+
+def _failOnceInit(marker):
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        raise RuntimeError("portal login failed")
+
+
+@pytest.fixture(autouse=True)
+def noBackoff(monkeypatch):
+    monkeypatch.setattr(wp.http, "backoffDelay", lambda attempt: 0)
+
+
+def _results(pool, tasks):
+    return {result.key: result for result in pool.run(tasks)}
+
+
+def test_results_for_every_task():
+    results = _results(wp.DeadlinePool(max_workers=2), [(n, _square, (n,)) for n in range(5)])
+    assert {key: r.value for key, r in results.items()} == {n: n * n for n in range(5)}
+    assert all(r.status == "done" and r.attempts == 1 for r in results.values())
+
+
+def test_a_raising_task_fails_without_retry():
+    result = _results(wp.DeadlinePool(retries=3), [("bad", _raise, ("broken item",))])["bad"]
+    assert (result.status, result.attempts) == ("failed", 1)
+    assert result.error == "ValueError: broken item"
+
+
+def test_a_hung_task_is_killed_and_retried(tmp_path):
+    pool = wp.DeadlinePool(timeout=0.5, retries=1)
+    result = _results(pool, [("hang", _hangOnce, (str(tmp_path / "marker"),))])["hang"]
+    assert (result.status, result.value, result.attempts) == ("done", "retried", 2)
+
+
+def test_timeout_after_the_last_retry():
+    started = time.time()
+    result = _results(wp.DeadlinePool(timeout=0.3, retries=1), [("slow", _sleep, (30,))])["slow"]
+    assert (result.status, result.attempts) == ("timeout", 2)
+    assert time.time() - started < 10
+
+
+def test_cycle_budget_skips_what_is_left():
+    pool = wp.DeadlinePool(max_workers=1, timeout=0, cycle_budget=0.5)
+    results = _results(pool, [("slow", _sleep, (30,)), ("queued", _square, (2,))])
+    assert results["slow"].status == "skipped"
+    assert results["queued"].status == "skipped" and results["queued"].attempts == 0
+
+
+def test_no_tasks():
+    assert list(wp.DeadlinePool().run([])) == []
+
+
+@pytest.fixture
+def deadOnSpawn(monkeypatch):
+    """Workers are handed out only once their process has exited, so the first send hits a closed pipe"""
+    spawn = wp.DeadlinePool._spawn
+
+    def _spawn(self):
+        worker = spawn(self)
+        worker.process.join(timeout=10)
+        return worker
+    monkeypatch.setattr(wp.DeadlinePool, "_spawn", _spawn)
+
+
+def test_a_failing_initializer_fails_the_task_after_its_retries(deadOnSpawn):
+    pool = wp.DeadlinePool(max_workers=2, retries=1, initializer=_failingInit)
+    results = _results(pool, [(n, _square, (n,)) for n in range(3)])
+    assert all((r.status, r.attempts, r.error) == ("failed", 2, "worker process died") for r in results.values())
+    assert set(results) == {0, 1, 2}
+
+
+def test_a_worker_lost_in_its_initializer_is_replaced(tmp_path):
+    init = functools.partial(_failOnceInit, str(tmp_path / "marker"))
+    results = _results(wp.DeadlinePool(max_workers=1, retries=1, initializer=init), [("a", _square, (3,))])
+    assert (results["a"].status, results["a"].value, results["a"].attempts) == ("done", 9, 2)
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import tempfile
+
+os.environ.setdefault('AGOL_HOME', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'venv')))
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from erddap2agol.src import glider_tracks as gt
+
+# Benchmark of the glider csvp -> line GeoJSON conversion.
+# python scripts/bench_glider_geojson.py [n_points] [glider.csv ...]
+# The per-row iloc loop the converter used to run is timed against glider_tracks on a
+# synthetic deployment (default 20,000 points, the old loop grows linearly and takes
+# minutes at 500k), or on saved glider csvp downloads passed as arguments.
+
+X, Y = gt.GLIDER_X, gt.GLIDER_Y
+
+
+def syntheticGlider(n_points: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "time (UTC)": pd.date_range("2024-01-01", periods=n_points, freq="30s").strftime("%Y-%m-%dT%H:%M:%SZ"),
+        X: -88.0 + np.cumsum(rng.normal(0, 1e-4, n_points)),
+        Y: 28.0 + np.cumsum(rng.normal(0, 1e-4, n_points)),
+        "depth (m)": np.abs(np.sin(np.arange(n_points) / 200) * 900),
+        "temperature (Celsius)": rng.normal(20, 3, n_points),
+        "salinity (1)": rng.normal(35, 0.5, n_points),
+        "profile_id": np.arange(n_points) // 400,
+        "trajectory": "glider-20240101T0000",
+    })
+    # gaps in the science sensors and a few fixes without a position
+    df.loc[df.index % 7 == 0, "salinity (1)"] = np.nan
+    df.loc[df.index % 997 == 0, [X, Y]] = np.nan
+    return df
+
+def legacyGeojson(df: pd.DataFrame, savepath: str) -> None:
+    """The iloc loop pointTableToGeojsonLine ran before glider_tracks"""
+    df = df.replace({np.nan: None})
+    df = df.dropna(subset=[X, Y])
+    features = []
+    data_columns = [col for col in df.columns if col not in [X, Y]]
+    for i in range(len(df) - 1):
+        line_start = [df.iloc[i][X], df.iloc[i][Y]]
+        line_end = [df.iloc[i + 1][X], df.iloc[i + 1][Y]]
+        if None in line_start or None in line_end:
+            continue
+        properties = df.iloc[i + 1][data_columns].to_dict()
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": [line_start, line_end]},
+            "properties": properties,
+        })
+    with open(savepath, "w") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+def vectorGeojson(df: pd.DataFrame, savepath: str) -> None:
+    gt.writeFeatureCollection(gt.segmentFeatures(df, X, Y), savepath)
+
+def timeIt(func, df: pd.DataFrame, savepath: str) -> float:
+    start = time.perf_counter()
+    func(df, savepath)
+    return time.perf_counter() - start
+
+def bench(label: str, df: pd.DataFrame) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.geojson")
+        vector_path = os.path.join(tmp, "vector.geojson")
+        legacy_t = timeIt(legacyGeojson, df, legacy_path)
+        vector_t = timeIt(vectorGeojson, df, vector_path)
+        with open(legacy_path) as f:
+            legacy = json.load(f)
+        with open(vector_path) as f:
+            vector = json.load(f)
+
+    print(f"{label}: {len(df):,} points, {len(vector['features']):,} segments")
+    print(f"  iloc loop        {legacy_t:8.2f} s  {len(df) / legacy_t:10,.0f} points/s")
+    print(f"  glider_tracks    {vector_t:8.2f} s  {len(df) / vector_t:10,.0f} points/s")
+    print(f"  speedup {legacy_t / vector_t:.1f}x, identical output: {legacy == vector}")
+
+
+def main():
+    args = sys.argv[1:]
+    n_points = int(args.pop(0)) if args and args[0].isdigit() else 20000
+    if not args:
+        bench("synthetic", syntheticGlider(n_points))
+    for path in args:
+        bench(os.path.basename(path), pd.read_csv(path, low_memory=False))
+
+
+if __name__ == "__main__":
+    main()